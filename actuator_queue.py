@@ -0,0 +1,153 @@
+import time
+import threading
+from concurrent.futures import Future
+
+# SG90-class hobby servos turn roughly 60 degrees per 0.1 s unloaded
+DEGREES_PER_SECOND = 600
+SETTLE_TIME = 0.05       # Extra time for the horn to stop oscillating
+MIN_WRITE_INTERVAL = 0.05  # Commands arriving faster than this are coalesced
+
+
+class ServoQueue:
+    """
+    Non-blocking servo command queue.
+
+    move() returns a Future right away; a worker thread does the serial write.
+    Only the newest target is ever sent: commands that arrive while an earlier
+    one is still waiting are coalesced, and a target equal to the last one sent
+    is not written again. The servo's position is tracked on the host (the
+    Arduino sketch doesn't report it) from the commanded angle and the servo's
+    speed, and futures resolve with the final angle once the tracked position
+    has reached it, rather than after a fixed sleep.
+    """
+
+    def __init__(self, write, initial_angle=90, degrees_per_second=DEGREES_PER_SECOND,
+                 settle_time=SETTLE_TIME, min_write_interval=MIN_WRITE_INTERVAL):
+        self._write = write
+        self.degrees_per_second = degrees_per_second
+        self.settle_time = settle_time
+        self.min_write_interval = min_write_interval
+        self._condition = threading.Condition()
+        self._pending = None
+        self._waiting = []     # Futures for commands not yet sent (or coalesced into the pending one)
+        self._in_flight = []   # Futures for the move currently under way
+        self._closed = False
+        self._last_write = 0.0
+
+        # Tracked motion: moving from _from_angle to _target over [_move_start, _move_end]
+        self._from_angle = initial_angle
+        self._target = initial_angle
+        self._move_start = self._move_end = time.monotonic()
+
+        self.stats = {"submitted": 0, "sent": 0, "coalesced": 0, "suppressed": 0, "errors": 0}
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def move(self, angle):
+        """Queues a move and returns a Future that resolves with the angle the servo ends up at."""
+        future = Future()
+        if not 0 <= angle <= 180:
+            future.set_exception(ValueError("Angle must be between 0 and 180 degrees"))
+            return future
+        with self._condition:
+            self.stats["submitted"] += 1
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+            self._pending = angle
+            self._waiting.append(future)
+            self._condition.notify()
+        return future
+
+    def position(self):
+        """Estimated current angle."""
+        with self._condition:
+            return self._position(time.monotonic())
+
+    def is_moving(self):
+        with self._condition:
+            return time.monotonic() < self._move_end
+
+    def report(self):
+        s = self.stats
+        return (f"submitted={s['submitted']} sent={s['sent']} coalesced={s['coalesced']} "
+                f"suppressed={s['suppressed']} errors={s['errors']}")
+
+    def close(self, timeout=2.0):
+        """Lets queued moves finish (up to timeout) and stops the worker."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join(timeout)
+
+    def _position(self, now):
+        if now >= self._move_end:
+            return self._target
+        progress = (now - self._move_start) / (self._move_end - self._move_start)
+        return self._from_angle + (self._target - self._from_angle) * progress
+
+    def _run(self):
+        while True:
+            angle = None
+            finished = []
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    ready_at = self._last_write + self.min_write_interval
+                    if self._pending is not None and now >= ready_at:
+                        angle = self._pending
+                        futures = self._waiting
+                        self._pending = None
+                        self._waiting = []
+                        break
+                    if self._in_flight and now >= self._move_end:
+                        finished, self._in_flight = self._in_flight, []
+                        reached = self._target
+                        break
+                    if self._closed and self._pending is None and not self._in_flight:
+                        return
+                    # Sleep until the next thing that can happen: a write slot or the end of the move
+                    deadlines = []
+                    if self._pending is not None:
+                        deadlines.append(ready_at)
+                    if self._in_flight:
+                        deadlines.append(self._move_end)
+                    self._condition.wait(max(0.0, min(deadlines) - now) if deadlines else None)
+
+                # Already heading to (or at) this angle: nothing to send
+                if angle is not None and angle == self._target:
+                    self.stats["suppressed"] += 1
+                    self._in_flight.extend(futures)
+                    angle = None
+
+            # Futures resolve outside the lock: their callbacks (e.g. a daemon client's reply)
+            # must not hold up move() callers or the worker
+            if finished:
+                self._resolve(finished, reached)
+            if angle is None:
+                continue
+
+            try:
+                self._write(angle)
+            except Exception as e:
+                with self._condition:
+                    self.stats["errors"] += 1
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            with self._condition:
+                now = time.monotonic()
+                self._last_write = now
+                self.stats["sent"] += 1
+                self._from_angle = self._position(now)
+                self._target = angle
+                self._move_start = now
+                self._move_end = now + abs(angle - self._from_angle) / self.degrees_per_second + self.settle_time
+                # Moves still under way are superseded by this one and finish with it
+                self._in_flight.extend(futures)
+
+    @staticmethod
+    def _resolve(futures, angle):
+        for future in futures:
+            if not future.done():
+                future.set_result(angle)
@@ -0,0 +1,307 @@
+import io
+import math
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+from startup import lazy_import
+
+# Loaded on first use so importing this module stays cheap
+pygame = lazy_import("pygame")
+
+# ElevenLabs raw PCM output formats (16-bit little-endian mono) and their sample rates
+PCM_SAMPLE_RATES = {
+    "pcm_16000": 16000,
+    "pcm_22050": 22050,
+    "pcm_24000": 24000,
+    "pcm_44100": 44100,
+}
+
+# Mixer channels kept out of pygame's automatic allocation: speech here, short feedback sounds in earcons.py
+SPEECH_CHANNEL = 0
+EARCON_CHANNEL = 1
+RESERVED_CHANNELS = 2
+
+
+def prefetch(chunks, cancel=None):
+    """
+    Starts pulling a chunk iterator in the background and returns an iterator
+    over what arrives. Setting `cancel` stops the download (and closes the
+    source, e.g. the HTTP response).
+    """
+    arrived = queue.Queue()
+
+    def drain():
+        try:
+            for chunk in chunks:
+                if cancel is not None and cancel.is_set():
+                    _close(chunks)
+                    break
+                if chunk:
+                    arrived.put(chunk)
+        except Exception as e:
+            arrived.put(e)
+        finally:
+            arrived.put(None)
+
+    threading.Thread(target=drain, daemon=True).start()
+
+    def iterate():
+        while True:
+            item = arrived.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    return iterate()
+
+
+def _close(chunks):
+    close = getattr(chunks, "close", None)
+    if close:
+        close()
+
+
+class StreamingAudioSink:
+    """
+    Plays TTS audio while it is still downloading.
+
+    Raw PCM formats go through a bounded jitter buffer of fixed-size blocks that
+    are queued back to back on a reserved mixer channel. MP3 is piped into an
+    mpg123 decoder when one is installed, otherwise it is buffered and played
+    with pygame.mixer.music as before.
+
+    play() stops within a few milliseconds once its `cancel` event is set.
+    PCM blocks are also added to `echo_reference` (a barge_in.EchoReference)
+    at the time they are due to play, so the microphone side can tell our
+    own voice from the user's.
+    """
+
+    def __init__(self, output_format="pcm_22050", prebuffer_ms=150, max_buffer_ms=2000, block_ms=100,
+                 echo_reference=None):
+        self.output_format = output_format
+        self.prebuffer_ms = prebuffer_ms
+        self.max_buffer_ms = max_buffer_ms
+        self.block_ms = block_ms
+        self.echo_reference = echo_reference
+        self._channel = None
+        self._scheduled_until = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            "streams": 0,
+            "chunks": 0,
+            "bytes": 0,
+            "underruns": 0,
+            "underrun_ms": 0.0,
+            "interrupted": 0,
+            "max_buffered_ms": 0,
+            "last_first_audio_ms": None,
+        }
+
+    def play(self, chunks, on_start=None, cancel=None):
+        """Plays an iterable of audio chunks, returning when playback has finished or was cancelled."""
+        self.stats["streams"] += 1
+        if self.output_format in PCM_SAMPLE_RATES:
+            self._play_pcm(chunks, PCM_SAMPLE_RATES[self.output_format], on_start, cancel)
+        elif shutil.which("mpg123"):
+            self._play_mp3_stream(chunks, on_start, cancel)
+        else:
+            self._play_mp3_buffered(chunks, on_start, cancel)
+        if self._cancelled(cancel):
+            self.stats["interrupted"] += 1
+
+    def report(self):
+        s = self.stats
+        return (f"streams={s['streams']} chunks={s['chunks']} bytes={s['bytes']} "
+                f"underruns={s['underruns']} underrun_ms={s['underrun_ms']:.0f} interrupted={s['interrupted']} "
+                f"max_buffered_ms={s['max_buffered_ms']} first_audio_ms={s['last_first_audio_ms']}")
+
+    def _count(self, chunk):
+        self.stats["chunks"] += 1
+        self.stats["bytes"] += len(chunk)
+
+    @staticmethod
+    def _cancelled(cancel):
+        return cancel is not None and cancel.is_set()
+
+    def _started(self, started_at, on_start):
+        self.stats["last_first_audio_ms"] = round((time.monotonic() - started_at) * 1000)
+        if on_start:
+            on_start()
+
+    def _play_pcm(self, chunks, sample_rate, on_start, cancel=None):
+        started_at = time.monotonic()
+        block_bytes = int(sample_rate * 2 * self.block_ms / 1000) & ~1
+        blocks = queue.Queue(maxsize=max(1, self.max_buffer_ms // self.block_ms))
+        finished = threading.Event()
+        stopped = threading.Event()
+
+        def put(block):
+            # A full buffer must not keep the feeder waiting after playback was stopped
+            while not stopped.is_set():
+                try:
+                    blocks.put(block, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def feed():
+            pending = b""
+            try:
+                for chunk in chunks:
+                    if stopped.is_set():
+                        _close(chunks)
+                        return
+                    if not chunk:
+                        continue
+                    self._count(chunk)
+                    pending += chunk
+                    while len(pending) >= block_bytes:
+                        if not put(pending[:block_bytes]):
+                            return
+                        pending = pending[block_bytes:]
+                # Drop a trailing odd byte, it can't form a whole sample
+                tail = pending[:len(pending) & ~1]
+                if tail:
+                    put(tail)
+            except Exception as e:
+                print(f"Error streaming audio: {e}")
+            finally:
+                finished.set()
+
+        threading.Thread(target=feed, daemon=True).start()
+
+        channel = self._get_channel()
+        prebuffer_blocks = max(1, math.ceil(self.prebuffer_ms / self.block_ms))
+        playing = False
+        underrun_since = None
+        clock = pygame.time.Clock()
+
+        while True:
+            if self._cancelled(cancel):
+                channel.stop()
+                stopped.set()
+                break
+
+            buffered_ms = blocks.qsize() * self.block_ms
+            self.stats["max_buffered_ms"] = max(self.stats["max_buffered_ms"], buffered_ms)
+
+            if not playing:
+                # Hold playback until the jitter buffer has some slack (or the clip is complete)
+                if blocks.qsize() >= prebuffer_blocks or finished.is_set():
+                    playing = True
+                    self._started(started_at, on_start)
+                else:
+                    clock.tick(200)
+                    continue
+
+            if not channel.get_busy() or channel.get_queue() is None:
+                try:
+                    block = blocks.get_nowait()
+                except queue.Empty:
+                    block = None
+
+                if block:
+                    sound = self._to_sound(block, sample_rate)
+                    now = time.monotonic()
+                    if channel.get_busy():
+                        channel.queue(sound)
+                        starts = max(now, self._scheduled_until)
+                    else:
+                        channel.play(sound)
+                        starts = now
+                    self._scheduled_until = starts + len(block) / (2 * sample_rate)
+                    if self.echo_reference is not None:
+                        self.echo_reference.add(block, sample_rate, starts)
+                    if underrun_since is not None:
+                        self.stats["underrun_ms"] += (time.monotonic() - underrun_since) * 1000
+                        underrun_since = None
+                elif not channel.get_busy():
+                    if finished.is_set() and blocks.empty():
+                        break
+                    # Channel ran dry while the network is still sending
+                    if underrun_since is None:
+                        self.stats["underruns"] += 1
+                        underrun_since = time.monotonic()
+
+            clock.tick(200)
+
+    def _to_sound(self, block, sample_rate):
+        """Converts a block of 16-bit mono PCM into a Sound in the mixer's format."""
+        samples = np.frombuffer(block, dtype="<i2")
+        mixer_rate, _, mixer_channels = pygame.mixer.get_init()
+        if mixer_rate != sample_rate:
+            length = max(1, int(round(len(samples) * mixer_rate / sample_rate)))
+            positions = np.linspace(0, len(samples) - 1, length)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+        if mixer_channels > 1:
+            samples = np.repeat(samples[:, None], mixer_channels, axis=1)
+        return pygame.mixer.Sound(buffer=np.ascontiguousarray(samples).tobytes())
+
+    def _get_channel(self):
+        if self._channel is None:
+            pygame.mixer.set_reserved(RESERVED_CHANNELS)
+            self._channel = pygame.mixer.Channel(SPEECH_CHANNEL)
+        return self._channel
+
+    def _play_mp3_stream(self, chunks, on_start, cancel=None):
+        started_at = time.monotonic()
+        decoder = subprocess.Popen(["mpg123", "-q", "-"], stdin=subprocess.PIPE)
+        try:
+            for chunk in chunks:
+                if self._cancelled(cancel):
+                    _close(chunks)
+                    break
+                if not chunk:
+                    continue
+                self._count(chunk)
+                decoder.stdin.write(chunk)
+                decoder.stdin.flush()
+                if started_at is not None:
+                    self._started(started_at, on_start)
+                    started_at = None
+        except Exception as e:
+            print(f"Error streaming audio: {e}")
+        finally:
+            try:
+                decoder.stdin.close()
+            except BrokenPipeError:
+                pass
+            # The decoder plays out what it has buffered; cancelling stops it where it is
+            while decoder.poll() is None:
+                if self._cancelled(cancel):
+                    decoder.kill()
+                    break
+                time.sleep(0.01)
+            decoder.wait()
+
+    def _play_mp3_buffered(self, chunks, on_start, cancel=None):
+        started_at = time.monotonic()
+        audio_data = io.BytesIO()
+        for chunk in chunks:
+            if self._cancelled(cancel):
+                _close(chunks)
+                return
+            if chunk:
+                self._count(chunk)
+                audio_data.write(chunk)
+        audio_data.seek(0)
+
+        pygame.mixer.music.load(audio_data, "mp3")
+        pygame.mixer.music.play()
+        self._started(started_at, on_start)
+
+        clock = pygame.time.Clock()
+        while pygame.mixer.music.get_busy():
+            if self._cancelled(cancel):
+                pygame.mixer.music.stop()
+                break
+            clock.tick(100)
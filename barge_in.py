@@ -0,0 +1,294 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from startup import lazy_import
+from vad import FrameVAD
+
+sr = lazy_import("speech_recognition")
+
+REFERENCE_STEP = 0.01       # Reference energy is kept per 10 ms of played audio
+ECHO_DELAY_SECONDS = 0.3    # Longest speaker-to-microphone delay through mixer and sound card buffers
+ECHO_MARGIN = 1.5           # The user must be this many times (~3.5 dB) louder than the expected echo
+MIN_REFERENCE_RMS = 300     # Played audio quieter than this says little about the echo path
+COUPLING_FRAMES = 10        # Echo-only frames needed before the echo estimate is trusted
+COUPLING_PERCENTILE = 90    # Frames at the echo's peaks give the coupling; quieter ones fall below it
+BARGE_IN_MS = 60            # Speech over playback this long is an interruption
+
+
+class EchoReference:
+    """
+    What JARVIS is sending to the speaker, as short-term RMS on the
+    monotonic clock. The audio sink adds each block when it is scheduled to
+    play; the barge-in detector asks how loud the echo of it could be.
+    """
+
+    def __init__(self, seconds=30.0):
+        self._entries = deque(maxlen=int(seconds / REFERENCE_STEP))  # (start time, rms)
+        self._lock = threading.Lock()
+
+    def add(self, data, sample_rate, start_time):
+        """Adds a block of 16-bit mono PCM that starts playing at start_time."""
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        step = max(1, int(sample_rate * REFERENCE_STEP))
+        count = max(1, -(-len(samples) // step))
+        padded = np.zeros(count * step, dtype=np.float32)
+        padded[:len(samples)] = samples
+        levels = np.sqrt(np.mean(padded.reshape(count, step) ** 2, axis=1))
+        with self._lock:
+            for index, level in enumerate(levels.tolist()):
+                self._entries.append((start_time + index * REFERENCE_STEP, level))
+
+    def level(self, start, end):
+        """Loudest reference audio whose echo could arrive between start and end (0.0 if none)."""
+        loudest = 0.0
+        with self._lock:
+            for played_at, level in reversed(self._entries):
+                if played_at + REFERENCE_STEP < start - ECHO_DELAY_SECONDS:
+                    break
+                if played_at <= end:
+                    loudest = max(loudest, level)
+        return loudest
+
+
+class BargeInDetector:
+    """
+    Tells the user's voice from JARVIS's own voice coming back through the
+    microphone.
+
+    Each 20 ms frame goes through FrameVAD; a speech frame only counts as the
+    user when it is ECHO_MARGIN louder than the echo expected from the
+    reference signal. The expected echo is the loudest reference level within
+    the echo delay times the speaker-to-microphone coupling: a high
+    percentile of the mic/reference level ratio over frames the echo
+    explains, learned during the first playback and kept afterwards. Until
+    it is known, nothing said over playback counts.
+    """
+
+    def __init__(self, sample_rate, reference, barge_in_ms=BARGE_IN_MS):
+        self.sample_rate = sample_rate
+        self.reference = reference
+        self.vad = FrameVAD(sample_rate)
+        self.frames_needed = max(1, barge_in_ms // self.vad.frame_ms)
+        self._ratios = deque(maxlen=200)
+        self.coupling = None
+        self.reset()
+
+    def reset(self):
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._run = 0
+
+    def is_echo(self, level, start, end):
+        """
+        Whether the echo of what played could account for a microphone level
+        (RMS) heard between start and end. While playing with no coupling
+        learned yet, everything is taken for echo.
+        """
+        echo = self.reference.level(start, end)
+        if echo == 0.0:
+            return False
+        if self.coupling is None:
+            return True
+        return level <= ECHO_MARGIN * self.coupling * echo
+
+    def process(self, data, end_time):
+        """
+        Feeds a block of 16-bit PCM captured up to end_time. Returns how many
+        seconds before end_time the interruption started, or None.
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+        samples = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        frame_length = self.vad.frame_length
+        whole = len(samples) - len(samples) % frame_length
+        self._pending = samples[whole:]
+        speech, _ = self.vad.classify(samples[:whole])
+        count = len(speech)
+        frame_seconds = frame_length / self.sample_rate
+        frames = samples[:whole].reshape(count, frame_length).astype(np.float32)
+        levels = np.sqrt(np.mean(frames * frames, axis=1))
+
+        for index, (is_speech, level) in enumerate(zip(speech, levels.tolist())):
+            frame_end = end_time - (count - 1 - index) * frame_seconds - len(self._pending) / self.sample_rate
+            echo = self.reference.level(frame_end - frame_seconds, frame_end)
+            if echo == 0.0:
+                user = bool(is_speech)  # Nothing played within the echo delay
+            elif self.coupling is None:
+                user = False
+            else:
+                user = bool(is_speech) and level > ECHO_MARGIN * self.coupling * echo
+            # Learn from frames the echo explains (before there is an estimate, from all of them)
+            explained = self.coupling is None or level <= ECHO_MARGIN * self.coupling * echo
+            if not user and explained and echo >= MIN_REFERENCE_RMS:
+                self._ratios.append(level / echo)
+                if len(self._ratios) >= COUPLING_FRAMES:
+                    self.coupling = float(np.percentile(self._ratios, COUPLING_PERCENTILE))
+
+            self._run = self._run + 1 if user else 0
+            if self._run >= self.frames_needed:
+                self._run = 0
+                return end_time - (frame_end - self.frames_needed * frame_seconds)
+        return None
+
+
+class BargeInMonitor:
+    """
+    Keeps listening while JARVIS speaks.
+
+        with barge_in.watch(cancel):
+            speak(reply, cancel=cancel)
+        if barge_in.interrupted:
+            listen(start=barge_in.speech_start)
+
+    While a watch() block is open, a background thread feeds the MicStream's
+    frames to a BargeInDetector; when the user talks over the reply it sets
+    `cancel`, which stops playback and the turn's LLM and TTS requests, and
+    records the frame cursor where the user started so their words can be
+    transcribed.
+    """
+
+    def __init__(self, mic_stream, reference):
+        self.mic_stream = mic_stream
+        self.detector = BargeInDetector(mic_stream.source.SAMPLE_RATE, reference)
+        self.speech_start = None
+        self._cancel = None
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"watched": 0, "interruptions": 0, "detect_ms": 0.0}
+
+    @property
+    def interrupted(self):
+        return self.speech_start is not None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    @contextmanager
+    def watch(self, cancel):
+        """Sets `cancel` if the user starts speaking before the block ends."""
+        with self._condition:
+            self.speech_start = None
+            self._cancel = cancel
+            self.stats["watched"] += 1
+            self._condition.notify_all()
+        try:
+            yield self
+        finally:
+            with self._condition:
+                self._cancel = None
+
+    def report(self):
+        s = self.stats
+        average = s["detect_ms"] / s["interruptions"] if s["interruptions"] else 0.0
+        coupling = self.detector.coupling
+        return (f"watched={s['watched']} interruptions={s['interruptions']} avg_detect_ms={average:.0f} "
+                f"echo_coupling={'n/a' if coupling is None else f'{coupling:.2f}'}")
+
+    def _run(self):
+        seconds_per_frame = self.mic_stream.seconds_per_frame
+        cursor = None
+        while not self._stop.is_set():
+            with self._condition:
+                if self._cancel is None:
+                    cursor = None
+                    self._condition.wait(timeout=0.5)
+                    continue
+                cancel = self._cancel
+            if cursor is None:
+                cursor = self.mic_stream.position
+                self.detector.reset()
+            try:
+                frame, cursor = self.mic_stream.next_frame(cursor, 0.1)
+            except sr.WaitTimeoutError:
+                break  # Microphone closed
+            if frame is None:
+                continue
+
+            # The frame finished arriving this many frames ago
+            end_time = time.monotonic() - (self.mic_stream.position - cursor) * seconds_per_frame
+            spoken = self.detector.process(frame[0], end_time)
+            if spoken is None:
+                continue
+            with self._condition:
+                if self._cancel is not cancel:
+                    continue
+                back = int(np.ceil(spoken / seconds_per_frame))
+                self.speech_start = max(0, cursor - back)
+                self._cancel = None
+            cancel.set()
+            self.stats["interruptions"] += 1
+            self.stats["detect_ms"] += (time.monotonic() - end_time + spoken) * 1000
+
+
+if __name__ == "__main__":
+    # Self-check on synthetic audio: JARVIS "speaks" (modulated tones), the microphone hears
+    # the echo 120 ms later at 0.4x plus room noise, and in half the runs the user cuts in
+    import sys
+
+    if len(sys.argv) != 2 or sys.argv[1] != "selfcheck":
+        print("Usage: python barge_in.py selfcheck")
+        sys.exit(1)
+
+    RATE = 16000
+    CHUNK = 1024
+    rng = np.random.default_rng(1)
+
+    def voice(seconds, pitch, loudness, phase):
+        t = np.arange(int(seconds * RATE)) / RATE
+        syllables = np.clip(np.sin(2 * np.pi * 3.5 * t + phase), 0, None)  # ~4 syllables a second
+        harmonics = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        return harmonics * syllables * loudness
+
+    latencies = []
+    false_triggers = 0
+    reference = EchoReference()
+    detector = BargeInDetector(RATE, reference)
+    for run in range(20):
+        reference = EchoReference()
+        detector.reference = reference
+        detector.reset()
+        played = voice(6.0, 110, 4000, rng.uniform(0, 6))
+        echo = np.concatenate([np.zeros(int(0.12 * RATE)), 0.4 * played])[:len(played)]
+        mic = echo + rng.normal(0, 60, len(played))
+        user_at = None
+        if run % 2:
+            user_at = rng.uniform(1.5, 4.0)
+            start = int(user_at * RATE)
+            mic[start:] += voice(len(mic[start:]) / RATE, 190, 4000, 0.0)  # Starts on a syllable
+        mic = np.clip(mic, -32768, 32767).astype(np.int16)
+
+        base = 1000.0 * run
+        reference.add(played.astype(np.int16).tobytes(), RATE, base)
+        detected = None
+        for offset in range(0, len(mic) - CHUNK, CHUNK):
+            end_time = base + (offset + CHUNK) / RATE
+            spoken = detector.process(mic[offset:offset + CHUNK].tobytes(), end_time)
+            if spoken is not None:
+                detected = end_time - base
+                break
+        if user_at is None:
+            false_triggers += detected is not None
+        elif detected is not None:
+            latencies.append(detected - user_at)
+        print(f"run {run:2d}: user {'-' if user_at is None else f'{user_at:.2f}s'}, "
+              f"barge-in {'-' if detected is None else f'{detected:.2f}s'}")
+
+    print(f"echo coupling learned: {detector.coupling:.2f} (true 0.40)")
+    print(f"false triggers on echo alone: {false_triggers}/10")
+    if latencies:
+        print(f"detected {len(latencies)}/10 interruptions, {np.mean(latencies) * 1000:.0f} ms mean / "
+              f"{np.max(latencies) * 1000:.0f} ms max after the user started (block size {CHUNK * 1000 // RATE} ms)")
+    assert false_triggers == 0 and len(latencies) == 10 and max(latencies) < 0.2
+    print("Self-check passed")
@@ -0,0 +1,201 @@
+import os
+import json
+import queue
+import threading
+
+
+class ChatJournal:
+    """
+    Append-only JSONL chat history: one record per message.
+
+    Appends are handed to a background writer thread so the turn never waits
+    on disk I/O. The writer flushes in batches and every `compact_every`
+    messages rewrites the file through a temp file + atomic rename, dropping
+    torn lines left by a crash and anything beyond `max_messages`.
+    """
+
+    def __init__(self, path="chat_memory.jsonl", compact_every=500, max_messages=None):
+        self.path = path
+        self.compact_every = compact_every
+        self.max_messages = max_messages
+        self._pending = queue.Queue()
+        self._since_compaction = 0
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def append(self, message):
+        """Queues one message for writing."""
+        self._pending.put(message)
+
+    def extend(self, messages):
+        for message in messages:
+            self._pending.put(message)
+
+    def flush(self):
+        """Blocks until every queued message is on disk."""
+        self._pending.join()
+
+    def close(self):
+        self.flush()
+        self._pending.put(None)
+        self._writer.join(timeout=5)
+
+    def load(self, last_turns=50):
+        """
+        Loads the leading system prompt plus the last `last_turns` turns. A turn
+        is a user message together with the system context right before it and
+        everything after it. Only the tail of the file is read.
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        head = self._read_head()
+        if head is None:
+            return []
+
+        tail = []
+        users_seen = 0
+        reached_start = True
+        for record in self._read_backwards():
+            if users_seen >= last_turns and record.get("role") != "system":
+                reached_start = False
+                break
+            tail.append(record)
+            if record.get("role") == "user":
+                users_seen += 1
+        tail.reverse()
+
+        # The head record is the system prompt; don't repeat it if the tail reached it
+        if reached_start:
+            return tail
+        if head.get("role") == "system":
+            return [head] + tail
+        return tail
+
+    def compact(self):
+        """Rewrites the journal atomically, keeping only valid records."""
+        if not os.path.exists(self.path):
+            return
+        records = list(self._read_records())
+        if self.max_messages and len(records) > self.max_messages:
+            head = records[:1] if records[0].get("role") == "system" else []
+            records = head + records[-(self.max_messages - len(head)):]
+        _write_atomic(self.path, records)
+        self._since_compaction = 0
+
+    def _write_loop(self):
+        while True:
+            message = self._pending.get()
+            if message is None:
+                self._pending.task_done()
+                return
+
+            # Batch whatever else is already waiting into the same write
+            batch = [message]
+            stop = False
+            while True:
+                try:
+                    extra = self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    stop = True
+                    break
+                batch.append(extra)
+
+            try:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    for record in batch:
+                        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    file.flush()
+                    os.fsync(file.fileno())
+                self._since_compaction += len(batch)
+                if self.compact_every and self._since_compaction >= self.compact_every:
+                    self.compact()
+            except Exception as e:
+                print(f"Error writing chat journal: {e}")
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._pending.task_done()
+
+            if stop:
+                return
+
+    def _read_head(self):
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                record = _parse(line)
+                if record is not None:
+                    return record
+        return None
+
+    def _read_records(self):
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                record = _parse(line)
+                if record is not None:
+                    yield record
+
+    def _read_backwards(self, block_size=64 * 1024):
+        """Yields records from the end of the file towards the start."""
+        with open(self.path, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            position = file.tell()
+            remainder = b""
+            while position > 0:
+                step = min(block_size, position)
+                position -= step
+                file.seek(position)
+                lines = (file.read(step) + remainder).split(b"\n")
+                # The first piece may be the end of a line that starts in an earlier block
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    record = _parse(line)
+                    if record is not None:
+                        yield record
+            record = _parse(remainder)
+            if record is not None:
+                yield record
+
+
+def migrate_json_memory(json_path="chat_memory.json", journal_path="chat_memory.jsonl"):
+    """Converts an old chat_memory.json list into a journal. Returns the number of messages moved."""
+    with open(json_path, "r", encoding="utf-8") as file:
+        history = json.load(file)
+    if not isinstance(history, list):
+        raise ValueError(f"{json_path} does not contain a message list")
+    _write_atomic(journal_path, history)
+    return len(history)
+
+
+def _write_atomic(path, records):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def _parse(line):
+    """Parses one journal line, skipping blanks and lines torn by a crash."""
+    if isinstance(line, bytes):
+        line = line.decode("utf-8", errors="replace")
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "chat_memory.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else "chat_memory.jsonl"
+    count = migrate_json_memory(source, target)
+    print(f"Migrated {count} messages from {source} to {target}")
@@ -0,0 +1,197 @@
+import os
+import time
+import threading
+
+import httpx
+
+GROQ_BASE_URL = "https://api.groq.com"
+ELEVENLABS_BASE_URL = "https://api.elevenlabs.io"
+
+KEEPALIVE_EXPIRY = 120  # Seconds an idle pooled connection stays open
+PING_INTERVAL = 45      # Idle clients get a HEAD request this often so the connection never expires
+MAX_CONNECTIONS = 4
+
+
+class ConnectionStats:
+    """Counts requests and new TCP connections for one client (fed by httpcore trace events)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.pings = 0
+        self.last_used = 0.0
+
+    @property
+    def reused(self):
+        return self.requests - self.new_connections
+
+    def on_request(self, request):
+        with self._lock:
+            self.requests += 1
+            self.last_used = time.monotonic()
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+
+    def summary(self):
+        return (f"requests={self.requests} new_connections={self.new_connections} "
+                f"reused={self.reused} pings={self.pings}")
+
+
+class ClientPool:
+    """
+    Process-wide registry of API clients.
+
+    Each client (Groq chat, Groq vision, ElevenLabs) is built once on first use
+    on top of its own keep-alive httpx connection pool, so later turns skip the
+    TCP and TLS handshakes. warm_up() opens the connections ahead of the first
+    turn and start_keepalive() pings idle clients before their connections expire.
+    API keys are read from the environment when a client is first built.
+    """
+
+    def __init__(self, groq_base_url=None, elevenlabs_base_url=None, ping_interval=PING_INTERVAL):
+        self.base_urls = {
+            "groq": groq_base_url or os.getenv("GROQ_BASE_URL") or GROQ_BASE_URL,
+            "groq_vision": groq_base_url or os.getenv("GROQ_BASE_URL") or GROQ_BASE_URL,
+            "elevenlabs": elevenlabs_base_url or os.getenv("ELEVENLABS_BASE_URL") or ELEVENLABS_BASE_URL,
+        }
+        self.ping_interval = ping_interval
+        self.stats = {name: ConnectionStats() for name in self.base_urls}
+        self._http = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._keepalive = None
+        self._stop = threading.Event()
+
+    def groq(self):
+        return self.get("groq")
+
+    def groq_vision(self):
+        return self.get("groq_vision")
+
+    def elevenlabs(self):
+        return self.get("elevenlabs")
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._clients:
+                self._clients[name] = self._build(name)
+            return self._clients[name]
+
+    def warm_up(self, names=None):
+        """Builds the clients and opens their connections in parallel."""
+        threads = [
+            threading.Thread(target=self._ping, args=(name,), daemon=True)
+            for name in (names or self.base_urls)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def start_keepalive(self):
+        if self._keepalive is None:
+            self._keepalive = threading.Thread(target=self._keepalive_loop, daemon=True)
+            self._keepalive.start()
+
+    def report(self):
+        return "\n".join(f"{name}: {stats.summary()}" for name, stats in self.stats.items())
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            for http_client in self._http.values():
+                http_client.close()
+            self._http.clear()
+            self._clients.clear()
+
+    def _http_client(self, name):
+        if name not in self._http:
+            self._http[name] = httpx.Client(
+                timeout=60.0,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+                event_hooks={"request": [self.stats[name].on_request]},
+            )
+        return self._http[name]
+
+    def _build(self, name):
+        http_client = self._http_client(name)
+        if name in ("groq", "groq_vision"):
+            from groq import Groq
+            return Groq(api_key=os.getenv("GROQ_API_KEY"), base_url=self.base_urls[name], http_client=http_client)
+        if name == "elevenlabs":
+            from elevenlabs import ElevenLabs
+            return ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"), base_url=self.base_urls[name],
+                              httpx_client=http_client)
+        raise KeyError(f"Unknown client: {name}")
+
+    def _ping(self, name):
+        """Opens (or refreshes) a pooled connection with a cheap HEAD request."""
+        self.get(name)
+        try:
+            self._http[name].head(self.base_urls[name], timeout=5.0)
+            self.stats[name].pings += 1
+        except httpx.HTTPError as e:
+            print(f"Warm-up of {name} client failed: {e}")
+
+    def _keepalive_loop(self):
+        while not self._stop.wait(self.ping_interval / 3):
+            now = time.monotonic()
+            for name in list(self._clients):
+                if now - self.stats[name].last_used >= self.ping_interval:
+                    self._ping(name)
+
+
+# Shared by everything in the process
+client_pool = ClientPool()
+
+
+if __name__ == "__main__":
+    # Self-check against a local HTTP/1.1 stand-in for the Groq API
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = json.dumps({
+                "id": "standin", "object": "chat.completion", "created": 0, "model": "standin",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "pong"}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    os.environ.setdefault("GROQ_API_KEY", "standin")
+    pool = ClientPool(groq_base_url=base_url)
+    pool.warm_up(["groq"])
+    for _ in range(5):
+        pool.groq().chat.completions.create(messages=[{"role": "user", "content": "ping"}], model="standin")
+    print(pool.report().splitlines()[0])
+    pool.close()
+    server.shutdown()
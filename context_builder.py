@@ -0,0 +1,70 @@
+from bisect import bisect_left
+
+# Roughly what the chat template adds around every message (role markers etc.)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate for English text (~4 characters per token)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+class ContextBuilder:
+    """
+    Picks the messages sent to the LLM: the system prompt is always kept, then
+    the newest messages are added until `token_budget` is reached.
+
+    history is append-only, so token counts are cached as a running prefix sum
+    and each build only counts the messages added since the previous one.
+    """
+
+    def __init__(self, token_budget=6000, count_tokens=estimate_tokens):
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+        self._source = None
+        self._prefix = [0]  # _prefix[i] = tokens in history[:i]
+        self.last_cut = 0  # history[:last_cut] (minus the system prompt) was left out
+        self.last_tokens = 0
+        self.last_dropped_messages = 0
+        self.last_dropped_tokens = 0
+
+    def message_tokens(self, message):
+        return self.count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+    def build(self, history, extra=None):
+        """
+        Returns the messages to send for this turn. `extra` messages (e.g. a
+        summary) are placed right after the system prompt and count against
+        the budget.
+        """
+        extra = extra or []
+        self._update_counts(history)
+
+        start = 1 if history and history[0].get("role") == "system" else 0
+        head = history[:start] + list(extra)
+        head_tokens = self._prefix[start] + sum(self.message_tokens(m) for m in extra)
+        remaining = self.token_budget - head_tokens
+
+        # Oldest index whose suffix still fits in the remaining budget
+        total = self._prefix[-1]
+        cut = bisect_left(self._prefix, total - remaining, lo=start)
+        # The newest message (the user's current query) is always sent
+        cut = min(max(cut, start), max(len(history) - 1, start))
+
+        # Don't open the context with a reply whose question was cut off
+        while cut < len(history) and history[cut].get("role") == "assistant":
+            cut += 1
+
+        self.last_cut = cut
+        self.last_tokens = head_tokens + total - self._prefix[cut]
+        self.last_dropped_messages = cut - start
+        self.last_dropped_tokens = self._prefix[cut] - self._prefix[start]
+        return head + history[cut:]
+
+    def _update_counts(self, history):
+        # Start over if we're handed a different list or it was shortened
+        if history is not self._source or len(history) < len(self._prefix) - 1:
+            self._source = history
+            self._prefix = [0]
+        for message in history[len(self._prefix) - 1:]:
+            self._prefix.append(self._prefix[-1] + self.message_tokens(message))
@@ -0,0 +1,128 @@
+import os
+import time
+import wave
+
+import numpy as np
+
+from startup import lazy_import
+from audio_sink import EARCON_CHANNEL, RESERVED_CHANNELS
+
+pygame = lazy_import("pygame")
+
+EARCON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "earcons")
+
+# Built-in sounds as (frequency Hz, milliseconds) notes; 0 Hz is a rest.
+# A WAV file of the same name in earcons/ replaces one.
+EARCON_NOTES = {
+    "listening": [(660, 60), (990, 90)],              # Rising: go ahead
+    "thinking": [(520, 45), (0, 60), (520, 45), (0, 850)],  # Soft double tick, looped while waiting
+    "done": [(880, 60), (660, 90)],                   # Falling: turn over
+    "error": [(220, 120), (0, 40), (185, 160)],        # Low and flat
+}
+FADE_MS = 8  # Ramps at note edges, so the tones don't click
+ECHO_TAIL_SECONDS = 0.05  # Room echo after a sound ends, still audible to the microphone
+
+
+def synthesize(notes, sample_rate, volume):
+    """16-bit mono samples for a list of (frequency, ms) notes."""
+    parts = []
+    for frequency, ms in notes:
+        t = np.arange(int(sample_rate * ms / 1000)) / sample_rate
+        if not frequency:
+            parts.append(np.zeros(len(t)))
+            continue
+        note = np.sin(2 * np.pi * frequency * t) + 0.25 * np.sin(4 * np.pi * frequency * t)
+        ramp = min(len(t) // 2, int(sample_rate * FADE_MS / 1000))
+        envelope = np.ones(len(t))
+        envelope[:ramp] = np.linspace(0, 1, ramp)
+        envelope[len(t) - ramp:] = np.linspace(1, 0, ramp)
+        parts.append(note * envelope / 1.25)
+    return (np.concatenate(parts) * volume * 32767).astype(np.int16)
+
+
+def read_wav(path, sample_rate):
+    """Mono 16-bit samples of a WAV file, resampled to sample_rate."""
+    with wave.open(path, "rb") as clip:
+        channels, width, rate = clip.getnchannels(), clip.getsampwidth(), clip.getframerate()
+        samples = np.frombuffer(clip.readframes(clip.getnframes()), dtype=np.int16 if width == 2 else np.uint8)
+    if width != 2:
+        samples = ((samples.astype(np.int16) - 128) << 8).astype(np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != sample_rate:
+        positions = np.arange(0, len(samples), rate / sample_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+    return samples
+
+
+class EarconBank:
+    """
+    Short feedback sounds ("listening", "thinking", "done", "error") decoded
+    once into pygame Sounds in the mixer's own format, so playing one is a
+    single channel.play() with nothing to load, decode or resample. They
+    play on their own reserved channel and mix over speech instead of
+    waiting for it. Starting a sound cuts off the previous one.
+    """
+
+    def __init__(self, directory=EARCON_DIR, volume=0.35):
+        self.directory = directory
+        self.volume = volume
+        self.sounds = {}
+        self.channel = None
+        self._until = 0.0
+        self.stats = {"played": 0, "max_trigger_ms": 0.0}
+
+    def load(self):
+        """Builds every sound; the mixer must already be initialized."""
+        started = time.perf_counter()
+        sample_rate, _, channels = pygame.mixer.get_init()
+        for name, notes in EARCON_NOTES.items():
+            path = os.path.join(self.directory, f"{name}.wav")
+            samples = read_wav(path, sample_rate) if os.path.exists(path) else synthesize(notes, sample_rate, self.volume)
+            if channels > 1:
+                samples = np.repeat(samples[:, None], channels, axis=1)
+            self.sounds[name] = pygame.mixer.Sound(buffer=np.ascontiguousarray(samples).tobytes())
+        pygame.mixer.set_reserved(RESERVED_CHANNELS)
+        self.channel = pygame.mixer.Channel(EARCON_CHANNEL)
+        self.load_seconds = time.perf_counter() - started
+        return self
+
+    def play(self, name, loop=False):
+        started = time.perf_counter()
+        self.channel.play(self.sounds[name], loops=-1 if loop else 0)
+        self._until = float("inf") if loop else time.monotonic() + self.sounds[name].get_length()
+        self.stats["played"] += 1
+        self.stats["max_trigger_ms"] = max(self.stats["max_trigger_ms"], (time.perf_counter() - started) * 1000)
+
+    def stop(self, name=None):
+        """Stops the sound playing (only if it is `name`, when given)."""
+        if name is None or self.channel.get_sound() is self.sounds.get(name):
+            self.channel.stop()
+            self._until = 0.0
+
+    @property
+    def remaining(self):
+        """
+        Seconds until the current sound and its echo have died away, so a
+        listener can start after it rather than transcribe it.
+        """
+        if not self.channel.get_busy():
+            return 0.0
+        return max(0.0, self._until - time.monotonic()) + ECHO_TAIL_SECONDS
+
+    def report(self):
+        mixer = pygame.mixer.get_init()
+        return (f"sounds={len(self.sounds)} played={self.stats['played']} "
+                f"max_trigger_ms={self.stats['max_trigger_ms']:.2f} mixer={mixer}")
+
+
+if __name__ == "__main__":
+    # Plays each sound in turn (SDL_AUDIODRIVER=dummy runs it without a sound card)
+    pygame.mixer.init(frequency=22050, size=-16, channels=1)
+    bank = EarconBank().load()
+    print(f"Loaded {len(bank.sounds)} earcons in {bank.load_seconds * 1000:.1f} ms")
+    for name in EARCON_NOTES:
+        print(f"  {name} ({bank.sounds[name].get_length() * 1000:.0f} ms)")
+        bank.play(name)
+        time.sleep(bank.sounds[name].get_length() + 0.3)
+    print(bank.report())
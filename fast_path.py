@@ -0,0 +1,128 @@
+import re
+
+# Utterances made only of these words are plain device commands, anything else goes to the LLM
+POLITE_WORDS = {"jarvis", "hey", "please", "can", "could", "you", "the", "a", "now", "for", "me", "ok", "okay"}
+SERVO_WORDS = {"turn", "move", "rotate", "servo", "to", "left", "right", "center", "centre", "middle",
+               "straight", "forward", "degrees", "degree", "position", "look", "go", "face"}
+LED_WORDS = {"turn", "switch", "put", "on", "off", "led", "light", "lights"}
+SENSOR_WORDS = {"what", "what's", "whats", "is", "it", "current", "temperature", "temp", "humidity",
+                "air", "quality", "aqi", "gas", "level", "how", "hot", "cold", "warm", "humid", "in",
+                "here", "room", "tell", "check", "reading", "readings", "sensor", "sensors", "environment", "and"}
+
+# Fixed replies, also pre-synthesized into the TTS cache
+SERVO_REPLIES = {
+    180: "Rotating to the left position for you.",
+    0: "Rotating to the right position for you.",
+    90: "Centering the servo for you.",
+}
+LED_REPLIES = {
+    "on": "Turning the LED on.",
+    "off": "Turning the LED off.",
+}
+STOCK_REPLIES = list(SERVO_REPLIES.values()) + list(LED_REPLIES.values())
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _only(words, vocabulary):
+    return all(word in vocabulary or word in POLITE_WORDS or word.isdigit() for word in words)
+
+
+class FastPath:
+    """
+    Answers unambiguous device commands without an LLM round trip.
+
+    A command is handled locally only when every word in it belongs to the
+    vocabulary of one device (servo, LED or sensor read); the action runs
+    through the callbacks given here and the reply comes from a template.
+    Anything else returns None and should go to the LLM. Devices without a
+    callback always fall through.
+    """
+
+    def __init__(self, extract_angle=None, move_servo=None, set_led=None, read_sensors=None):
+        self.extract_angle = extract_angle
+        self.move_servo = move_servo
+        self.set_led = set_led
+        self.read_sensors = read_sensors
+        self.stats = {"handled": 0, "fell_through": 0, "local_seconds": 0.0, "llm_seconds": 0.0}
+
+    def handle(self, text):
+        """Runs the command and returns the reply, or None if the LLM should handle it."""
+        words = _words(text)
+        reply = None
+        if words:
+            reply = self._led(words) or self._servo(text, words) or self._sensors(words)
+
+        self.stats["fell_through" if reply is None else "handled"] += 1
+        return reply
+
+    def record_turn(self, seconds, local):
+        """Records how long a whole turn took, for comparing local and LLM turns."""
+        self.stats["local_seconds" if local else "llm_seconds"] += seconds
+
+    def report(self):
+        s = self.stats
+        total = s["handled"] + s["fell_through"]
+        rate = s["handled"] / total if total else 0.0
+        line = f"handled={s['handled']} fell_through={s['fell_through']} fast_path_rate={rate:.0%}"
+        if s["fell_through"] and s["handled"]:
+            average_llm = s["llm_seconds"] / s["fell_through"]
+            average_local = s["local_seconds"] / s["handled"]
+            saved = (average_llm - average_local) * s["handled"]
+            line += f" avg_llm_turn={average_llm:.2f}s avg_local_turn={average_local:.2f}s saved={saved:.1f}s"
+        return line
+
+    def _led(self, words):
+        if not self.set_led or not _only(words, LED_WORDS):
+            return None
+        if not ({"led", "light", "lights"} & set(words)):
+            return None
+        states = {"on", "off"} & set(words)
+        if len(states) != 1:
+            return None
+        state = states.pop()
+        result = self.set_led(state)
+        if isinstance(result, dict) and "error" in result:
+            return f"I couldn't switch the LED {state}: {result['error']}"
+        return LED_REPLIES[state]
+
+    def _servo(self, text, words):
+        if not self.move_servo or not self.extract_angle or not _only(words, SERVO_WORDS):
+            return None
+        # "left and right" and the like are not unambiguous
+        directions = {"left", "right", "center", "centre", "middle", "straight", "forward"} & set(words)
+        numbers = [word for word in words if word.isdigit()]
+        if len(directions) + len(numbers) != 1:
+            return None
+        angle = self.extract_angle(text)
+        if angle is None:
+            return None
+        self.move_servo(angle)
+        return SERVO_REPLIES.get(angle, f"Moving to {angle} degrees.")
+
+    def _sensors(self, words):
+        if not self.read_sensors or not _only(words, SENSOR_WORDS):
+            return None
+        asked = set(words)
+        wants_temperature = bool(asked & {"temperature", "temp", "hot", "cold", "warm"})
+        wants_humidity = bool(asked & {"humidity", "humid"})
+        wants_air = bool(asked & {"air", "quality", "aqi", "gas"})
+        wants_all = bool(asked & {"sensor", "sensors", "readings", "environment"})
+        if not (wants_temperature or wants_humidity or wants_air or wants_all):
+            return None
+
+        data = self.read_sensors()
+        if not data:
+            return None  # No reading to answer from, let the LLM explain
+
+        parts = []
+        if wants_temperature or wants_all:
+            parts.append(f"it's {data['temperature']:.1f} degrees")
+        if wants_humidity or wants_all:
+            parts.append(f"humidity is {data['humidity']:.0f} percent")
+        if wants_air or wants_all:
+            parts.append(f"air quality is {str(data['air_quality']).lower()} with an AQI of {data['aqi']:.0f}")
+        reply = ", ".join(parts[:-1]) + (" and " if len(parts) > 1 else "") + parts[-1]
+        return reply[0].upper() + reply[1:] + "."
@@ -1,13 +1,40 @@
+import os
+import sys
 import serial
 import time
 from datetime import datetime
 
-# Configure the serial connection
-ser = serial.Serial(
-    port='/dev/ttyUSB0',  # Change this if needed
-    baudrate=9600,
-    timeout=1
-)
+# Shared modules live in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from sensor_store import SensorStore, SENSOR_STORE_DIR
+import serial_daemon
+
+# If serial_daemon.py is running it owns the port and records the readings;
+# this script then only subscribes and prints them
+daemon = serial_daemon.connect()
+
+if not daemon:
+    # Readings are batched into compact column files (the same store v2.1.py uses)
+    # instead of one CSV append per line.
+    # Import old logs with: python sensor_store.py import hardware/sensor_data.csv
+    store = SensorStore(os.path.join(ROOT_DIR, SENSOR_STORE_DIR))
+
+    # Configure the serial connection
+    ser = serial.Serial(
+        port='/dev/ttyUSB0',  # Change this if needed
+        baudrate=9600,
+        timeout=1
+    )
+
+def print_reading(reading, now):
+    timestamp = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+    print(f"\nTime: {timestamp}")
+    print(f"Temperature: {reading['temperature']}°C")
+    print(f"Humidity: {reading['humidity']}%")
+    print(f"Gas Sensor Value: {reading['gas_value']}")
+    print(f"AQI: {reading['aqi']}")
+    print(f"Air Quality: {reading['air_quality']}")
 
 def read_sensor_data():
     try:
@@ -27,20 +54,18 @@ def read_sensor_data():
                     gas_value = float(gas_value)
                     aqi = float(aqi)
                     
-                    # Get current timestamp
-                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    reading = {
+                        'temperature': temp,
+                        'humidity': humidity,
+                        'gas_value': gas_value,
+                        'aqi': aqi,
+                        'air_quality': air_quality,
+                    }
+                    now = time.time()
+                    print_reading(reading, now)
                     
-                    # Print formatted data
-                    print(f"\nTime: {timestamp}")
-                    print(f"Temperature: {temp}°C")
-                    print(f"Humidity: {humidity}%")
-                    print(f"Gas Sensor Value: {gas_value}")
-                    print(f"AQI: {aqi}")
-                    print(f"Air Quality: {air_quality}")
-                    
-                    # Save to file
-                    with open('sensor_data.csv', 'a') as f:
-                        f.write(f"{timestamp},{temp},{humidity},{gas_value},{aqi},{air_quality}\n")
+                    # Save to the sensor store (flushed in batches)
+                    store.append(now, reading)
                         
                 except ValueError as ve:
                     # Print the problematic line for debugging
@@ -48,11 +73,21 @@ def read_sensor_data():
                     
     except Exception as e:
         print(f"Error: {e}")
-and
+
 def main():
     print("Starting sensor data collection...")
     print("Press Ctrl+C to stop")
     
+    if daemon:
+        daemon.subscribe(print_reading)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\nStopping data collection...")
+            daemon.close()
+        return
+    
     try:
         while True:
             read_sensor_data()
@@ -60,6 +95,7 @@ def main():
             
     except KeyboardInterrupt:
         print("\nStopping data collection...")
+        store.close()
         ser.close()
         
 if __name__ == "__main__":
@@ -1,20 +1,37 @@
+import os
+import sys
 import serial
 import time
 
+# Shared modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from actuator_queue import ServoQueue
+import serial_daemon
+
 class ServoController:
     def __init__(self, port='/dev/ttyUSB0', baudrate=9600):
+        # Go through serial_daemon.py if it owns the port
+        self.daemon = serial_daemon.connect()
+        if self.daemon:
+            return
         self.serial = serial.Serial(port, baudrate, timeout=1)
         time.sleep(2)  # Wait for Arduino to reset
+        self.queue = ServoQueue(lambda angle: self.serial.write(f"{angle}\n".encode()), initial_angle=90)
         
     def move_servo(self, angle):
+        """Returns a Future that resolves with the final angle once the servo gets there."""
         if 0 <= angle <= 180:
-            command = f"{angle}\n"
-            self.serial.write(command.encode())
-            time.sleep(0.1)  # Give servo time to move
+            if self.daemon:
+                return self.daemon.move_servo(angle)
+            return self.queue.move(angle)
         else:
             print("Angle must be between 0 and 180 degrees")
             
     def close(self):
+        if self.daemon:
+            self.daemon.close()
+            return
+        self.queue.close()
         self.serial.close()
 
 def main():
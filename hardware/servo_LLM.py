@@ -1,14 +1,21 @@
 import os
+import sys
 import time
 import io
 import serial
 import pygame
 import speech_recognition as sr
 from dotenv import load_dotenv
-from groq import Groq
-from elevenlabs import VoiceSettings, ElevenLabs
+from elevenlabs import VoiceSettings
 import re
 
+# Shared modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_sink import StreamingAudioSink
+from clients import client_pool
+from actuator_queue import ServoQueue
+import serial_daemon
+
 # --------------------------
 # Configuration
 # --------------------------
@@ -16,30 +23,46 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 
-elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-pygame.mixer.init()
+elevenlabs_client = client_pool.elevenlabs()
+pygame.mixer.init(frequency=22050, size=-16, channels=1)
+
+TTS_OUTPUT_FORMAT = "pcm_22050"
+audio_sink = StreamingAudioSink(TTS_OUTPUT_FORMAT)
 
 arduino_port = "/dev/ttyUSB0"  # Adjust to your system (e.g., "COM3" on Windows)
 baud_rate = 9600
 
-try:
-    arduino_serial = serial.Serial(arduino_port, baud_rate, timeout=1)
-    time.sleep(2)  # Wait for serial connection to initialize
-except serial.SerialException:
-    print("Failed to connect to Arduino.")
-    arduino_serial = None
+# When serial_daemon.py owns the port, send moves through it instead of opening (and resetting) the board
+daemon = serial_daemon.connect()
+arduino_serial = None
+if not daemon:
+    try:
+        arduino_serial = serial.Serial(arduino_port, baud_rate, timeout=1)
+        time.sleep(2)  # Wait for serial connection to initialize
+    except serial.SerialException:
+        print("Failed to connect to Arduino.")
+
+# Position commands go through a non-blocking queue (latest target wins)
+servo_queue = ServoQueue(lambda angle: arduino_serial.write(f"POS:{angle}\n".encode())) if arduino_serial else None
 
 # --------------------------
 # Helper Functions
 # --------------------------
 
 def send_command_to_arduino(command):
-    """Send a command to the Arduino followed by a newline."""
+    """
+    Send a command to the Arduino followed by a newline. POS:<angle> commands
+    are queued and return a Future; anything else is written directly.
+    """
+    if daemon and command.startswith("POS:"):
+        # The daemon encodes the move for whichever sketch is connected
+        print(f"Sending command to serial daemon: {command}")
+        return daemon.move_servo(int(command[4:]))
     if arduino_serial:
-        full_command = command + "\n"
-        print(f"Sending command to Arduino: {full_command.strip()}")
-        arduino_serial.write(full_command.encode())
-        time.sleep(0.1)  # Brief pause to allow Arduino to process
+        print(f"Sending command to Arduino: {command}")
+        if command.startswith("POS:"):
+            return servo_queue.move(int(command[4:]))
+        arduino_serial.write((command + "\n").encode())
     else:
         print("Arduino not connected. Skipping command.")
 
@@ -65,7 +88,7 @@ User input: "{user_input}"
 Your reply:"""
 
     print("Sending to LLM:", user_input)
-    client = Groq(api_key=GROQ_API_KEY)
+    client = client_pool.groq()
     chat_completion = client.chat.completions.create(
         messages=[{"role": "system", "content": prompt}],
         model="llama-3.3-70b-versatile",
@@ -135,7 +158,7 @@ def text_to_speech_and_play(text, servo_command):
 
     response = elevenlabs_client.text_to_speech.convert(
         voice_id="pNInz6obpgDQGcFmaJgB",  # Adam's voice
-        output_format="mp3_22050_32",
+        output_format=TTS_OUTPUT_FORMAT,
         text=text,
         model_id="eleven_turbo_v2_5",
         voice_settings=VoiceSettings(
@@ -146,26 +169,13 @@ def text_to_speech_and_play(text, servo_command):
         ),
     )
 
-    audio_data = io.BytesIO()
-    for chunk in response:
-        if chunk:
-            audio_data.write(chunk)
-    audio_data.seek(0)
-
-    # Save to temporary file
-    temp_audio_file = "/tmp/speech.mp3"
-    with open(temp_audio_file, "wb") as f:
-        f.write(audio_data.getvalue())
-
-    pygame.mixer.music.load(temp_audio_file)
-    pygame.mixer.music.play()
-
-    # Execute the servo command while speech is playing
-    if servo_command:
-        send_command_to_arduino(servo_command)
+    # Execute the servo command as soon as speech starts playing
+    def on_start():
+        if servo_command:
+            send_command_to_arduino(servo_command)
 
-    while pygame.mixer.music.get_busy():
-        pygame.time.Clock().tick(10)
+    # Audio plays while it is still downloading, no temporary file needed
+    audio_sink.play(response, on_start=on_start)
 
     print("Speech finished playing.")
 
@@ -182,6 +192,8 @@ print("Listening... Speak now!")
 # --------------------------
 
 def main():
+    client_pool.warm_up(["groq", "elevenlabs"])
+    client_pool.start_keepalive()
     try:
         with mic as source:
             recognizer.adjust_for_ambient_noise(source)  # Reduce background noise
@@ -222,7 +234,10 @@ def main():
     except KeyboardInterrupt:
         print("\nExiting...")
     finally:
+        if daemon:
+            daemon.close()
         if arduino_serial:
+            servo_queue.close()
             arduino_serial.close()
             print("Serial connection closed.")
 
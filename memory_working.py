@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-from groq import Groq
+from clients import client_pool
 
 # Load environment variables
 load_dotenv()
@@ -14,7 +14,7 @@ history = [
 def send_to_llm(text):
     global history  # Keep track of past messages
 
-    client = Groq(api_key=GROQ_API_KEY)
+    client = client_pool.groq()
 
     # Add user input to history
     history.append({"role": "user", "content": text})
@@ -0,0 +1,262 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from startup import lazy_import
+from vad import Endpointer, FrameVAD
+
+sr = lazy_import("speech_recognition")
+
+NOISE_WINDOW_SECONDS = 8.0  # Energy history the noise floor is estimated from
+NOISE_PERCENTILE = 20       # Speech rarely fills more than 80% of a window, so this stays on background noise
+MIN_ENERGY_THRESHOLD = 50
+BUFFER_SECONDS = 10.0       # Audio kept while nobody is listening (older frames are discarded)
+PREROLL_SECONDS = 0.3       # Audio kept from before speech was detected, so first syllables aren't clipped
+
+
+def frame_energy(data):
+    """RMS of a block of 16-bit PCM (same measure recognizer.listen uses)."""
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+
+class MicStream:
+    """
+    Microphone kept open for the whole session.
+
+    A background thread reads the input stream continuously, so no turn pays
+    for reopening the device or for adjust_for_ambient_noise(). The noise floor
+    is a low percentile of recent frame energies and the recognizer's
+    energy_threshold follows it (floor * dynamic_energy_ratio). listen() is a
+    drop-in for recognizer.listen(source): it returns sr.AudioData, raises
+    sr.WaitTimeoutError, honours pause_threshold and phrase_time_limit, and
+    starts from the audio arriving after the call, so our own speech that
+    played before it is never picked up.
+
+    With use_vad, utterances are found by the frame-level Endpointer in
+    vad.py instead of pause_threshold, which ends a turn a few hundred
+    milliseconds after the speaker stops rather than a second later.
+    """
+
+    def __init__(self, recognizer=None, microphone=None, use_vad=False):
+        self.use_vad = use_vad
+        self.endpointer = None
+        self.recognizer = recognizer or sr.Recognizer()
+        self.recognizer.dynamic_energy_threshold = False  # Tracked here instead
+        self.microphone = microphone or sr.Microphone()
+        self.source = None
+        self.noise_floor = None
+        self._hold = 0
+        self._frames = deque()
+        self._count = 0  # Frames read so far; _frames holds the newest ones
+        self._energies = deque()
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"frames": 0, "dropped": 0, "utterances": 0, "timeouts": 0, "read_errors": 0}
+
+    def start(self, calibrate_seconds=0.5):
+        """Opens the device, starts the reader and waits for a first noise estimate."""
+        self.source = self.microphone.__enter__()
+        seconds_per_frame = self.source.CHUNK / self.source.SAMPLE_RATE
+        self._frames = deque(maxlen=max(1, int(BUFFER_SECONDS / seconds_per_frame)))
+        self._energies = deque(maxlen=max(1, int(NOISE_WINDOW_SECONDS / seconds_per_frame)))
+        if self.use_vad:
+            self.endpointer = Endpointer(FrameVAD(self.source.SAMPLE_RATE))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        needed = max(1, int(calibrate_seconds / seconds_per_frame))
+        with self._condition:
+            self._condition.wait_for(lambda: self._count >= needed or self._stop.is_set(), timeout=calibrate_seconds + 2)
+            self._update_floor()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self.source:
+            self.microphone.__exit__(None, None, None)
+            self.source = None
+
+    @property
+    def closed(self):
+        return self._stop.is_set()
+
+    @property
+    def seconds_per_frame(self):
+        return self.source.CHUNK / self.source.SAMPLE_RATE
+
+    @contextmanager
+    def hold_noise_floor(self):
+        """Freezes the estimate, e.g. while our own speech is playing through the speaker."""
+        with self._condition:
+            self._hold += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._hold -= 1
+
+    @property
+    def position(self):
+        """Number of the next frame to be read (a cursor for next_frame() and listen(start=...))."""
+        with self._condition:
+            return self._count
+
+    def listen(self, timeout=None, phrase_time_limit=None, on_audio=None, start=None):
+        """
+        Waits for the next phrase and returns it as sr.AudioData. on_audio, if
+        given, receives the phrase's audio while it is still being spoken
+        (pre-roll first, then each block), e.g. to feed a streaming recognizer.
+        start is a frame cursor to listen from instead of now, e.g. the frame
+        right after a wake word, so speech that followed it isn't missed.
+        """
+        if self.endpointer:
+            return self._listen_vad(timeout, phrase_time_limit, on_audio, start)
+        seconds_per_frame = self.seconds_per_frame
+        pause_frames = int(np.ceil(self.recognizer.pause_threshold / seconds_per_frame))
+        tail_frames = int(np.ceil(self.recognizer.non_speaking_duration / seconds_per_frame))
+        preroll = deque(maxlen=max(1, int(PREROLL_SECONDS / seconds_per_frame)))
+        limit_frames = int(phrase_time_limit / seconds_per_frame) if phrase_time_limit else None
+
+        with self._condition:
+            cursor = self._count if start is None else start  # Start with the audio that arrives from now on
+        started = time.monotonic()
+
+        # Wait for the first frame above the threshold
+        while True:
+            remaining = None if timeout is None else timeout - (time.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                self.stats["timeouts"] += 1
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            frame, cursor = self.next_frame(cursor, remaining)
+            if frame is None:
+                continue
+            data, energy = frame
+            preroll.append(data)
+            if energy > self.recognizer.energy_threshold:
+                break
+
+        phrase = list(preroll)
+        if on_audio:
+            on_audio(b"".join(phrase))
+        silent = 0
+        while silent <= pause_frames and (limit_frames is None or len(phrase) < limit_frames):
+            frame, cursor = self.next_frame(cursor, None)
+            data, energy = frame
+            phrase.append(data)
+            if on_audio:
+                on_audio(data)
+            silent = silent + 1 if energy <= self.recognizer.energy_threshold else 0
+
+        # Keep only non_speaking_duration of the trailing silence, like recognizer.listen
+        if silent > tail_frames:
+            phrase = phrase[:len(phrase) - (silent - tail_frames)]
+        self.stats["utterances"] += 1
+        return sr.AudioData(b"".join(phrase), self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+
+    def _listen_vad(self, timeout, phrase_time_limit, on_audio=None, start=None):
+        endpointer = self.endpointer
+        endpointer.reset()
+        width = self.source.SAMPLE_WIDTH
+        bytes_per_second = self.source.SAMPLE_RATE * width
+        keep_before_speech = int(PREROLL_SECONDS * bytes_per_second)
+        heard = bytearray()  # Audio since the call, minus `dropped` bytes trimmed off the front
+        dropped = 0
+        with self._condition:
+            cursor = self._count if start is None else start
+        started = time.monotonic()
+
+        def offset(seconds):
+            # Endpointer positions count from the call; map them into `heard`
+            position = int(seconds * bytes_per_second) - dropped
+            return max(0, min(len(heard), position - position % width))
+
+        while True:
+            remaining = None
+            if not endpointer.in_speech and timeout is not None:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            frame, cursor = self.next_frame(cursor, remaining)
+            if frame is None:
+                continue
+            heard += frame[0]
+            event = endpointer.process(frame[0])
+            if on_audio:
+                if event == "start":
+                    on_audio(bytes(heard[offset(endpointer.seconds(endpointer.start_frame) - PREROLL_SECONDS):]))
+                elif endpointer.in_speech or event == "end":
+                    on_audio(frame[0])
+            if event == "end":
+                end = offset(endpointer.audio_end)
+                break
+            if endpointer.in_speech:
+                spoken = (dropped + len(heard)) / bytes_per_second - endpointer.seconds(endpointer.start_frame)
+                if phrase_time_limit and spoken >= phrase_time_limit:
+                    end = len(heard)
+                    break
+            elif len(heard) > 2 * keep_before_speech:
+                # No speech yet: keep just enough for the pre-roll
+                trim = len(heard) - keep_before_speech
+                trim -= trim % width
+                del heard[:trim]
+                dropped += trim
+
+        first = offset(endpointer.seconds(endpointer.start_frame) - PREROLL_SECONDS)
+        self.stats["utterances"] += 1
+        return sr.AudioData(bytes(heard[first:end]), self.source.SAMPLE_RATE, width)
+
+    def report(self):
+        floor = f"{self.noise_floor:.0f}" if self.noise_floor is not None else "n/a"
+        return (f"noise_floor={floor} energy_threshold={self.recognizer.energy_threshold:.0f} "
+                + " ".join(f"{key}={value}" for key, value in self.stats.items()))
+
+    def next_frame(self, cursor, timeout):
+        """
+        Frame number `cursor` (or the oldest still buffered) as (data, energy)
+        plus the next cursor, waiting for it if needed; (None, cursor) on timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._count > cursor or self._stop.is_set(), timeout=timeout):
+                return None, cursor
+            if self._stop.is_set() and self._count <= cursor:
+                raise sr.WaitTimeoutError("microphone stream closed")
+            oldest = self._count - len(self._frames)
+            if cursor < oldest:
+                self.stats["dropped"] += oldest - cursor
+                cursor = oldest
+            return self._frames[cursor - oldest], cursor + 1
+
+    def _run(self):
+        frames_per_update = max(1, int(0.5 / self.seconds_per_frame))
+        while not self._stop.is_set():
+            try:
+                data = self.source.stream.read(self.source.CHUNK)
+            except Exception as e:
+                self.stats["read_errors"] += 1
+                print(f"Microphone read error: {e}")
+                time.sleep(0.1)
+                continue
+            energy = frame_energy(data)
+            with self._condition:
+                self._frames.append((data, energy))
+                self._count += 1
+                self.stats["frames"] += 1
+                if not self._hold:
+                    self._energies.append(energy)
+                    if self._count % frames_per_update == 0:
+                        self._update_floor()
+                self._condition.notify_all()
+
+    def _update_floor(self):
+        if not self._energies:
+            return
+        self.noise_floor = float(np.percentile(np.fromiter(self._energies, dtype=np.float32), NOISE_PERCENTILE))
+        self.recognizer.energy_threshold = max(
+            MIN_ENERGY_THRESHOLD, self.noise_floor * self.recognizer.dynamic_energy_ratio)
@@ -0,0 +1,127 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Stage:
+    """
+    One step of a pipeline. `handler(item, emit)` is a coroutine that
+    processes one item from the stage's inbox and passes any number of
+    results on with `await emit(result)`; emit waits while the next stage's
+    inbox is full, which is the back-pressure. The first stage has no inbox
+    and its handler is called with None over and over (it is the source).
+
+    Blocking work belongs in `await asyncio.to_thread(...)` so the other
+    stages keep running.
+    """
+
+    def __init__(self, name, handler, maxsize=1):
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.inbox = None
+        self.next = None
+        self.on_error = None
+        self._blocked = 0.0
+        self.stats = {"items": 0, "errors": 0, "busy_seconds": 0.0, "max_seconds": 0.0, "blocked_seconds": 0.0}
+
+    @property
+    def depth(self):
+        """Items waiting in this stage's inbox."""
+        return self.inbox.qsize() if self.inbox is not None else 0
+
+    @property
+    def service_time(self):
+        """Average seconds spent per item, not counting time blocked on the next stage."""
+        return self.stats["busy_seconds"] / self.stats["items"] if self.stats["items"] else None
+
+    async def emit(self, item):
+        started = time.perf_counter()
+        await self.next.inbox.put(item)
+        self._blocked += time.perf_counter() - started
+
+    async def run(self):
+        while True:
+            item = await self.inbox.get() if self.inbox is not None else None
+            self._blocked = 0.0
+            started = time.perf_counter()
+            try:
+                await self.handler(item, self.emit)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Error in {self.name} stage: {e}")
+                if self.on_error:
+                    self.on_error(self, e)
+            busy = time.perf_counter() - started - self._blocked
+            self.stats["items"] += 1
+            self.stats["busy_seconds"] += busy
+            self.stats["max_seconds"] = max(self.stats["max_seconds"], busy)
+            self.stats["blocked_seconds"] += self._blocked
+
+
+class Pipeline:
+    """
+    Stages connected in order by bounded asyncio queues, each stage running
+    as its own task so a slow one holds up only what is queued behind it.
+
+        pipeline = Pipeline([Stage("listen", listen), Stage("reply", reply, maxsize=1)])
+        pipeline.run()  # until Ctrl+C or pipeline.stop()
+        print(pipeline.report())
+
+    A handler that raises loses just that item; the error is printed,
+    counted and passed to on_error(stage, error) if given.
+    """
+
+    def __init__(self, stages, max_threads=8, on_error=None):
+        self.stages = stages
+        self.max_threads = max_threads
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+        for stage in stages:
+            stage.on_error = on_error
+        self.loop = None
+        self._running = None
+
+    def run(self):
+        """Runs the stages until interrupted. Blocking calls run on a pool of max_threads threads."""
+        self.loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="stage")
+        self.loop.set_default_executor(executor)
+        for stage in self.stages[1:]:
+            stage.inbox = asyncio.Queue(maxsize=stage.maxsize)
+        tasks = [self.loop.create_task(stage.run(), name=stage.name) for stage in self.stages]
+        running = self._running = asyncio.gather(*tasks)
+        try:
+            self.loop.run_until_complete(running)
+        except asyncio.CancelledError:
+            pass  # stop()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            if running.done() and not running.cancelled():
+                running.exception()  # Already propagated; marks it as seen
+            self.loop.close()
+            # Threads still inside a blocking call finish on their own; don't wait for them here
+            executor.shutdown(wait=False)
+
+    def stop(self):
+        """Makes run() return; safe to call from a stage or any other thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._running.cancel)
+        except (AttributeError, RuntimeError):
+            pass  # Not running (yet, or any more)
+
+    def report(self):
+        lines = ["Pipeline:"]
+        for stage in self.stages:
+            s = stage.stats
+            average = stage.service_time
+            lines.append(
+                f"  {stage.name:<11} depth={stage.depth}/{stage.maxsize if stage.inbox is not None else '-'} "
+                f"items={s['items']} errors={s['errors']} "
+                f"avg={'n/a' if average is None else f'{average * 1000:.0f}ms'} max={s['max_seconds'] * 1000:.0f}ms "
+                f"blocked={s['blocked_seconds']:.1f}s")
+        return "\n".join(lines)
@@ -0,0 +1,139 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# Words that don't change what is being asked
+FILLER_WORDS = {"jarvis", "hey", "please", "ok", "okay", "um", "uh", "so", "now", "the", "a"}
+
+# Utterances that lean on the previous turn ("yes", "why?", "do it again") mean something
+# different every time; any of these words keeps a turn out of the cache
+CONTEXT_WORDS = {"it", "its", "that", "this", "these", "those", "they", "them", "he", "she", "him", "her",
+                 "again", "more", "another", "else", "instead", "same", "too", "also", "then",
+                 "yes", "yeah", "no", "nope", "why"}
+
+# Sensor readings are bucketed so tiny fluctuations don't defeat the cache
+SENSOR_BUCKETS = {
+    "temperature": 1.0,
+    "humidity": 5.0,
+    "gas_value": 50.0,
+    "aqi": 10.0,
+}
+
+
+def normalize_utterance(text):
+    """Lowercases, strips punctuation and filler words, collapses whitespace."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+def sensor_bucket(sensor_data):
+    """Coarse, hashable snapshot of the sensor readings (None when there are none)."""
+    if not sensor_data:
+        return None
+    bucket = []
+    for field, step in SENSOR_BUCKETS.items():
+        value = sensor_data.get(field)
+        bucket.append((field, None if value is None else int(value // step)))
+    bucket.append(("air_quality", sensor_data.get("air_quality")))
+    return tuple(bucket)
+
+
+def _features(normalized):
+    words = normalized.split()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def _numbers(normalized):
+    return [word for word in normalized.split() if word.isdigit()]
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of LLM replies keyed on the normalized utterance, a bucketed
+    sensor snapshot and any other context (e.g. the servo angle). Utterances
+    that refer back to the conversation get no key and always go to the LLM.
+
+    With `similarity` set, a miss falls back to the most similar cached
+    utterance with the same context (Jaccard over words and word pairs, numbers
+    must match exactly) if it scores at least that much.
+    """
+
+    def __init__(self, max_entries=256, ttl=600, similarity=0.8):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()  # key -> (response, stored_at, features)
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "expired": 0, "evictions": 0,
+                      "uncacheable": 0}
+
+    def make_key(self, text, sensor_data=None, *context):
+        """Cache key for a turn, or None when its meaning depends on the conversation so far."""
+        normalized = normalize_utterance(text)
+        words = normalized.split()
+        if not words or CONTEXT_WORDS.intersection(words):
+            with self._lock:
+                self.stats["uncacheable"] += 1
+            return None
+        return (normalized, sensor_bucket(sensor_data)) + tuple(context)
+
+    def get(self, key):
+        """Returns a cached reply for the key or None."""
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] > self.ttl:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry[0]
+
+            if self.similarity:
+                match = self._most_similar(key, now)
+                if match:
+                    self._entries.move_to_end(match)
+                    self.stats["similar_hits"] += 1
+                    return self._entries[match][0]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, response):
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (response, time.monotonic(), _features(key[0]))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def hit_rate(self):
+        hits = self.stats["exact_hits"] + self.stats["similar_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def report(self):
+        return " ".join(f"{name}={value}" for name, value in self.stats.items()) + f" hit_rate={self.hit_rate():.0%}"
+
+    def _most_similar(self, key, now):
+        features = _features(key[0])
+        numbers = _numbers(key[0])
+        if not features:
+            return None
+        best_key, best_score = None, self.similarity
+        for other_key, (_, stored_at, other_features) in self._entries.items():
+            if other_key[1:] != key[1:] or now - stored_at > self.ttl:
+                continue
+            if _numbers(other_key[0]) != numbers:
+                continue
+            score = len(features & other_features) / len(features | other_features)
+            if score >= best_score:
+                best_key, best_score = other_key, score
+        return best_key
@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import zlib
+import threading
+
+import numpy as np
+
+INDEX_DIR = "turn_index"
+EMBED_BATCH_SIZE = 64
+
+# Words too common to say anything about what a turn was about
+STOPWORDS = set("""a an the and or but if of to in on at by for with from as is are was were be been
+it its it's this that these those i you he she we they me my your our their what's what which who
+do does did can could would should will just so not no yes please there here about""".split())
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder: hashed word unigrams and bigrams with signed
+    counts, L2-normalized. Good enough to find past turns about the same topic.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [w for w in re.findall(r"[a-z0-9']+", text.lower()) if w not in STOPWORDS]
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.name = f"st:{model_name}"
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=EMBED_BATCH_SIZE, convert_to_numpy=True)
+        return _normalize(vectors.astype(np.float32))
+
+
+def make_embedder():
+    """Uses sentence-transformers when it loads, otherwise the hashing embedder."""
+    try:
+        return SentenceTransformerEmbedder()
+    except ImportError:
+        return HashingEmbedder()
+    except Exception as e:
+        # Installed but unusable, e.g. the model couldn't be downloaded
+        print(f"Sentence-transformers unavailable ({e}), using the hashing embedder")
+        return HashingEmbedder()
+
+
+class TurnIndex:
+    """
+    On-disk embedding index of past conversation turns.
+
+    Vectors live in a float32 matrix memory-mapped from `vectors.f32` (grown by
+    doubling), turn texts in `turns.jsonl` and the row count in `meta.json`.
+    Search is a single matrix-vector product followed by argpartition top-k.
+    """
+
+    def __init__(self, directory=INDEX_DIR, embedder=None):
+        self.directory = directory
+        self.embedder = embedder or make_embedder()
+        self.dim = self.embedder.dim
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._turns_path = os.path.join(directory, "turns.jsonl")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._open()
+
+    def __len__(self):
+        return self.count
+
+    def add_turn(self, user_text, reply_text):
+        """Embeds and stores one user/assistant exchange."""
+        self.add_turns([(user_text, reply_text)])
+
+    def add_turns(self, turns):
+        turns = [(user_text, reply_text) for user_text, reply_text in turns]
+        if not turns:
+            return
+        vectors = self.embedder.embed([f"{user_text}\n{reply_text}" for user_text, reply_text in turns])
+        with self._lock:
+            self._ensure_capacity(self.count + len(turns))
+            self.vectors[self.count:self.count + len(turns)] = vectors
+            self.vectors.flush()
+            with open(self._turns_path, "a", encoding="utf-8") as file:
+                for user_text, reply_text in turns:
+                    file.write(json.dumps({"user": user_text, "reply": reply_text}, ensure_ascii=False) + "\n")
+            self.turns.extend(turns)
+            self.count += len(turns)
+            self._save_meta()
+
+    def search(self, query, top_k=3, min_score=0.2):
+        """Returns up to top_k (score, user_text, reply_text) tuples, best first."""
+        with self._lock:
+            if self.count == 0:
+                return []
+            query_vector = self.embedder.embed([query])[0]
+            scores = self.vectors[:self.count] @ query_vector
+            k = min(top_k, self.count)
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            return [(float(scores[i]),) + self.turns[i] for i in best if scores[i] >= min_score]
+
+    def _open(self):
+        meta = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+        if meta and (meta.get("dim") != self.dim or meta.get("embedder") != self.embedder.name):
+            raise ValueError(
+                f"Index in {self.directory} was built with {meta.get('embedder')} ({meta.get('dim')} dims); "
+                f"delete it and backfill again to use {self.embedder.name}"
+            )
+
+        self.turns = []
+        clean = True  # Every line in the file is a whole record
+        if os.path.exists(self._turns_path):
+            with open(self._turns_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        if not line.endswith("\n"):
+                            raise ValueError("torn line")
+                        record = json.loads(line)
+                        self.turns.append((record["user"], record["reply"]))
+                    except (ValueError, KeyError):
+                        clean = False
+                        break
+
+        # Trust only rows that made it into both the matrix and the text file
+        self.count = min(meta.get("count", 0), len(self.turns))
+        if not clean or len(self.turns) > self.count:
+            # A crash between appending texts and saving meta left extra or torn lines; later
+            # appends would land after them and misalign texts with vector rows
+            self.turns = self.turns[:self.count]
+            self._rewrite_turns()
+        self.capacity = max(meta.get("capacity", 0), 1024)
+
+        mode = "r+" if os.path.exists(self._vectors_path) else "w+"
+        if mode == "r+" and os.path.getsize(self._vectors_path) < self.capacity * self.dim * 4:
+            self._resize_file(self.capacity)
+        self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+
+    def _ensure_capacity(self, needed):
+        if needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self.vectors.flush()
+        del self.vectors
+        self._resize_file(capacity)
+        self.capacity = capacity
+        self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _resize_file(self, capacity):
+        with open(self._vectors_path, "ab") as file:
+            file.truncate(capacity * self.dim * 4)
+
+    def _rewrite_turns(self):
+        temp_path = self._turns_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for user_text, reply_text in self.turns:
+                file.write(json.dumps({"user": user_text, "reply": reply_text}, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self._turns_path)
+
+    def _save_meta(self):
+        temp_path = self._meta_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "count": self.count,
+                "capacity": self.capacity,
+                "dim": self.dim,
+                "embedder": self.embedder.name,
+            }, file)
+        os.replace(temp_path, self._meta_path)
+
+
+def iter_turns(messages):
+    """Pairs each user message with the assistant reply that follows it."""
+    user_text = None
+    for message in messages:
+        role = message.get("role")
+        if role == "user":
+            user_text = message.get("content", "")
+        elif role == "assistant" and user_text is not None:
+            yield user_text, message.get("content", "")
+            user_text = None
+
+
+def backfill(index, memory_path, batch_size=EMBED_BATCH_SIZE):
+    """Embeds every turn of a chat_memory.json (list) or .jsonl journal into the index."""
+    with open(memory_path, "r", encoding="utf-8") as file:
+        if memory_path.endswith(".jsonl"):
+            messages = [json.loads(line) for line in file if line.strip()]
+        else:
+            messages = json.load(file)
+
+    batch = []
+    added = 0
+    for turn in iter_turns(messages):
+        batch.append(turn)
+        if len(batch) >= batch_size:
+            index.add_turns(batch)
+            added += len(batch)
+            batch = []
+    if batch:
+        index.add_turns(batch)
+        added += len(batch)
+    return added
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ("backfill", "search"):
+        print("Usage: python retrieval.py backfill <chat_memory.json|chat_memory.jsonl>")
+        print("       python retrieval.py search <query>")
+        sys.exit(1)
+
+    index = TurnIndex()
+    if sys.argv[1] == "backfill":
+        added = backfill(index, sys.argv[2])
+        print(f"Indexed {added} turns ({len(index)} total) in {INDEX_DIR}/")
+    else:
+        for score, user_text, reply_text in index.search(" ".join(sys.argv[2:]), top_k=5, min_score=0.0):
+            print(f"{score:.3f}  {user_text!r} -> {reply_text[:80]!r}")
@@ -0,0 +1,265 @@
+import re
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from sensor_store import AIR_QUALITY_LEVELS
+
+# Whole words only, so each variant is listed ("hotel", "airport" and "temporary" aren't sensor questions)
+FIELD_KEYWORDS = {
+    "temperature": ("temperature", "temperatures", "temp", "temps", "hot", "hotter", "cold", "colder",
+                    "warm", "warmer"),
+    "humidity": ("humidity", "humid"),
+    "aqi": ("air quality", "air", "aqi", "pollution", "polluted"),
+    "gas_value": ("gas", "gases"),
+}
+FIELD_LABELS = {
+    "temperature": ("Temperature", "°C"),
+    "humidity": ("Humidity", "%"),
+    "aqi": ("AQI", ""),
+    "gas_value": ("Gas sensor", ""),
+}
+# AQI category limits from sensors.ino
+DEFAULT_THRESHOLDS = {"aqi": (50, 100, 150, 200, 300)}
+# A value has to get this far past a threshold to count as a crossing, so noise doesn't flap
+HYSTERESIS = {"temperature": 0.3, "humidity": 2.0, "aqi": 5.0, "gas_value": 10.0}
+
+# Finest level that still keeps a query over the span small
+RAW_MAX_SPAN = 2 * 3600
+MINUTE_MAX_SPAN = 2 * 86400
+
+UNITS = {"minute": 60, "min": 60, "hour": 3600, "day": 86400, "week": 7 * 86400}
+
+
+def parse_window(text, now=None):
+    """
+    Finds the time window a question refers to ("since this morning",
+    "last 3 hours", "yesterday", "since 9 am", ...). Returns (start, end,
+    label) as timestamps, or None if the question doesn't name a window.
+    """
+    now = now or time.time()
+    current = datetime.fromtimestamp(now)
+    midnight = current.replace(hour=0, minute=0, second=0, microsecond=0)
+    text = text.lower()
+
+    match = re.search(r"\b(?:last|past)\s+(\d+|a|an|one|two|three|few)?\s*(minute|min|hour|day|week)s?\b", text)
+    if match:
+        count = {"a": 1, "an": 1, "one": 1, None: 1, "two": 2, "three": 3, "few": 3}.get(match.group(1))
+        count = count if count is not None else int(match.group(1))
+        seconds = count * UNITS[match.group(2)]
+        return now - seconds, now, match.group(0)
+
+    match = re.search(r"\bsince\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b", text)
+    if match:
+        hour = int(match.group(1)) % 12 if match.group(3) else int(match.group(1))
+        if match.group(3) == "pm":
+            hour += 12
+        if hour < 24:
+            start = midnight.replace(hour=hour, minute=int(match.group(2) or 0))
+            if start > current:
+                start -= timedelta(days=1)
+            return start.timestamp(), now, match.group(0)
+
+    if "yesterday" in text:
+        return (midnight - timedelta(days=1)).timestamp(), midnight.timestamp(), "yesterday"
+    if "this morning" in text:
+        return midnight.replace(hour=6).timestamp(), now, "since this morning"
+    if "this afternoon" in text:
+        return midnight.replace(hour=12).timestamp(), now, "since this afternoon"
+    if "this evening" in text or "tonight" in text:
+        return midnight.replace(hour=18).timestamp(), now, "since this evening"
+    if "today" in text:
+        return midnight.timestamp(), now, "today"
+    if "this week" in text:
+        return (midnight - timedelta(days=current.weekday())).timestamp(), now, "this week"
+    return None
+
+
+def detect_fields(text):
+    """Sensor fields a question mentions, matching FIELD_KEYWORDS as whole words."""
+    text = text.lower()
+    return [field for field, keywords in FIELD_KEYWORDS.items()
+            if any(re.search(rf"\b{re.escape(k)}\b", text) for k in keywords)]
+
+
+def _clock(timestamp, now):
+    moment = datetime.fromtimestamp(timestamp)
+    if moment.date() == datetime.fromtimestamp(now).date():
+        return moment.strftime("%H:%M")
+    return moment.strftime("%b %d %H:%M")
+
+
+class SensorHistory:
+    """
+    Answers questions about stored sensor history with vectorized NumPy over
+    the columns of a SensorStore. Short windows use raw samples, longer ones
+    the minute or hour rollups, so a year of one-second data is still only a
+    few thousand rows.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def level_for(self, start, end):
+        span = end - start
+        if span <= RAW_MAX_SPAN:
+            return "raw"
+        if span <= MINUTE_MAX_SPAN:
+            return "minute"
+        return "hour"
+
+    def series(self, field, start, end):
+        """Returns (times, mean, minimum, maximum, counts) arrays for a field over the window."""
+        level = self.level_for(start, end)
+        columns = self.store.load(level, start, end)
+        if level == "raw":
+            values = columns[field].astype(np.float64)
+            return columns["timestamp"], values, values, values, np.ones(len(values))
+        return (
+            columns["start"],
+            columns[f"{field}_mean"].astype(np.float64),
+            columns[f"{field}_min"].astype(np.float64),
+            columns[f"{field}_max"].astype(np.float64),
+            columns["count"].astype(np.float64),
+        )
+
+    def summary(self, field, start, end, thresholds=None):
+        """Aggregates for one field over [start, end), or None when there is no data."""
+        times, mean, minimum, maximum, counts = self.series(field, start, end)
+        if len(times) == 0:
+            return None
+
+        low = int(np.argmin(minimum))
+        high = int(np.argmax(maximum))
+        result = {
+            "field": field,
+            "samples": int(counts.sum()),
+            "first": float(mean[0]),
+            "last": float(mean[-1]),
+            "delta": float(mean[-1] - mean[0]),
+            "mean": float(np.average(mean, weights=counts)),
+            "min": float(minimum[low]),
+            "min_time": float(times[low]),
+            "max": float(maximum[high]),
+            "max_time": float(times[high]),
+            "crossings": [],
+        }
+
+        # A crossing is a change between clearly above (+1) and clearly below (-1);
+        # samples inside the hysteresis band keep the previous state
+        band = HYSTERESIS.get(field, 0.0)
+        positions = np.arange(len(mean))
+        for threshold in thresholds if thresholds is not None else DEFAULT_THRESHOLDS.get(field, ()):
+            state = np.where(mean > threshold + band, 1, np.where(mean < threshold - band, -1, 0))
+            state = state[np.maximum.accumulate(np.where(state != 0, positions, 0))]
+            changes = np.flatnonzero((state[1:] != state[:-1]) & (state[:-1] != 0)) + 1
+            for index in changes:
+                result["crossings"].append((float(times[index]), threshold, "up" if state[index] > 0 else "down"))
+        result["crossings"].sort()
+        return result
+
+    def describe(self, text, now=None):
+        """
+        Compact plain-text summary of the history a question asks about, for
+        the LLM prompt. None if the question doesn't name a time window.
+        """
+        now = now or time.time()
+        window = parse_window(text, now)
+        if not window:
+            return None
+        start, end, label = window
+        fields = detect_fields(text) or ["temperature", "humidity", "aqi"]
+
+        lines = []
+        for field in fields:
+            summary = self.summary(field, start, end)
+            name, unit = FIELD_LABELS[field]
+            if not summary:
+                lines.append(f"{name} {label}: no readings recorded.")
+                continue
+            line = (f"{name} {label}: {summary['first']:.1f}{unit} -> {summary['last']:.1f}{unit} "
+                    f"({summary['delta']:+.1f}), mean {summary['mean']:.1f}{unit}, "
+                    f"min {summary['min']:.1f}{unit} at {_clock(summary['min_time'], now)}, "
+                    f"max {summary['max']:.1f}{unit} at {_clock(summary['max_time'], now)}.")
+            crossings = summary["crossings"]
+            if crossings:
+                described = ", ".join(
+                    f"{'rose above' if direction == 'up' else 'fell below'} {threshold:g} at {_clock(moment, now)}"
+                    for moment, threshold, direction in crossings[-3:]
+                )
+                more = f" ({len(crossings)} crossings in total)" if len(crossings) > 3 else ""
+                line += f" It {described}{more}."
+            if field == "aqi":
+                level = min(int(np.searchsorted(DEFAULT_THRESHOLDS["aqi"], summary["last"])), len(AIR_QUALITY_LEVELS) - 1)
+                line += f" Currently {AIR_QUALITY_LEVELS[level]}."
+            lines.append(line)
+        return " ".join(lines)
+
+
+if __name__ == "__main__":
+    # Benchmark: a year of one-second samples (as rollups plus the last two days of raw data)
+    import os
+    import sys
+    import tempfile
+    from sensor_store import SensorStore, ROLLUP_COLUMNS, RAW_COLUMNS, NUMERIC_FIELDS, _append_columns, _day
+
+    if len(sys.argv) != 2 or sys.argv[1] != "bench":
+        print("Usage: python sensor_query.py bench")
+        sys.exit(1)
+
+    def synthetic(times):
+        day_phase = 2 * np.pi * (times % 86400) / 86400
+        rng = np.random.default_rng(0)
+        return {
+            "temperature": 25 + 4 * np.sin(day_phase) + rng.normal(0, 0.2, len(times)),
+            "humidity": 50 + 10 * np.cos(day_phase) + rng.normal(0, 1, len(times)),
+            "gas_value": 200 + 50 * np.sin(day_phase / 2) + rng.normal(0, 5, len(times)),
+            "aqi": 60 + 45 * np.sin(day_phase) + rng.normal(0, 3, len(times)),
+        }
+
+    def rollup_columns(starts, seconds):
+        values = synthetic(starts + seconds / 2)
+        columns = {"start": starts, "count": np.full(len(starts), seconds), "air_quality_max": np.zeros(len(starts))}
+        for field in NUMERIC_FIELDS:
+            columns[f"{field}_mean"] = values[field]
+            columns[f"{field}_min"] = values[field] - 0.5
+            columns[f"{field}_max"] = values[field] + 0.5
+        return {name: columns[name].astype(dtype) for name, dtype in ROLLUP_COLUMNS.items()}
+
+    now = time.time()
+    year_start = now - 365 * 86400
+    with tempfile.TemporaryDirectory() as directory:
+        print("Building a synthetic year of sensor history...")
+        hours = np.arange(year_start - year_start % 3600, now, 3600, dtype=np.float64)
+        _append_columns(os.path.join(directory, "hour", "all"), rollup_columns(hours, 3600))
+        minutes = np.arange(year_start - year_start % 60, now, 60, dtype=np.float64)
+        days = np.array([_day(t) for t in minutes[::60]]).repeat(60)[:len(minutes)]
+        for day in np.unique(days):
+            _append_columns(os.path.join(directory, "minute", day), rollup_columns(minutes[days == day], 60))
+        seconds = np.arange(now - 2 * 86400, now, 1, dtype=np.float64)
+        raw = synthetic(seconds)
+        raw["timestamp"] = seconds
+        raw["air_quality"] = np.zeros(len(seconds))
+        raw_days = np.array([_day(t) for t in seconds[::3600]]).repeat(3600)[:len(seconds)]
+        for day in np.unique(raw_days):
+            mask = raw_days == day
+            _append_columns(os.path.join(directory, "raw", day),
+                            {name: raw[name][mask].astype(dtype) for name, dtype in RAW_COLUMNS.items()})
+
+        history = SensorHistory(SensorStore(directory))
+        questions = [
+            "what was the temperature over the last 30 minutes",
+            "has the air quality got worse since this morning",
+            "how humid was it yesterday",
+            "temperature trend over the last week",
+            "air quality over the last 365 days",
+        ]
+        for question in questions:
+            history.describe(question, now)  # page in the files once
+            runs = 20
+            started = time.perf_counter()
+            for _ in range(runs):
+                answer = history.describe(question, now)
+            elapsed_ms = (time.perf_counter() - started) / runs * 1000
+            print(f"{elapsed_ms:7.2f} ms  {question!r}\n           {answer}")
@@ -0,0 +1,127 @@
+import time
+import threading
+from collections import deque
+
+from serial_protocol import FrameDecoder, FRAME_SENSOR, decode_sensor
+
+SENSOR_FIELDS = ("temperature", "humidity", "gas_value", "aqi", "air_quality")
+
+
+def parse_sensor_line(line):
+    """Parses one `temp,humidity,gas,aqi,quality` line from the Arduino, or returns None."""
+    parts = line.strip().split(",")
+    if len(parts) != len(SENSOR_FIELDS):
+        return None
+    try:
+        temp, humidity, gas_value, aqi = (float(value) for value in parts[:4])
+    except ValueError:
+        return None
+    return {
+        "temperature": temp,
+        "humidity": humidity,
+        "gas_value": gas_value,
+        "aqi": aqi,
+        "air_quality": parts[4].strip(),
+    }
+
+
+class SensorReader:
+    """
+    Background thread that keeps draining the serial port into a fixed-size
+    ring buffer of (timestamp, reading) pairs.
+
+    The port is read in chunks through a FrameDecoder, so boards sending binary
+    sensor frames and boards still printing CSV lines both work; `peer_version`
+    is set once the board has sent a valid frame.
+
+    `latest` is always the newest valid reading, so callers never touch the
+    serial port. Counters track lines that were undecodable (dropped), lines
+    that didn't parse (malformed), readings pushed out of the full ring
+    (overwritten) and on_reading calls that raised (callback_errors); frame
+    and CRC counts are in `decoder.stats`.
+    """
+
+    def __init__(self, serial_port, capacity=3600, on_reading=None):
+        self.serial = serial_port
+        self.readings = deque(maxlen=capacity)
+        self.on_reading = on_reading
+        self.latest = None
+        self.latest_time = None
+        self.decoder = FrameDecoder()
+        self.stats = {"lines": 0, "readings": 0, "dropped": 0, "malformed": 0, "overwritten": 0,
+                      "callback_errors": 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+    @property
+    def peer_version(self):
+        return self.decoder.peer_version
+
+    def latest_age(self):
+        """Seconds since the newest reading arrived (None before the first one)."""
+        return None if self.latest_time is None else time.time() - self.latest_time
+
+    def recent(self, seconds):
+        """Readings from the last `seconds`, oldest first."""
+        cutoff = time.time() - seconds
+        return [(timestamp, reading) for timestamp, reading in list(self.readings) if timestamp >= cutoff]
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Blocks for the first byte (up to the port timeout), then takes whatever else is waiting
+                raw = self.serial.read(1)
+                if raw and self.serial.in_waiting:
+                    raw += self.serial.read(self.serial.in_waiting)
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                print(f"Error reading sensor data: {e}")
+                time.sleep(0.5)
+                continue
+
+            if not raw:
+                continue
+            for event in self.decoder.feed(raw):
+                if event[0] == "frame":
+                    if event[1] == FRAME_SENSOR:
+                        self.add(decode_sensor(event[2]))
+                    continue
+                self._handle_line(event[1])
+
+    def _handle_line(self, raw):
+        self.stats["lines"] += 1
+        try:
+            line = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            self.stats["dropped"] += 1
+            return
+
+        reading = parse_sensor_line(line)
+        if reading is None:
+            self.stats["malformed"] += 1
+            return
+        self.add(reading)
+
+    def add(self, reading, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if len(self.readings) == self.readings.maxlen:
+            self.stats["overwritten"] += 1
+        self.readings.append((timestamp, reading))
+        self.latest = reading
+        self.latest_time = timestamp
+        self.stats["readings"] += 1
+        if self.on_reading:
+            try:
+                self.on_reading(timestamp, reading)
+            except Exception as e:
+                # e.g. the sensor store's disk is full; the live readings must keep coming
+                self.stats["callback_errors"] += 1
+                print(f"Error handling sensor reading: {e}")
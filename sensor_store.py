@@ -0,0 +1,350 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+import numpy as np
+
+SENSOR_STORE_DIR = "sensor_store"
+
+AIR_QUALITY_LEVELS = [
+    "Good",
+    "Moderate",
+    "Unhealthy for Sensitive Groups",
+    "Unhealthy",
+    "Very Unhealthy",
+    "Hazardous",
+]
+UNKNOWN_QUALITY = 255
+
+NUMERIC_FIELDS = ("temperature", "humidity", "gas_value", "aqi")
+RAW_COLUMNS = {
+    "timestamp": np.float64,
+    "temperature": np.float32,
+    "humidity": np.float32,
+    "gas_value": np.float32,
+    "aqi": np.float32,
+    "air_quality": np.uint8,
+}
+
+# Rollup rows: bucket start, sample count, min/max/mean per numeric field and the worst air quality code
+ROLLUP_COLUMNS = {"start": np.float64, "count": np.uint32, "air_quality_max": np.uint8}
+for _field in NUMERIC_FIELDS:
+    for _stat in ("min", "max", "mean"):
+        ROLLUP_COLUMNS[f"{_field}_{_stat}"] = np.float32
+
+ROLLUP_SECONDS = {"minute": 60, "hour": 3600}
+
+# Hour rollups are tiny (8760 rows a year), so they live in a single partition
+# instead of one directory per day
+SINGLE_PARTITION_LEVELS = {"hour"}
+ALL_PARTITION = "all"
+
+
+def air_quality_code(label):
+    try:
+        return AIR_QUALITY_LEVELS.index(label.strip())
+    except (ValueError, AttributeError):
+        return UNKNOWN_QUALITY
+
+
+def air_quality_from_aqi(aqi):
+    """Same thresholds as sensors.ino."""
+    for code, limit in enumerate((50, 100, 150, 200, 300)):
+        if aqi <= limit:
+            return code
+    return len(AIR_QUALITY_LEVELS) - 1
+
+
+def _day(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+
+
+def _partition(level, timestamp):
+    return ALL_PARTITION if level in SINGLE_PARTITION_LEVELS else _day(timestamp)
+
+
+class _Rollup:
+    """Running min/max/sum for the bucket currently being filled."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._reset()
+
+    def _reset(self):
+        self.start = None
+        self.count = 0
+        self.minimum = np.full(len(NUMERIC_FIELDS), np.inf)
+        self.maximum = np.full(len(NUMERIC_FIELDS), -np.inf)
+        self.total = np.zeros(len(NUMERIC_FIELDS))
+        self.quality = 0
+
+    def add(self, timestamp, values, quality):
+        """Adds one sample; returns the finished row when the sample opens a new bucket."""
+        start = timestamp - timestamp % self.seconds
+        finished = None
+        if self.start is not None and start > self.start:
+            finished = self.row()
+            self._reset()
+        if self.start is None:
+            self.start = start
+        self.count += 1
+        np.minimum(self.minimum, values, out=self.minimum)
+        np.maximum(self.maximum, values, out=self.maximum)
+        self.total += values
+        if quality != UNKNOWN_QUALITY:
+            self.quality = max(self.quality, quality)
+        return finished
+
+    def row(self):
+        if not self.count:
+            return None
+        row = {"start": self.start, "count": self.count, "air_quality_max": self.quality}
+        mean = self.total / self.count
+        for i, field in enumerate(NUMERIC_FIELDS):
+            row[f"{field}_min"] = self.minimum[i]
+            row[f"{field}_max"] = self.maximum[i]
+            row[f"{field}_mean"] = mean[i]
+        return row
+
+
+class SensorStore:
+    """
+    Compact time-series store for sensor readings.
+
+    Readings are collected in preallocated NumPy arrays and flushed in batches
+    as raw little-endian column files, one directory per day:
+
+        sensor_store/raw/2025-02-09/temperature.f4 ...
+        sensor_store/minute/2025-02-09/temperature_mean.f4 ...
+        sensor_store/hour/all/...
+
+    Minute and hour rollups (min, max, mean) are maintained as readings arrive,
+    so range queries over long periods only ever read the small rollup files.
+    A bucket that was open across a restart is written twice, once by each
+    run; load() merges the two rows. Column files are opened with np.memmap
+    when loaded.
+    """
+
+    def __init__(self, directory=SENSOR_STORE_DIR, batch_size=600, flush_interval=60):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer = {name: np.zeros(batch_size, dtype=dtype) for name, dtype in RAW_COLUMNS.items()}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._rollups = {level: _Rollup(seconds) for level, seconds in ROLLUP_SECONDS.items()}
+        self._finished_rollups = {level: [] for level in ROLLUP_SECONDS}
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, timestamp, reading):
+        """Adds one reading dict (as produced by parse_sensor_line)."""
+        values = np.array([reading[field] for field in NUMERIC_FIELDS], dtype=np.float64)
+        quality = reading.get("air_quality")
+        quality = air_quality_code(quality) if isinstance(quality, str) else air_quality_from_aqi(reading["aqi"])
+
+        with self._lock:
+            # Rows in one batch must belong to the same day file
+            if self._buffered and _day(self._buffer["timestamp"][self._buffered - 1]) != _day(timestamp):
+                self._flush_locked()
+
+            row = self._buffered
+            self._buffer["timestamp"][row] = timestamp
+            for i, field in enumerate(NUMERIC_FIELDS):
+                self._buffer[field][row] = values[i]
+            self._buffer["air_quality"][row] = quality
+            self._buffered += 1
+
+            for level, rollup in self._rollups.items():
+                finished = rollup.add(timestamp, values, quality)
+                if finished:
+                    self._finished_rollups[level].append(finished)
+
+            if self._buffered >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Flushes everything, including the rollup buckets that are still open."""
+        with self._lock:
+            for level, rollup in self._rollups.items():
+                row = rollup.row()
+                if row:
+                    self._finished_rollups[level].append(row)
+                self._rollups[level] = _Rollup(rollup.seconds)
+            self._flush_locked()
+
+    def open_rollup(self, level):
+        """The partially filled bucket for `level` (not on disk yet), or None."""
+        with self._lock:
+            return self._rollups[level].row()
+
+    def load(self, level="raw", start=None, end=None, include_pending=True):
+        """
+        Returns {column: array} for rows with start <= time < end from the
+        given level ("raw", "minute" or "hour"), oldest first. Only the day
+        directories that overlap the range are opened. With include_pending,
+        rows not flushed yet (and the open rollup bucket) are included too.
+        """
+        columns = RAW_COLUMNS if level == "raw" else ROLLUP_COLUMNS
+        time_column = "timestamp" if level == "raw" else "start"
+        level_dir = os.path.join(self.directory, level)
+        partitions = sorted(os.listdir(level_dir)) if os.path.isdir(level_dir) else []
+
+        first_day = _day(start) if start is not None else None
+        last_day = _day(end) if end is not None else None
+        chunks = []
+        for partition in partitions:
+            if partition != ALL_PARTITION and (
+                    (first_day and partition < first_day) or (last_day and partition > last_day)):
+                continue
+            chunks.append(self._load_day(os.path.join(level_dir, partition), columns))
+        if include_pending:
+            chunks.append(self._pending(level))
+
+        parts = {name: [] for name in columns}
+        for chunk in chunks:
+            times = chunk[time_column]
+            mask = np.ones(len(times), dtype=bool)
+            if start is not None:
+                mask &= times >= start
+            if end is not None:
+                mask &= times < end
+            for name in columns:
+                parts[name].append(chunk[name][mask])
+
+        result = {
+            name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=columns[name])
+            for name, chunks in parts.items()
+        }
+        return result if level == "raw" else _merge_buckets(result)
+
+    def _pending(self, level):
+        """Copies of the rows still held in memory for a level."""
+        with self._lock:
+            if level == "raw":
+                return {name: column[:self._buffered].copy() for name, column in self._buffer.items()}
+            rows = list(self._finished_rollups[level])
+            open_row = self._rollups[level].row()
+            if open_row:
+                rows.append(open_row)
+        return {name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in ROLLUP_COLUMNS.items()}
+
+    def _load_day(self, day_dir, columns):
+        arrays = {}
+        for name, dtype in columns.items():
+            path = os.path.join(day_dir, _column_file(name, dtype))
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            count = size // np.dtype(dtype).itemsize
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", shape=(count,)) if count else np.zeros(0, dtype=dtype)
+        # A flush interrupted between column files leaves them uneven; use the common prefix
+        rows = min(len(array) for array in arrays.values())
+        return {name: array[:rows] for name, array in arrays.items()}
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if self._buffered:
+            day_dir = os.path.join(self.directory, "raw", _day(self._buffer["timestamp"][0]))
+            _append_columns(day_dir, {name: column[:self._buffered] for name, column in self._buffer.items()})
+            self._buffered = 0
+
+        for level, rows in self._finished_rollups.items():
+            if not rows:
+                continue
+            # Group by partition so each row lands in its own day's files
+            by_partition = {}
+            for row in rows:
+                by_partition.setdefault(_partition(level, row["start"]), []).append(row)
+            for partition, partition_rows in by_partition.items():
+                columns = {
+                    name: np.array([row[name] for row in partition_rows], dtype=dtype)
+                    for name, dtype in ROLLUP_COLUMNS.items()
+                }
+                _append_columns(os.path.join(self.directory, level, partition), columns)
+            rows.clear()
+
+
+def _column_file(name, dtype):
+    return f"{name}.{np.dtype(dtype).str.lstrip('<>|=')}"
+
+
+def _append_columns(day_dir, columns):
+    os.makedirs(day_dir, exist_ok=True)
+    paths = {name: os.path.join(day_dir, _column_file(name, values.dtype)) for name, values in columns.items()}
+    # A flush interrupted between column files leaves some a few rows longer; cut them back
+    # to the common length first, or every row appended after them would be misaligned
+    rows = {name: (os.path.getsize(path) if os.path.exists(path) else 0) // columns[name].dtype.itemsize
+            for name, path in paths.items()}
+    common = min(rows.values())
+    for name, path in paths.items():
+        if rows[name] != common:
+            with open(path, "r+b") as file:
+                file.truncate(common * columns[name].dtype.itemsize)
+    for name, values in columns.items():
+        with open(paths[name], "ab") as file:
+            file.write(values.astype(values.dtype.newbyteorder("<")).tobytes())
+
+
+def _merge_buckets(columns):
+    """Combines rollup rows with the same bucket start into one, sorted by start."""
+    starts = columns["start"]
+    if len(starts) < 2 or np.all(np.diff(starts) > 0):
+        return columns
+    order = np.argsort(starts, kind="stable")
+    keys, first = np.unique(starts[order], return_index=True)
+    counts = columns["count"][order].astype(np.float64)
+    totals = np.add.reduceat(counts, first)
+    merged = {
+        "start": keys,
+        "count": totals.astype(np.uint32),
+        "air_quality_max": np.maximum.reduceat(columns["air_quality_max"][order], first),
+    }
+    for field in NUMERIC_FIELDS:
+        merged[f"{field}_min"] = np.minimum.reduceat(columns[f"{field}_min"][order], first)
+        merged[f"{field}_max"] = np.maximum.reduceat(columns[f"{field}_max"][order], first)
+        weighted = np.add.reduceat(columns[f"{field}_mean"][order] * counts, first)
+        merged[f"{field}_mean"] = (weighted / totals).astype(np.float32)
+    return merged
+
+
+def import_csv(store, csv_path):
+    """
+    Imports an existing sensor_data.csv (`YYYY-mm-dd HH:MM:SS,temp,humidity,gas,aqi[,quality]`).
+    Returns (imported, skipped) line counts.
+    """
+    imported = skipped = 0
+    with open(csv_path, "r", encoding="utf-8") as file:
+        for line in file:
+            parts = line.strip().split(",")
+            if len(parts) not in (5, 6):
+                skipped += 1
+                continue
+            try:
+                timestamp = datetime.strptime(parts[0], "%Y-%m-%d %H:%M:%S").timestamp()
+                temp, humidity, gas_value, aqi = (float(value) for value in parts[1:5])
+            except ValueError:
+                skipped += 1
+                continue
+            reading = {"temperature": temp, "humidity": humidity, "gas_value": gas_value, "aqi": aqi}
+            if len(parts) == 6:
+                reading["air_quality"] = parts[5]
+            store.append(timestamp, reading)
+            imported += 1
+    store.close()
+    return imported, skipped
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3 or sys.argv[1] != "import":
+        print("Usage: python sensor_store.py import <sensor_data.csv>")
+        sys.exit(1)
+
+    store = SensorStore()
+    imported, skipped = import_csv(store, sys.argv[2])
+    print(f"Imported {imported} readings into {SENSOR_STORE_DIR}/ ({skipped} lines skipped)")
@@ -0,0 +1,347 @@
+import os
+import json
+import time
+import socket
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from sensor_reader import SensorReader
+from sensor_store import SensorStore, SENSOR_STORE_DIR
+from actuator_queue import ServoQueue
+from serial_protocol import encode_servo_command
+
+SOCKET_PATH = os.getenv("JARVIS_SERIAL_SOCKET", "/tmp/jarvis-serial.sock")
+SERIAL_PORT = "/dev/ttyUSB0"
+OUTBOX_SIZE = 256  # Messages queued per client before its oldest readings are dropped
+
+# Wire format on the socket: one JSON object per line.
+#   client -> daemon  {"id": 1, "op": "subscribe"}
+#                     {"id": 2, "op": "latest"}
+#                     {"id": 3, "op": "servo", "angle": 90}
+#                     {"id": 4, "op": "stats"}
+#   daemon -> client  {"id": 3, "ok": true, "angle": 90}   (replies carry the request id)
+#                     {"event": "reading", "time": ..., "reading": {...}}
+
+
+class _Connection:
+    """
+    One client socket. Everything sent to it goes through a bounded outbox
+    and a sender thread, so send() never blocks the caller.
+    """
+
+    def __init__(self, sock, stats):
+        self.sock = sock
+        self.subscribed = False
+        self.outbox = deque()  # (data, droppable)
+        self.stats = stats
+        self.closed = False
+        self._condition = threading.Condition()
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        self._sender.start()
+
+    def send(self, message, droppable=False):
+        if self.closed:
+            return
+        data = (json.dumps(message) + "\n").encode()
+        with self._condition:
+            if len(self.outbox) >= OUTBOX_SIZE:
+                # A slow client loses its oldest readings instead of holding up the others
+                oldest = next((i for i, (_, queued) in enumerate(self.outbox) if queued), None)
+                if oldest is not None:
+                    del self.outbox[oldest]
+                self.stats["dropped"] += 1
+                if oldest is None and droppable:
+                    return
+            stalled = len(self.outbox) >= OUTBOX_SIZE
+            if not stalled:
+                self.outbox.append((data, droppable))
+                self._condition.notify()
+        if stalled:
+            # Nothing but replies queued: the client has stopped reading
+            print("Dropping a serial daemon client that stopped reading its replies")
+            self.close()
+
+    def close(self):
+        self.closed = True
+        with self._condition:
+            self._condition.notify()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # Also ends the request reader blocked on this socket
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _send_loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self.outbox or self.closed)
+                if self.closed:
+                    return
+                data, _ = self.outbox.popleft()
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.closed = True
+                return
+
+
+class SerialDaemon:
+    """
+    Owns the Arduino's serial port so several programs can share it.
+
+    Opening the port resets the board, so it is opened exactly once here.
+    Readings are recorded in the sensor store (the daemon is its only writer)
+    and fanned out to every subscribed client; servo commands from all clients
+    go through one ServoQueue, so the newest target wins across programs.
+    Clients talk to it over a Unix socket with JSON lines (see SerialClient).
+    """
+
+    def __init__(self, serial_port, socket_path=SOCKET_PATH, store_dir=SENSOR_STORE_DIR):
+        self.serial = serial_port
+        self.socket_path = socket_path
+        self.store = SensorStore(store_dir) if store_dir else None
+        self.reader = SensorReader(serial_port, on_reading=self._on_reading)
+        self.servo_queue = ServoQueue(self._write_servo, initial_angle=90)
+        self.stats = {"clients": 0, "subscribers": 0, "requests": 0, "broadcasts": 0, "dropped": 0}
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._running = False
+
+    def start(self):
+        """Binds the socket and starts the reader and accept threads."""
+        if os.path.exists(self.socket_path):
+            if _daemon_running(self.socket_path):
+                raise RuntimeError(f"A serial daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)  # Left over from a daemon that died
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen(16)
+        self._running = True
+        self.reader.start()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self._server:
+            self._server.close()
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.close()
+        self.servo_queue.close()
+        self.reader.stop()
+        if self.store:
+            self.store.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def _write_servo(self, angle):
+        self.serial.write(encode_servo_command(angle, self.reader.peer_version))
+
+    def _on_reading(self, timestamp, reading):
+        if self.store:
+            self.store.append(timestamp, reading)
+        message = {"event": "reading", "time": timestamp, "reading": reading}
+        with self._lock:
+            subscribers = [c for c in self._connections if c.subscribed]
+        for connection in subscribers:
+            connection.send(message, droppable=True)
+        self.stats["broadcasts"] += 1
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            connection = _Connection(sock, self.stats)
+            with self._lock:
+                self._connections.add(connection)
+            self.stats["clients"] += 1
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        try:
+            for line in connection.sock.makefile("rb"):
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    connection.send({"ok": False, "error": "invalid JSON"})
+                    continue
+                self.stats["requests"] += 1
+                self._handle(connection, request)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+            if connection.subscribed:
+                self.stats["subscribers"] -= 1
+            connection.close()
+
+    def _handle(self, connection, request):
+        request_id = request.get("id")
+        op = request.get("op")
+        if op == "subscribe":
+            if not connection.subscribed:
+                connection.subscribed = True
+                self.stats["subscribers"] += 1
+            connection.send({"id": request_id, "ok": True})
+            # New subscribers get the current reading right away instead of waiting for the next one
+            if self.reader.latest is not None:
+                connection.send({"event": "reading", "time": self.reader.latest_time, "reading": self.reader.latest})
+        elif op == "latest":
+            connection.send({"id": request_id, "ok": True, "time": self.reader.latest_time,
+                             "reading": self.reader.latest})
+        elif op == "servo":
+            angle = request.get("angle")
+            if not isinstance(angle, int):
+                connection.send({"id": request_id, "ok": False, "error": "angle must be an integer"})
+                return
+
+            def done(future):
+                if future.exception():
+                    connection.send({"id": request_id, "ok": False, "error": str(future.exception())})
+                else:
+                    connection.send({"id": request_id, "ok": True, "angle": future.result()})
+
+            self.servo_queue.move(angle).add_done_callback(done)
+        elif op == "stats":
+            connection.send({"id": request_id, "ok": True, "daemon": self.stats,
+                             "reader": self.reader.stats, "decoder": self.reader.decoder.stats,
+                             "servo": self.servo_queue.stats})
+        else:
+            connection.send({"id": request_id, "ok": False, "error": f"unknown op {op!r}"})
+
+
+def _daemon_running(socket_path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class SerialClient:
+    """
+    Client side of the serial daemon. Connecting costs a socket connect, not
+    a board reset. Requests return Futures; readings from subscribe() are
+    delivered on the client's reader thread as on_reading(reading, timestamp),
+    the same signature as SensorReader.add.
+    """
+
+    def __init__(self, socket_path=SOCKET_PATH, timeout=1.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.sock.settimeout(None)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._on_reading = None
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def request(self, op, **fields):
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = future
+        self.sock.sendall((json.dumps({"id": request_id, "op": op, **fields}) + "\n").encode())
+        return future
+
+    def subscribe(self, on_reading):
+        self._on_reading = on_reading
+        return self.request("subscribe")
+
+    def latest(self, timeout=1.0):
+        reply = self.request("latest").result(timeout)
+        return reply.get("reading")
+
+    def move_servo(self, angle):
+        """Future that resolves with the final angle once the servo has reached it."""
+        future = Future()
+
+        def done(reply):
+            if reply.exception() is not None:
+                future.set_exception(reply.exception())  # e.g. the daemon connection dropped
+                return
+            result = reply.result()
+            if result.get("ok"):
+                future.set_result(result["angle"])
+            else:
+                future.set_exception(ValueError(result.get("error")))
+
+        self.request("servo", angle=angle).add_done_callback(done)
+        return future
+
+    def stats(self, timeout=1.0):
+        return self.request("stats").result(timeout)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _read_loop(self):
+        try:
+            for line in self.sock.makefile("rb"):
+                message = json.loads(line)
+                if message.get("event") == "reading":
+                    if self._on_reading:
+                        self._on_reading(message["reading"], message["time"])
+                    continue
+                with self._lock:
+                    future = self._pending.pop(message.get("id"), None)
+                if future:
+                    future.set_result(message)
+        except (OSError, ValueError):
+            pass
+        # Daemon went away: fail whatever is still waiting
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError("serial daemon connection closed"))
+
+
+def connect(socket_path=SOCKET_PATH):
+    """A SerialClient if the daemon is running, otherwise None."""
+    if not os.path.exists(socket_path):
+        return None
+    try:
+        return SerialClient(socket_path)
+    except OSError:
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+    import serial
+
+    port = sys.argv[1] if len(sys.argv) > 1 else SERIAL_PORT
+    serial_port = serial.Serial(port, 9600, timeout=1)
+    time.sleep(2)  # Wait for Arduino to reset (only happens once, here)
+    # Same store v2.1.py and hardware/sensors.py read, wherever the daemon is started from
+    daemon = SerialDaemon(serial_port, store_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), SENSOR_STORE_DIR))
+    daemon.start()
+    print(f"Serial daemon: {port} on {daemon.socket_path}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"Serial daemon: {daemon.stats}")
+    except KeyboardInterrupt:
+        print("\nStopping serial daemon...")
+    finally:
+        daemon.stop()
+        serial_port.close()
@@ -0,0 +1,273 @@
+import struct
+import binascii
+
+from sensor_store import AIR_QUALITY_LEVELS, air_quality_code, UNKNOWN_QUALITY
+
+# Frame layout (all multi-byte fields little-endian):
+#
+#   0xA5 | version << 4 | type | length | payload (length bytes) | CRC-16
+#
+# The CRC is CRC-16/CCITT (poly 0x1021, init 0xFFFF) over header, length and
+# payload. A sensor frame is 14 bytes against ~35 for the CSV line it replaces.
+SYNC = 0xA5
+PROTOCOL_VERSION = 1
+MAX_PAYLOAD = 32
+MAX_LINE = 256  # Longest legacy text line kept while waiting for its newline
+
+FRAME_SENSOR = 0x1
+FRAME_SERVO = 0x2
+FRAME_HELLO = 0x3  # Payload: the highest protocol version the sender speaks
+
+# temperature and humidity in hundredths, raw gas ADC value, AQI in tenths, air quality code
+SENSOR_FORMAT = struct.Struct("<hHHHB")
+PAYLOAD_SIZES = {FRAME_SENSOR: SENSOR_FORMAT.size, FRAME_SERVO: 1, FRAME_HELLO: 1}
+
+
+def _crc(data):
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(frame_type, payload, version=PROTOCOL_VERSION):
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"Payload too long ({len(payload)} bytes)")
+    body = bytes((version << 4 | frame_type, len(payload))) + payload
+    return bytes((SYNC,)) + body + struct.pack("<H", _crc(body))
+
+
+def encode_sensor(reading):
+    """Sensor reading dict (as from parse_sensor_line) -> frame bytes."""
+    quality = reading.get("air_quality")
+    payload = SENSOR_FORMAT.pack(
+        round(reading["temperature"] * 100),
+        round(reading["humidity"] * 100),
+        round(reading["gas_value"]),
+        round(reading["aqi"] * 10),
+        air_quality_code(quality) if isinstance(quality, str) else UNKNOWN_QUALITY,
+    )
+    return encode_frame(FRAME_SENSOR, payload)
+
+
+def decode_sensor(payload):
+    """Sensor frame payload -> the same dict parse_sensor_line returns."""
+    temperature, humidity, gas_value, aqi, quality = SENSOR_FORMAT.unpack(payload)
+    return {
+        "temperature": temperature / 100,
+        "humidity": humidity / 100,
+        "gas_value": float(gas_value),
+        "aqi": aqi / 10,
+        "air_quality": AIR_QUALITY_LEVELS[quality] if quality < len(AIR_QUALITY_LEVELS) else "",
+    }
+
+
+def encode_servo_command(angle, peer_version=None):
+    """
+    Servo command bytes. Binary only once the board has shown it speaks the
+    framed protocol: the legacy sketches run toInt() on whatever arrives, and
+    a binary frame would read as angle 0.
+    """
+    if peer_version:
+        return encode_frame(FRAME_SERVO, bytes((angle,)))
+    return f"{angle}\n".encode()
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a byte stream carrying binary frames, legacy CSV
+    text lines, or both.
+
+    feed() returns a list of events: ("frame", type, payload) for frames that
+    pass the CRC check and ("line", bytes) for complete text lines. After a bad
+    header or CRC the decoder drops the sync byte and rescans from the next
+    byte, so one corrupted frame costs only that frame. Text never contains the
+    sync byte (it is outside ASCII), so a partial line cut off by a frame is
+    discarded rather than glued to the next one.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.peer_version = None  # Set by the first valid frame
+        self.stats = {"frames": 0, "lines": 0, "crc_errors": 0, "bad_headers": 0,
+                      "unsupported": 0, "skipped_bytes": 0}
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        events = []
+        i = 0
+        size = len(buffer)
+        while i < size:
+            if buffer[i] == SYNC:
+                if size - i < 3:
+                    break
+                header, length = buffer[i + 1], buffer[i + 2]
+                version, frame_type = header >> 4, header & 0x0F
+                expected = PAYLOAD_SIZES.get(frame_type)
+                if (version == 0 or length > MAX_PAYLOAD
+                        or (version == PROTOCOL_VERSION and expected is not None and length != expected)):
+                    self.stats["bad_headers"] += 1
+                    i += 1
+                    continue
+                end = i + 3 + length + 2
+                if size < end:
+                    break
+                crc = buffer[end - 2] | buffer[end - 1] << 8
+                if _crc(bytes(buffer[i + 1:end - 2])) != crc:
+                    self.stats["crc_errors"] += 1
+                    i += 1
+                    continue
+                if version > PROTOCOL_VERSION:
+                    # Well-formed but from a newer firmware: skip the whole frame
+                    self.stats["unsupported"] += 1
+                else:
+                    self.stats["frames"] += 1
+                    payload = bytes(buffer[i + 3:end - 2])
+                    if frame_type == FRAME_HELLO:
+                        self.peer_version = min(payload[0], PROTOCOL_VERSION)
+                    elif self.peer_version is None:
+                        self.peer_version = version
+                    events.append(("frame", frame_type, payload))
+                i = end
+                continue
+
+            newline = buffer.find(b"\n", i)
+            sync = buffer.find(SYNC, i)
+            if sync != -1 and (newline == -1 or sync < newline):
+                self.stats["skipped_bytes"] += sync - i
+                i = sync
+                continue
+            if newline == -1:
+                if size - i > MAX_LINE:
+                    self.stats["skipped_bytes"] += size - i
+                    i = size
+                break
+            self.stats["lines"] += 1
+            events.append(("line", bytes(buffer[i:newline + 1])))
+            i = newline + 1
+
+        del buffer[:i]
+        return events
+
+
+def legacy_line(reading):
+    """The CSV line the current sketches print for a reading."""
+    return (f"{reading['temperature']:.1f},{reading['humidity']:.1f},{reading['gas_value']:.0f},"
+            f"{reading['aqi']:.1f},{reading['air_quality']}\r\n").encode()
+
+
+if __name__ == "__main__":
+    # Loopback check and throughput benchmark over a pseudo-terminal standing in for the Arduino
+    import os
+    import sys
+    import time
+    import tty
+    import random
+    import threading
+    from sensor_reader import parse_sensor_line
+
+    BAUD = 9600
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    rng = random.Random(0)
+    readings = []
+    for _ in range(count):
+        aqi = round(rng.uniform(0, 300), 1)
+        readings.append({
+            "temperature": round(rng.uniform(15, 35), 1),
+            "humidity": round(rng.uniform(20, 80), 1),
+            "gas_value": float(rng.randint(0, 1023)),
+            "aqi": aqi,
+            "air_quality": AIR_QUALITY_LEVELS[min(int(aqi // 50), 5)],
+        })
+
+    def open_loopback():
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        try:
+            import serial
+            port = serial.Serial(os.ttyname(slave), timeout=1)
+            return master, port.read, port.readline, port.close
+        except ImportError:
+            # Same byte-at-a-time readline pyserial does
+            def readline():
+                line = bytearray()
+                while True:
+                    byte = os.read(slave, 1)
+                    line += byte
+                    if not byte or byte == b"\n":
+                        return bytes(line)
+            return master, lambda n=1: os.read(slave, n), readline, lambda: os.close(slave)
+
+    def writer(master, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(master, view[:4096])
+            view = view[written:]
+
+    def run(label, data, read_all):
+        master, read, readline, close = open_loopback()
+        thread = threading.Thread(target=writer, args=(master, data), daemon=True)
+        started = time.perf_counter()
+        thread.start()
+        decoded = read_all(read, readline)
+        elapsed = time.perf_counter() - started
+        thread.join()
+        close()
+        os.close(master)
+        per_frame = len(data) / count
+        print(f"{label:>8}: {count / elapsed:9.0f} readings/s host-side, {per_frame:5.1f} bytes/reading, "
+              f"{BAUD / 10 / per_frame:5.1f} readings/s at {BAUD} baud")
+        return decoded
+
+    def read_lines(read, readline):
+        decoded = []
+        while len(decoded) < count:
+            reading = parse_sensor_line(readline().decode("utf-8"))
+            if reading:
+                decoded.append(reading)
+        return decoded
+
+    def read_frames(read, readline):
+        decoder = FrameDecoder()
+        decoded = []
+        while len(decoded) < count:
+            for event in decoder.feed(read(4096)):
+                if event[0] == "frame" and event[1] == FRAME_SENSOR:
+                    decoded.append(decode_sensor(event[2]))
+        return decoded
+
+    csv_data = b"".join(legacy_line(r) for r in readings)
+    frame_data = b"".join(encode_sensor(r) for r in readings)
+
+    lines = run("readline", csv_data, read_lines)
+    frames = run("frames", frame_data, read_frames)
+    assert lines == frames == readings, "decoded readings differ from what was sent"
+
+    # Corruption: flip bytes, drop bytes and mix in legacy lines; every untouched frame must survive
+    stream = bytearray()
+    intact = []
+    for index, reading in enumerate(readings[:2000]):
+        frame = bytearray(encode_sensor(reading))
+        if index % 50 == 7:
+            frame[rng.randrange(len(frame))] ^= 0xFF
+        elif index % 50 == 23:
+            del frame[rng.randrange(len(frame))]
+        else:
+            intact.append(reading)
+        if index % 100 == 42:
+            stream += legacy_line(reading)
+            intact.append(reading)
+        stream += frame
+    decoder = FrameDecoder()
+    recovered = []
+    for start in range(0, len(stream), 7):
+        for event in decoder.feed(bytes(stream[start:start + 7])):
+            if event[0] == "frame":
+                recovered.append(decode_sensor(event[2]))
+            else:
+                reading = parse_sensor_line(event[1].decode("utf-8", "replace"))
+                if reading:
+                    recovered.append(reading)
+    missing = [r for r in intact if r not in recovered]
+    print(f"corruption: {len(intact)} intact readings, {len(missing)} lost, decoder {decoder.stats}")
+    assert not missing, "intact frames were lost after corruption"
+    print("Loopback check passed")
@@ -0,0 +1,117 @@
+import time
+import threading
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+# How long each lazily imported module took to load, in load order
+import_times = {}
+
+
+class LazyModule:
+    """
+    Stands in for a module until one of its attributes is first used, then
+    imports it (once, even if several threads get there at the same time).
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attribute):
+        module = self._module
+        if module is None:
+            module = self._load()
+        return getattr(module, attribute)
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                started = time.perf_counter()
+                self._module = importlib.import_module(self._name)
+                import_times[self._name] = time.perf_counter() - started
+        return self._module
+
+
+def lazy_import(name):
+    """`pygame = lazy_import("pygame")` instead of `import pygame`."""
+    return LazyModule(name)
+
+
+class Startup:
+    """
+    Runs independent initialization phases concurrently and times them.
+
+        startup = Startup()
+        startup.run("serial", EnvironmentController)
+        startup.run("mixer", init_audio)
+        controller = startup.result("serial")
+        print(startup.report())
+
+    A phase can wait for others with `after=[...]`. Phases started with
+    wait=False (network warm-ups) are not waited for by wait_all(); report()
+    shows them as still running if they haven't finished.
+    """
+
+    def __init__(self, started=None, max_workers=6):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = {}  # name -> [start offset, end offset or None, thread name]
+        self._futures = {}
+        self._background = set()
+        self.ready = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+
+    def record(self, name, started, ended=None):
+        """Adds a phase timed elsewhere (e.g. module imports before main())."""
+        ended = ended if ended is not None else time.perf_counter()
+        self.phases[name] = [started - self.started, ended - self.started, "main"]
+
+    def run(self, name, func, *args, after=(), wait=True):
+        dependencies = [self._futures[dependency] for dependency in after]
+
+        def phase():
+            for dependency in dependencies:
+                dependency.result()
+            entry = [time.perf_counter() - self.started, None, threading.current_thread().name]
+            self.phases[name] = entry
+            try:
+                return func(*args)
+            finally:
+                entry[1] = time.perf_counter() - self.started
+
+        self._futures[name] = self._executor.submit(phase)
+        if not wait:
+            self._background.add(name)
+        return self._futures[name]
+
+    def result(self, name):
+        """Waits for a phase and returns its result (re-raising its exception)."""
+        return self._futures[name].result()
+
+    def wait_all(self):
+        for name, future in self._futures.items():
+            if name not in self._background:
+                future.result()
+        self.ready = time.perf_counter() - self.started
+
+    def report(self):
+        ready = self.ready if self.ready is not None else time.perf_counter() - self.started
+        phases = list(self.phases.items())
+        finished = [(start, end, name) for name, (start, end, _) in phases if end is not None]
+        work = sum(end - start for start, end, _ in finished)
+        lines = [f"Startup: ready in {ready:.2f}s ({work:.2f}s of work across phases)"]
+        for name, (start, end, thread) in sorted(phases, key=lambda item: item[1][0]):
+            if end is None:
+                lines.append(f"  {name:<14} {start:6.2f}s -> (running)")
+            else:
+                lines.append(f"  {name:<14} {start:6.2f}s -> {end:6.2f}s  {end - start:6.2f}s")
+        for name in self._futures:
+            if name not in self.phases:
+                lines.append(f"  {name:<14} (waiting)")
+        if import_times:
+            imports = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in import_times.items())
+            lines.append(f"  lazy imports: {imports}")
+        return "\n".join(lines)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,402 @@
+import os
+import json
+import time
+import queue
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import urlencode
+
+from startup import lazy_import
+
+sr = lazy_import("speech_recognition")
+
+DEEPGRAM_URL = "wss://api.deepgram.com/v1/listen"
+DEEPGRAM_MODEL = "nova-2"
+FINAL_TIMEOUT = 5.0  # Longest finish() waits for the final transcript after the last audio
+STREAMING_BACKENDS = {"deepgram"}  # Cloud streaming; the only backends that get a batch fallback by default
+
+
+class TranscriptEvent:
+    """An interim or final transcript from a streaming recognizer."""
+
+    def __init__(self, text, is_final, received_at=None):
+        self.text = text
+        self.is_final = is_final
+        self.received_at = received_at if received_at is not None else time.monotonic()
+
+    def __repr__(self):
+        return f"TranscriptEvent({self.text!r}, is_final={self.is_final})"
+
+
+class StreamingSession(ABC):
+    """
+    One utterance sent to a streaming recognizer.
+
+    send() takes 16-bit mono PCM as it is captured and never blocks on the
+    network; on_event is called with every TranscriptEvent (interim and final)
+    from the session's own thread. finish() marks the end of the audio and
+    returns the final transcript ("" when nothing was recognized); cancel()
+    drops the utterance.
+    """
+
+    def __init__(self, sample_rate, on_event=None):
+        self.sample_rate = sample_rate
+        self.on_event = on_event
+        self.events = []
+        self.first_audio_at = None
+        self.finished_at = None
+        self.final_at = None
+
+    @abstractmethod
+    def send(self, data):
+        """Queues a block of PCM audio."""
+
+    @abstractmethod
+    def finish(self):
+        """Ends the audio and returns the final transcript."""
+
+    def cancel(self):
+        pass
+
+    def _emit(self, event):
+        self.events.append(event)
+        if event.is_final:
+            self.final_at = event.received_at
+        if self.on_event:
+            self.on_event(event)
+
+    @property
+    def final_latency(self):
+        """Seconds from the end of the audio to the final transcript."""
+        if self.finished_at is None or self.final_at is None:
+            return None
+        return max(0.0, self.final_at - self.finished_at)
+
+
+class DeepgramSession(StreamingSession):
+    """
+    Deepgram live transcription over a websocket, opened on the first send().
+    Audio is queued until the connection is up, so the TLS handshake overlaps
+    with the user speaking. finish() sends Finalize, which makes Deepgram
+    flush its final result right away instead of waiting for its own
+    endpointing.
+    """
+
+    def __init__(self, sample_rate, on_event=None, api_key=None, url=DEEPGRAM_URL, model=DEEPGRAM_MODEL):
+        super().__init__(sample_rate, on_event)
+        params = {
+            "model": model,
+            "encoding": "linear16",
+            "sample_rate": sample_rate,
+            "channels": 1,
+            "interim_results": "true",
+            "punctuate": "true",
+        }
+        self.url = f"{url}?{urlencode(params)}"
+        self.api_key = api_key if api_key is not None else os.getenv("DEEPGRAM_API_KEY")
+        self._outbox = queue.Queue()
+        self._finals = []
+        self._done = threading.Event()
+        self._error = None
+        self._thread = None
+
+    def send(self, data):
+        if self._thread is None:
+            self.first_audio_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._outbox.put(bytes(data))
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+        if self._thread is None:
+            return ""
+        self._outbox.put(None)
+        if not self._done.wait(FINAL_TIMEOUT):
+            self._error = self._error or TimeoutError("no final transcript from Deepgram")
+        if self._error:
+            raise self._error
+        return " ".join(self._finals).strip()
+
+    def cancel(self):
+        if self._thread is not None:
+            self._outbox.put(False)
+
+    def _run(self):
+        from websockets.sync.client import connect
+
+        try:
+            headers = {"Authorization": f"Token {self.api_key}"} if self.api_key else {}
+            with connect(self.url, additional_headers=headers, open_timeout=5) as websocket:
+                receiver = threading.Thread(target=self._receive, args=(websocket,), daemon=True)
+                receiver.start()
+                while True:
+                    data = self._outbox.get()
+                    if data is None:
+                        websocket.send(json.dumps({"type": "Finalize"}))
+                        break
+                    if data is False:
+                        websocket.send(json.dumps({"type": "CloseStream"}))
+                        self._done.set()
+                        return
+                    websocket.send(data)
+                # Wait for the flushed final, then let Deepgram close the stream
+                self._done.wait(FINAL_TIMEOUT)
+                websocket.send(json.dumps({"type": "CloseStream"}))
+                receiver.join(timeout=1)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def _receive(self, websocket):
+        try:
+            for message in websocket:
+                result = json.loads(message)
+                if result.get("type") != "Results":
+                    continue
+                alternatives = result.get("channel", {}).get("alternatives") or [{}]
+                text = alternatives[0].get("transcript", "")
+                is_final = bool(result.get("is_final"))
+                if is_final and text:
+                    self._finals.append(text)
+                if text or is_final:
+                    self._emit(TranscriptEvent(" ".join(self._finals + ([] if is_final else [text])), is_final))
+                if result.get("from_finalize"):
+                    self._done.set()
+        except Exception as e:
+            if not self._done.is_set():
+                self._error = e
+        finally:
+            self._done.set()
+
+
+class BufferedSession(StreamingSession):
+    """
+    Adapts a batch transcriber, transcribe(pcm_bytes, sample_rate) -> text,
+    to the streaming interface. Audio is collected as it arrives; with
+    interim_interval set, the audio so far is re-transcribed on a background
+    thread that often to produce interim events (only sensible for a fast
+    local model).
+    """
+
+    def __init__(self, sample_rate, on_event=None, transcribe=None, interim_interval=None):
+        super().__init__(sample_rate, on_event)
+        self.transcribe = transcribe
+        self.interim_interval = interim_interval
+        self._audio = bytearray()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._interim_thread = None
+
+    def send(self, data):
+        if self.first_audio_at is None:
+            self.first_audio_at = time.monotonic()
+            if self.interim_interval:
+                self._interim_thread = threading.Thread(target=self._interims, daemon=True)
+                self._interim_thread.start()
+        with self._lock:
+            self._audio += data
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+        self._stop.set()
+        if self._interim_thread:
+            self._interim_thread.join()
+        with self._lock:
+            audio = bytes(self._audio)
+        text = self.transcribe(audio, self.sample_rate) if audio else ""
+        self._emit(TranscriptEvent(text, True))
+        return text
+
+    def cancel(self):
+        self._stop.set()
+
+    def _interims(self):
+        while not self._stop.wait(self.interim_interval):
+            with self._lock:
+                audio = bytes(self._audio)
+            text = self.transcribe(audio, self.sample_rate)
+            if text and not self._stop.is_set():
+                self._emit(TranscriptEvent(text, False))
+
+
+class StreamingRecognizer:
+    """
+    Creates a session per utterance for one backend ("deepgram" or a batch
+    transcriber). fallback, if given, is a batch transcriber that gets the
+    utterance when the backend fails.
+    """
+
+    def __init__(self, backend="deepgram", transcribe=None, interim_interval=None, fallback=None, **options):
+        self.backend = backend
+        self.transcribe = transcribe
+        self.interim_interval = interim_interval
+        self.fallback = fallback
+        self.options = options
+        self.stats = {"utterances": 0, "errors": 0, "fallbacks": 0, "final_latency": 0.0}
+
+    def session(self, sample_rate, on_event=None):
+        if self.backend == "deepgram":
+            return DeepgramSession(sample_rate, on_event, **self.options)
+        return BufferedSession(sample_rate, on_event, self.transcribe, self.interim_interval)
+
+    def record(self, session):
+        self.stats["utterances"] += 1
+        if session.final_latency is not None:
+            self.stats["final_latency"] += session.final_latency
+
+    def report(self):
+        s = self.stats
+        average = s["final_latency"] / s["utterances"] if s["utterances"] else 0.0
+        return (f"backend={self.backend} utterances={s['utterances']} errors={s['errors']} "
+                f"fallbacks={s['fallbacks']} avg_final_after_speech={average * 1000:.0f}ms")
+
+
+def google_transcriber(recognizer):
+    """Batch transcriber over recognize_google (cloud, used as the fallback)."""
+
+    def transcribe(audio, sample_rate):
+        try:
+            return recognizer.recognize_google(sr.AudioData(audio, sample_rate, 2))
+        except sr.UnknownValueError:
+            return ""
+
+    return transcribe
+
+
+def sphinx_transcriber(recognizer):
+    """Batch transcriber over recognize_sphinx (fully local, needs pocketsphinx)."""
+
+    def transcribe(audio, sample_rate):
+        try:
+            return recognizer.recognize_sphinx(sr.AudioData(audio, sample_rate, 2))
+        except sr.UnknownValueError:
+            return ""
+
+    return transcribe
+
+
+def make_fallback(name, recognizer):
+    """Batch transcriber to use when the main backend fails: "google", "sphinx", or None for "none"."""
+    if name == "google":
+        return google_transcriber(recognizer)
+    if name == "sphinx":
+        return sphinx_transcriber(recognizer)
+    if name != "none":
+        print(f"Unknown STT fallback {name!r}, running without one")
+    return None
+
+
+def make_recognizer(name, recognizer, fallback=None):
+    """
+    Backend by name: "deepgram" (needs DEEPGRAM_API_KEY), "whisper" (local,
+    loads and warms the model here, so it can take a few seconds), "sphinx"
+    (local) or "google" (batch recognize_google behind the same interface).
+
+    fallback (default STT_FALLBACK) names the batch backend that retries an
+    utterance the main one failed on. Only streaming cloud backends get one
+    unless asked: a local backend stays local, and retrying "google" with
+    itself would just send the same request twice.
+    """
+    fallback = fallback or os.getenv("STT_FALLBACK") or ("google" if name in STREAMING_BACKENDS else "none")
+    if fallback == name:
+        fallback = "none"
+    fallback = make_fallback(fallback, recognizer)
+    if name == "deepgram":
+        return StreamingRecognizer("deepgram", fallback=fallback, url=os.getenv("DEEPGRAM_URL") or DEEPGRAM_URL)
+    if name == "whisper":
+        from whisper_stt import DEFAULT_MODEL, WhisperTranscriber
+        transcriber = WhisperTranscriber(
+            os.getenv("WHISPER_MODEL") or DEFAULT_MODEL,
+            engine=os.getenv("WHISPER_ENGINE") or "auto",
+            compute_type=os.getenv("WHISPER_COMPUTE_TYPE") or "int8")
+        print(f"Whisper ready: {transcriber.report()}")
+        return StreamingRecognizer("whisper", transcriber, fallback=fallback)
+    if name == "sphinx":
+        return StreamingRecognizer("sphinx", sphinx_transcriber(recognizer), fallback=fallback)
+    return StreamingRecognizer("google", google_transcriber(recognizer), fallback=fallback)
+
+
+def listen_and_transcribe(mic_stream, stt, timeout=None, phrase_time_limit=None, on_event=None, start=None):
+    """
+    Listens for one utterance, streaming its audio to the recognizer while
+    the user is still speaking. Returns (text, audio_data). Raises
+    sr.WaitTimeoutError like listen(). If the backend fails, the error is
+    counted and the captured audio goes to the recognizer's fallback, or
+    sr.RequestError is raised when it has none. start is passed on to
+    mic_stream.listen() (e.g. the cursor after a wake word).
+    """
+    session = stt.session(mic_stream.source.SAMPLE_RATE, on_event)
+    try:
+        audio_data = mic_stream.listen(timeout, phrase_time_limit, on_audio=session.send, start=start)
+    except BaseException:
+        session.cancel()
+        raise
+    try:
+        text = session.finish()
+    except Exception as e:
+        stt.stats["errors"] += 1
+        if stt.fallback is None:
+            raise sr.RequestError(f"{stt.backend} STT failed: {e}") from e
+        print(f"{stt.backend} STT failed ({e}), falling back")
+        stt.stats["fallbacks"] += 1
+        return stt.fallback(audio_data.frame_data, audio_data.sample_rate), audio_data
+    stt.record(session)
+    return text, audio_data
+
+
+if __name__ == "__main__":
+    # Self-check against a local stand-in speaking Deepgram's live protocol:
+    # one interim word per 0.25 s of audio, the full transcript on Finalize
+    import sys
+    from websockets.sync.server import serve
+
+    if len(sys.argv) != 2 or sys.argv[1] != "selfcheck":
+        print("Usage: python streaming_stt.py selfcheck")
+        sys.exit(1)
+
+    WORDS = "turn the servo to the left please and tell me the temperature".split()
+
+    def stand_in(websocket):
+        rate = int(dict(part.split("=") for part in websocket.request.path.split("?")[1].split("&"))["sample_rate"])
+        received = 0
+        words = 0
+        for message in websocket:
+            if isinstance(message, bytes):
+                received += len(message)
+                heard = int(received / (rate * 2) / 0.25)
+                if heard > words:
+                    words = heard
+                    websocket.send(json.dumps({"type": "Results", "is_final": False, "channel": {
+                        "alternatives": [{"transcript": " ".join(WORDS[:words])}]}}))
+                continue
+            control = json.loads(message)
+            if control["type"] == "Finalize":
+                time.sleep(0.02)  # A little server-side work
+                websocket.send(json.dumps({"type": "Results", "is_final": True, "from_finalize": True,
+                                           "channel": {"alternatives": [{"transcript": " ".join(WORDS[:words])}]}}))
+            elif control["type"] == "CloseStream":
+                return
+
+    with serve(stand_in, "127.0.0.1", 0) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"ws://127.0.0.1:{server.socket.getsockname()[1]}/v1/listen"
+        stt = StreamingRecognizer("deepgram", url=url, api_key="test")
+
+        for utterance in range(3):
+            events = []
+            session = stt.session(16000, events.append)
+            chunk = b"\0" * 2048  # 64 ms at 16 kHz, sent in real time like the microphone would
+            for _ in range(30):
+                session.send(chunk)
+                time.sleep(0.064)
+            text = session.finish()
+            stt.record(session)
+            interims = [event for event in events if not event.is_final]
+            print(f"utterance {utterance}: {len(interims)} interim events, final {text!r} "
+                  f"{session.final_latency * 1000:.0f} ms after the end of the audio")
+            assert interims and events[-1].is_final and text == " ".join(WORDS[:7])
+        print(stt.report())
+        server.shutdown()
+    print("Self-check passed")
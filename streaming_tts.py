@@ -0,0 +1,131 @@
+import io
+import re
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from startup import lazy_import
+
+# Loaded on first use so importing this module stays cheap
+pygame = lazy_import("pygame")
+
+# A sentence ends at . ! ? (plus any closing quotes/brackets) followed by whitespace,
+# or at a line break. Short fragments are merged so TTS isn't called for "Mr." etc.
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
+MIN_SENTENCE_CHARS = 20
+
+
+def stream_llm_text(client, messages, model, cancel=None):
+    """
+    Yields content fragments from a streaming Groq chat completion. Setting
+    `cancel` closes the stream, so the rest of the reply is never generated.
+    """
+    stream = client.chat.completions.create(
+        messages=messages,
+        model=model,
+        stream=True,
+    )
+    for chunk in stream:
+        if cancel is not None and cancel.is_set():
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            return
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+def split_sentences(fragments, min_chars=MIN_SENTENCE_CHARS):
+    """Cuts a stream of text fragments into sentences as soon as each one is complete."""
+    buffer = ""
+    for fragment in fragments:
+        buffer += fragment
+        search_from = 0
+        while True:
+            match = SENTENCE_END.search(buffer, search_from)
+            if not match:
+                break
+            if match.end() < min_chars:
+                search_from = match.end()
+                continue
+            sentence = buffer[:match.end()].strip()
+            buffer = buffer[match.end():]
+            search_from = 0
+            if sentence:
+                yield sentence
+
+    # Whatever is left when the stream ends is the final sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def speak_stream(sentences, synthesize, play=None, max_workers=2, cancel=None):
+    """
+    Synthesizes sentences while later ones are still being generated and plays
+    them back in order. `synthesize` turns a sentence into audio (bytes or an
+    iterator of chunks) and `play` plays it, either starting playback and
+    returning or blocking until done (defaults to pygame's music channel).
+    Returns once the last sentence has finished playing, or as soon as
+    `cancel` is set (sentences not yet synthesized are dropped).
+    """
+    play = play or _play_with_mixer
+    pending = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def produce():
+        try:
+            for sentence in sentences:
+                if cancel is not None and cancel.is_set():
+                    break
+                pending.put(executor.submit(synthesize, sentence))
+        except Exception as e:
+            print(f"Error while streaming reply: {e}")
+        finally:
+            pending.put(None)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    futures = deque()
+    producing = True
+    clock = pygame.time.Clock()
+    try:
+        while producing or futures or pygame.mixer.music.get_busy():
+            if cancel is not None and cancel.is_set():
+                pygame.mixer.music.stop()
+                for future in futures:
+                    future.cancel()
+                break
+
+            # Pick up newly submitted sentences without blocking playback
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    producing = False
+                else:
+                    futures.append(item)
+
+            # Start the next sentence the moment the previous one is done
+            if futures and futures[0].done() and not pygame.mixer.music.get_busy():
+                future = futures.popleft()
+                try:
+                    play(future.result())
+                except Exception as e:
+                    print(f"Error synthesizing speech: {e}")
+
+            clock.tick(100)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _play_with_mixer(audio):
+    """Plays a complete MP3 clip through pygame's music channel."""
+    if not isinstance(audio, bytes):
+        audio = b"".join(audio)
+    pygame.mixer.music.load(io.BytesIO(audio), "mp3")
+    pygame.mixer.music.play()
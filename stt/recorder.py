@@ -1,4 +1,5 @@
 import os
+import sys
 import uuid
 from elevenlabs import VoiceSettings
 from elevenlabs.client import ElevenLabs
@@ -7,6 +8,11 @@ from groq import Groq
 import pygame
 import speech_recognition as sr
 
+# Shared modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mic_stream import MicStream
+from wake_word import start_gate, LISTEN_AFTER_WAKE
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -87,7 +93,8 @@ def text_to_speech_file(text: str) -> str:
 
 # Function to listen to the microphone and get speech-to-text
 recognizer = sr.Recognizer()
-mic = sr.Microphone()
+mic_stream = MicStream(recognizer).start()  # Opened once, noise floor tracked in the background
+wake_gate = start_gate(mic_stream)  # "Jarvis" spotted locally; None runs without a wake word
 
 LISTEN_TIMEOUT = 30
 SILENCE_THRESHOLD = 300
@@ -95,25 +102,29 @@ SILENCE_THRESHOLD = 300
 print("Listening... Speak now!")
 
 while True:
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source)  # Adjust for ambient noise
-        try:
-            audio_data = recognizer.listen(source, timeout=LISTEN_TIMEOUT, phrase_time_limit=LISTEN_TIMEOUT)
-            print("Audio detected, processing...")
-
-            # Recognize speech using Google speech recognition
-            text = recognizer.recognize_google(audio_data)
-            print("Recognized text:", text)
-
-            # Send the recognized text to the LLM and also convert it to speech
-            llm_response = send_to_llm(text)  # You can send the recognized text to the LLM here
+    try:
+        # Only speech after the wake word goes to the recognizer
+        start = wake_gate.wait() if wake_gate else None
+        audio_data = mic_stream.listen(timeout=LISTEN_AFTER_WAKE if wake_gate else LISTEN_TIMEOUT,
+                                       phrase_time_limit=LISTEN_TIMEOUT, start=start)
+        if wake_gate:
+            wake_gate.passed(audio_data)
+        print("Audio detected, processing...")
+
+        # Recognize speech using Google speech recognition
+        text = recognizer.recognize_google(audio_data)
+        print("Recognized text:", text)
+
+        # Send the recognized text to the LLM and also convert it to speech
+        llm_response = send_to_llm(text)  # You can send the recognized text to the LLM here
+        with mic_stream.hold_noise_floor():
             text_to_speech_file(llm_response)  # Respond with text-to-speech
 
-        except sr.WaitTimeoutError:
-            print("Listening timeout reached. No speech detected.")
-        except sr.UnknownValueError:
-            print("Sorry, I didn't catch that.")
-        except sr.RequestError as e:
-            print(f"Could not request results from Google Speech Recognition service; {e}")
+    except sr.WaitTimeoutError:
+        print("Listening timeout reached. No speech detected.")
+    except sr.UnknownValueError:
+        print("Sorry, I didn't catch that.")
+    except sr.RequestError as e:
+        print(f"Could not request results from Google Speech Recognition service; {e}")
 
     # No need for user input or exit prompt, conversation will continue indefinitely
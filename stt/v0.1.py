@@ -17,10 +17,23 @@ elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
 # Initialize Pygame Mixer for Audio Playback
 pygame.mixer.init()
 
-import json
+import sys
 from gpio_control import control_led  # Import GPIO function
 
+# Shared modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fast_path import FastPath
+from mic_stream import MicStream
+
+# LED commands are handled locally before anything goes to the LLM
+fast_path = FastPath(set_led=control_led)
+
 def send_to_llm(text):
+    reply = fast_path.handle(text)
+    if reply is not None:
+        print("Local reply:", reply)
+        return reply
+
     print("Sending to LLM:", text)
 
     client = Groq(api_key=GROQ_API_KEY)
@@ -37,16 +50,7 @@ def send_to_llm(text):
     response_text = chat_completion.choices[0].message.content
     print("LLM Response:", response_text)
 
-    # **Check if response requires function calling**
-    if "turn on led" in text.lower():
-        result = control_led("on")
-        return json.dumps(result)  # Return structured response
-
-    elif "turn off led" in text.lower():
-        result = control_led("off")
-        return json.dumps(result)
-
-    return response_text  # Default response if no LED control requested
+    return response_text
 
 
 def text_to_speech_and_play(text):
@@ -84,35 +88,31 @@ def text_to_speech_and_play(text):
 
 # Initialize Speech Recognition
 recognizer = sr.Recognizer()
-mic = sr.Microphone()
 
-# **Improve Speech Recognition Settings**
-recognizer.dynamic_energy_threshold = True  # Automatically adjust for noise
-recognizer.energy_threshold = 300  # Sensitivity for voice detection
-recognizer.pause_threshold = 1.0  # Wait time after speech before processing (Default is 0.8, increased to 1.0)
-recognizer.non_speaking_duration = 0.5  # Minimum silence time before ending capture
+# Utterance ends come from the frame-level VAD (vad.py), a few hundred ms after
+# the speaker stops, instead of waiting out a 1.0 s pause_threshold
+mic_stream = MicStream(recognizer, use_vad=True).start()
 
 print("Listening... Speak now!")
 
 while True:
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source, duration=1)  # Adjust for noise dynamically
-        try:
-            print("Waiting for speech...")
-            audio_data = recognizer.listen(source, timeout=10, phrase_time_limit=15)  # Allow up to 15 seconds per speech
-            print("Audio detected, processing...")
-
-            # Recognize speech using Google Speech Recognition
-            text = recognizer.recognize_google(audio_data)
-            print("Recognized text:", text)
-
-            # Send to LLM and play response
-            llm_response = send_to_llm(text)
+    try:
+        print("Waiting for speech...")
+        audio_data = mic_stream.listen(timeout=10, phrase_time_limit=15)  # Allow up to 15 seconds per speech
+        print("Audio detected, processing...")
+
+        # Recognize speech using Google Speech Recognition
+        text = recognizer.recognize_google(audio_data)
+        print("Recognized text:", text)
+
+        # Send to LLM and play response
+        llm_response = send_to_llm(text)
+        with mic_stream.hold_noise_floor():
             text_to_speech_and_play(llm_response)
 
-        except sr.WaitTimeoutError:
-            print("Listening timeout reached. No speech detected.")
-        except sr.UnknownValueError:
-            print("Sorry, I didn't catch that.")
-        except sr.RequestError as e:
-            print(f"Could not request results from Google Speech Recognition service: {e}")
+    except sr.WaitTimeoutError:
+        print("Listening timeout reached. No speech detected.")
+    except sr.UnknownValueError:
+        print("Sorry, I didn't catch that.")
+    except sr.RequestError as e:
+        print(f"Could not request results from Google Speech Recognition service: {e}")
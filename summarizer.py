@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+import threading
+
+SUMMARY_INSTRUCTIONS = """You maintain the long-term memory of a voice assistant called JARVIS.
+Merge the new conversation excerpt into the existing summary. Keep names, preferences,
+facts the user shared, decisions and open requests. Drop small talk. Write at most
+200 words of plain prose, no lists."""
+FINGERPRINT_MESSAGES = 3  # Messages just before the summary's end that identify it in a reloaded history
+
+
+def build_summary_request(previous_summary, messages):
+    """Builds the chat messages asking an LLM to fold `messages` into the running summary."""
+    transcript = "\n".join(
+        f"{message['role']}: {message.get('content', '')}"
+        for message in messages
+        if message.get("role") in ("user", "assistant")
+    )
+    return [
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+        {"role": "user", "content": f"Existing summary:\n{previous_summary or '(none yet)'}\n\n"
+                                    f"New conversation excerpt:\n{transcript}"},
+    ]
+
+
+def fingerprint(messages):
+    """Hash of the last few messages, to find the same point in the history after a restart."""
+    digest = hashlib.sha1()
+    for message in messages[-FINGERPRINT_MESSAGES:]:
+        digest.update(f"{message.get('role')}\0{message.get('content', '')}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RollingSummarizer:
+    """
+    Compresses turns that have aged out of the LLM context into one running
+    summary message.
+
+    `schedule` is called between turns and returns immediately; the actual LLM
+    call runs on a background thread and only covers the messages that aged
+    out since the last summary. If a job is still running the new slice simply
+    waits for the next turn.
+
+    How far the summary reaches is saved with it as a fingerprint of the
+    last messages it covers, so after a restart summarizing resumes from
+    there in the reloaded history instead of folding the same turns in again.
+    """
+
+    def __init__(self, summarize, path="chat_summary.json", min_new_messages=8):
+        self.summarize = summarize  # (previous_summary, messages) -> new summary text
+        self.path = path
+        self.min_new_messages = min_new_messages
+        self.summary = ""
+        self._summarized_upto = None
+        self._upto_fingerprint = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._load()
+
+    def context_messages(self):
+        """Messages to put right after the system prompt (empty until there is a summary)."""
+        with self._lock:
+            summary = self.summary
+        if not summary:
+            return []
+        return [{"role": "system", "content": f"Summary of the earlier conversation: {summary}"}]
+
+    def schedule(self, history, aged_out_upto):
+        """Starts summarizing history[..:aged_out_upto] in the background if enough has aged out."""
+        with self._lock:
+            if self._summarized_upto is None:
+                self._summarized_upto = self._resume_point(history)
+            start = self._summarized_upto
+            if self._running or aged_out_upto - start < self.min_new_messages:
+                return False
+            self._running = True
+            previous_summary = self.summary
+
+        # Copy the slice so the worker never touches the live history list
+        messages = [dict(message) for message in history[start:aged_out_upto]]
+        worker = threading.Thread(
+            target=self._run,
+            args=(previous_summary, messages, aged_out_upto),
+            daemon=True,
+        )
+        worker.start()
+        return True
+
+    def _run(self, previous_summary, messages, upto):
+        try:
+            summary = self.summarize(previous_summary, messages)
+            if summary:
+                with self._lock:
+                    self.summary = summary.strip()
+                    self._summarized_upto = upto
+                    self._upto_fingerprint = fingerprint(messages)
+                self._save()
+        except Exception as e:
+            print(f"Error summarizing conversation: {e}")
+        finally:
+            with self._lock:
+                self._running = False
+
+    def _resume_point(self, history):
+        """Index just past the last message the saved summary covers (the first message if not found)."""
+        first = 1 if history and history[0].get("role") == "system" else 0
+        if self._upto_fingerprint:
+            for end in range(len(history), first + FINGERPRINT_MESSAGES - 1, -1):
+                if fingerprint(history[end - FINGERPRINT_MESSAGES:end]) == self._upto_fingerprint:
+                    return end
+        # Not in the reloaded tail: the summary stops before it, so all of it is new
+        return first
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as file:
+                    saved = json.load(file)
+                self.summary = saved.get("summary", "")
+                self._upto_fingerprint = saved.get("upto")
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: Could not load conversation summary ({e}).")
+
+    def _save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"summary": self.summary, "upto": self._upto_fingerprint}, file, ensure_ascii=False)
+        os.replace(temp_path, self.path)
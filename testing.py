@@ -4,22 +4,29 @@ import json
 import pygame
 import serial
 import time
+import threading
 from datetime import datetime
 import speech_recognition as sr
 from dotenv import load_dotenv
-from groq import Groq
-from elevenlabs import VoiceSettings, ElevenLabs
+from elevenlabs import VoiceSettings
+from clients import client_pool
+from streaming_tts import stream_llm_text, split_sentences, speak_stream
+from audio_sink import StreamingAudioSink, prefetch
 
 # Load API keys from .env file
 load_dotenv()
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Initialize ElevenLabs client
-elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+# Shared ElevenLabs client (pooled keep-alive connections)
+elevenlabs_client = client_pool.elevenlabs()
 
-# Initialize Pygame Mixer
-pygame.mixer.init()
+# Initialize Pygame Mixer at the TTS sample rate so PCM blocks play without resampling
+pygame.mixer.init(frequency=22050, size=-16, channels=1)
+
+# Raw PCM skips MP3 decoding on the Pi; "mp3_22050_32" also works (decoded through mpg123)
+TTS_OUTPUT_FORMAT = "pcm_22050"
+audio_sink = StreamingAudioSink(TTS_OUTPUT_FORMAT)
 
 MEMORY_FILE = "chat_memory.json"
 
@@ -152,7 +159,8 @@ def detect_environment_query(text):
     
     return is_env_query, is_servo_query
 
-def send_to_llm(text, sensor_data=None, servo_moved=False, servo_angle=None):
+def add_turn_context(text, sensor_data=None, servo_moved=False, servo_angle=None):
+    """Appends sensor/servo context and the user's message to history."""
     global history
     
     # Only add sensor data context if it's an environmental query
@@ -176,9 +184,14 @@ def send_to_llm(text, sensor_data=None, servo_moved=False, servo_angle=None):
     
     # Add user input to history
     history.append({"role": "user", "content": text})
+
+def send_to_llm(text, sensor_data=None, servo_moved=False, servo_angle=None):
+    global history
+    
+    add_turn_context(text, sensor_data, servo_moved, servo_angle)
     
     # Generate response with conversation history
-    client = Groq(api_key=GROQ_API_KEY)
+    client = client_pool.groq()
     chat_completion = client.chat.completions.create(
         messages=history,
         model="llama-3.3-70b-versatile",
@@ -193,12 +206,36 @@ def send_to_llm(text, sensor_data=None, servo_moved=False, servo_angle=None):
     
     return response_text
 
-def text_to_speech_and_play(text):
-    print("Converting to speech...")
+def stream_reply_and_speak(text, sensor_data=None, servo_moved=False, servo_angle=None):
+    """Streams the LLM reply into TTS sentence by sentence and returns the full text."""
+    global history
+    
+    add_turn_context(text, sensor_data, servo_moved, servo_angle)
+    
+    # Keep every fragment so the complete reply can go into history afterwards
+    reply_parts = []
+    def reply_fragments():
+        client = client_pool.groq()
+        for fragment in stream_llm_text(client, history, "llama-3.3-70b-versatile"):
+            reply_parts.append(fragment)
+            yield fragment
+    
+    speak_stream(split_sentences(reply_fragments()), synthesize_speech, play=audio_sink.play)
     
+    response_text = "".join(reply_parts)
+    print("JARVIS Response:", response_text)
+    
+    if response_text:
+        history.append({"role": "assistant", "content": response_text})
+        save_memory(history)
+    
+    return response_text
+
+def synthesize_speech(text):
+    """Starts an ElevenLabs TTS request and returns an iterator over the audio chunks as they arrive."""
     response = elevenlabs_client.text_to_speech.convert(
         voice_id="pNInz6obpgDQGcFmaJgB",  # Adam's voice
-        output_format="mp3_22050_32", 
+        output_format=TTS_OUTPUT_FORMAT, 
         text=text,
         model_id="eleven_turbo_v2_5", 
         voice_settings=VoiceSettings(
@@ -209,17 +246,13 @@ def text_to_speech_and_play(text):
         ),
     )
     
-    audio_data = io.BytesIO()
-    for chunk in response:
-        if chunk:
-            audio_data.write(chunk)
-    audio_data.seek(0)
-    
-    pygame.mixer.music.load(audio_data, "mp3")
-    pygame.mixer.music.play()
+    return prefetch(response)
+
+def text_to_speech_and_play(text):
+    print("Converting to speech...")
     
-    while pygame.mixer.music.get_busy():
-        pygame.time.Clock().tick(10)
+    # Playback starts as soon as the first audio arrives
+    audio_sink.play(synthesize_speech(text))
 
 def main():
     global history
@@ -227,6 +260,11 @@ def main():
     # Initialize history at startup
     history = load_memory()
     
+    # Open API connections in the background while the hardware starts up
+    warm_up = threading.Thread(target=client_pool.warm_up, args=(["groq", "elevenlabs"],), daemon=True)
+    warm_up.start()
+    client_pool.start_keepalive()
+    
     # Initialize components
     controller = EnvironmentController()
     recognizer = sr.Recognizer()
@@ -257,11 +295,8 @@ def main():
                             controller.move_servo(servo_angle)
                             servo_moved = True
                     
-                    # Get JARVIS response
-                    response = send_to_llm(text, sensor_data, servo_moved, servo_angle)
-                    
-                    # Convert response to speech and play
-                    text_to_speech_and_play(response)
+                    # Stream JARVIS response into speech as it is generated
+                    stream_reply_and_speak(text, sensor_data, servo_moved, servo_angle)
                     
                 except sr.UnknownValueError:
                     print("JARVIS: I didn't quite catch that. Could you please repeat?")
@@ -272,6 +307,7 @@ def main():
         print("\nJARVIS: Shutting down. Goodbye!")
     finally:
         controller.close()
+        print(client_pool.report())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
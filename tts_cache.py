@@ -0,0 +1,128 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+
+TTS_CACHE_DIR = "tts_cache"
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_phrase(text):
+    """Collapses whitespace so trivially different spellings of a phrase share audio."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of synthesized speech.
+
+    Each clip is stored as `<sha256>.<ext>` where the hash covers the voice,
+    model, output format, voice settings and normalized text. Hits refresh the
+    file's mtime and the oldest files are deleted once the cache grows past
+    `max_bytes`, which makes it an LRU that survives restarts.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+
+        # path -> (mtime, size) for everything already on disk
+        self._files = {}
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            info = os.stat(path)
+            self._files[path] = (info.st_mtime, info.st_size)
+        self._total = sum(size for _, size in self._files.values())
+
+    def key(self, text, voice_id, model_id, output_format, voice_settings=None):
+        material = json.dumps({
+            "text": normalize_phrase(text),
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "output_format": output_format,
+            "voice_settings": voice_settings or {},
+        }, sort_keys=True)
+        digest = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        extension = output_format.split("_", 1)[0]
+        return f"{digest}.{extension}"
+
+    def get(self, key):
+        """Returns the cached audio bytes or None."""
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["misses"] += 1
+                self._drop(path)
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+            self._files[path] = (os.path.getmtime(path), len(data))
+        return data
+
+    def put(self, key, data):
+        if not data:
+            return
+        path = os.path.join(self.directory, key)
+        # A temp file per writer: the same phrase can be synthesized twice at once (warm-up and a live turn)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=key + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        with self._lock:
+            self._drop(path)
+            self._files[path] = (os.path.getmtime(path), len(data))
+            self._total += len(data)
+            self._evict()
+
+    def cached_stream(self, key, chunks):
+        """
+        Passes audio chunks through while collecting them, and stores the whole
+        clip once the stream finishes.
+        """
+        collected = []
+        for chunk in chunks:
+            if chunk:
+                collected.append(chunk)
+                yield chunk
+        self.put(key, b"".join(collected))
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self.directory, key))
+
+    def report(self):
+        return (f"hits={self.stats['hits']} misses={self.stats['misses']} evictions={self.stats['evictions']} "
+                f"files={len(self._files)} size={self._total / 1024 / 1024:.1f}MB")
+
+    def _drop(self, path):
+        if path in self._files:
+            self._total -= self._files.pop(path)[1]
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for path, _ in sorted(self._files.items(), key=lambda item: item[1][0]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._drop(path)
+            self.stats["evictions"] += 1
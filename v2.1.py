@@ -1,69 +1,171 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import os
+import sys
 import io
 import json
-import pygame
-import serial
-import time
+import asyncio
+import threading
+from contextlib import contextmanager, ExitStack
 from datetime import datetime
-import speech_recognition as sr
 from dotenv import load_dotenv
-from groq import Groq
-from elevenlabs import VoiceSettings, ElevenLabs
+from startup import Startup, lazy_import
+from clients import client_pool
+from streaming_tts import stream_llm_text, split_sentences
+from audio_sink import StreamingAudioSink, prefetch, PCM_SAMPLE_RATES
+from chat_journal import ChatJournal, migrate_json_memory
+from context_builder import ContextBuilder
+from summarizer import RollingSummarizer, build_summary_request
+from retrieval import TurnIndex
+from response_cache import ResponseCache
+from tts_cache import TTSCache
+from fast_path import FastPath, STOCK_REPLIES
+from sensor_reader import SensorReader
+from sensor_store import SensorStore
+from sensor_query import SensorHistory, detect_fields
+from actuator_queue import ServoQueue
+from serial_protocol import encode_servo_command
+import serial_daemon
+from mic_stream import MicStream
+from streaming_stt import make_recognizer, listen_and_transcribe
+from wake_word import start_gate, LISTEN_AFTER_WAKE
+from barge_in import EchoReference, BargeInMonitor
+from pipeline import Pipeline, Stage
+from earcons import EarconBank
+
+# Heavy modules are imported on first use, inside the startup phases that need them
+pygame = lazy_import("pygame")
+serial = lazy_import("serial")
+sr = lazy_import("speech_recognition")
+elevenlabs = lazy_import("elevenlabs")
 
 # Load API keys from .env file
 load_dotenv()
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Initialize ElevenLabs client
-elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+# Raw PCM skips MP3 decoding on the Pi; "mp3_22050_32" also works (decoded through mpg123)
+TTS_OUTPUT_FORMAT = "pcm_22050"
+# What is played is kept as the echo reference, so the user can talk over a reply without it hearing itself
+echo_reference = EchoReference()
+audio_sink = StreamingAudioSink(TTS_OUTPUT_FORMAT, echo_reference=echo_reference)
+
+VOICE_ID = "pNInz6obpgDQGcFmaJgB"  # Adam's voice
+TTS_MODEL_ID = "eleven_turbo_v2_5"
+VOICE_SETTINGS = {
+    "stability": 0.0,
+    "similarity_boost": 1.0,
+    "style": 0.0,
+    "use_speaker_boost": True,
+}
+
+# Synthesized phrases are kept on disk so repeats play without a network call
+tts_cache = TTSCache()
+
+# Acknowledgements worth having ready before anyone asks (python v2.1.py --warm-tts-cache)
+STOCK_PHRASES = STOCK_REPLIES + [
+    "Let me check the sensors.",
+    "I didn't quite catch that. Could you please repeat?",
+]
+
+MEMORY_FILE = "chat_memory.json"  # Old single-file history, migrated on first run
+JOURNAL_FILE = "chat_memory.jsonl"
+MEMORY_TURNS = 50  # Turns loaded back at startup
+
+CONTEXT_TOKEN_BUDGET = 6000  # Max prompt size sent to the LLM per turn
+SUMMARY_FILE = "chat_summary.json"
+SUMMARY_MODEL = "llama-3.1-8b-instant"  # Small model is plenty for summaries
+TURN_INDEX_DIR = "turn_index"  # Backfill with: python retrieval.py backfill chat_memory.jsonl
+RETRIEVAL_TOP_K = 3
+RESPONSE_CACHE_TTL = 600  # Seconds a cached reply stays valid
+# Speech is streamed to the recognizer while the user talks: Deepgram when a key is set,
+# otherwise batch recognize_google behind the same interface ("whisper" and "sphinx" run locally).
+# Only Deepgram falls back to recognize_google on failure unless STT_FALLBACK says otherwise ("none" to disable)
+STT_BACKEND = os.getenv("STT_BACKEND") or ("deepgram" if os.getenv("DEEPGRAM_API_KEY") else "google")
 
-# Initialize Pygame Mixer
-pygame.mixer.init()
+journal = ChatJournal(JOURNAL_FILE)
+context_builder = ContextBuilder(CONTEXT_TOKEN_BUDGET)
 
-MEMORY_FILE = "chat_memory.json"
+def summarize_turns(previous_summary, messages):
+    """Folds aged-out messages into the running summary (runs on the summarizer's thread)."""
+    client = client_pool.groq()
+    chat_completion = client.chat.completions.create(
+        messages=build_summary_request(previous_summary, messages),
+        model=SUMMARY_MODEL,
+    )
+    return chat_completion.choices[0].message.content
+
+summarizer = RollingSummarizer(summarize_turns, SUMMARY_FILE)
+turn_index = None  # Embedding index of past turns, loaded in main()
+response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL)
 
 # Initialize global history
 history = []
+sensor_history = None  # Query engine over the stored sensor readings, set up in main()
+journaled_count = 0  # How much of history is already in the journal
 
 class EnvironmentController:
     def __init__(self, port='/dev/ttyUSB0', baudrate=9600):
+        # Share the board through serial_daemon.py when it is running: no reset, no 2 s wait
+        self.daemon = serial_daemon.connect()
+        self.sensor_store = SensorStore()
+        if self.daemon:
+            print("Using the serial daemon")
+            self.serial = None
+            self.servo_queue = None
+            # The daemon records readings; here they only feed the ring buffer
+            self.sensor_reader = SensorReader(None)
+            self.daemon.subscribe(self.sensor_reader.add)
+            return
+
         self.serial = serial.Serial(port, baudrate, timeout=1)
         time.sleep(2)  # Wait for Arduino to reset
-        self.latest_sensor_data = None
+        
+        # Keep draining the port in the background so readings are always current,
+        # recording every reading in the sensor history store
+        self.sensor_reader = SensorReader(self.serial, on_reading=self.sensor_store.append)
+        self.sensor_reader.start()
+        
+        # Servo writes happen on a worker thread; the sketch centers the servo on reset
+        self.servo_queue = ServoQueue(self._write_servo, initial_angle=90)
+        
+    @property
+    def latest_sensor_data(self):
+        return self.sensor_reader.latest
         
     def read_sensor_data(self):
-        try:
-            if self.serial.in_waiting > 0:
-                line = self.serial.readline().decode('utf-8').strip()
-                if line and ',' in line:
-                    temp, humidity, gas_value, aqi, air_quality = line.split(',')
-                    self.latest_sensor_data = {
-                        'temperature': float(temp),
-                        'humidity': float(humidity),
-                        'gas_value': float(gas_value),
-                        'aqi': float(aqi),
-                        'air_quality': air_quality
-                    }
-                    return self.latest_sensor_data
-        except Exception as e:
-            print(f"Error reading sensor data: {e}")
-        return None
+        """Returns the newest reading without touching the serial port (None until the first one arrives)."""
+        return self.sensor_reader.latest
 
     def move_servo(self, angle):
+        """Queues the move and returns a Future that resolves once the servo has reached it."""
         if 0 <= angle <= 180:
-            command = f"{angle}\n"
-            self.serial.write(command.encode())
-            time.sleep(0.1)
             print(f"Moving servo to {angle} degrees")
+            if self.daemon:
+                return self.daemon.move_servo(angle)
+            return self.servo_queue.move(angle)
         else:
             print("Angle must be between 0 and 180 degrees")
 
+    def _write_servo(self, angle):
+        # Binary frame once the board has sent one, otherwise the legacy "<angle>\n"
+        self.serial.write(encode_servo_command(angle, self.sensor_reader.peer_version))
+
     def close(self):
+        if self.daemon:
+            self.daemon.close()
+            return
+        self.servo_queue.close()
+        print(f"Servo queue: {self.servo_queue.report()}")
+        self.sensor_reader.stop()
+        self.sensor_store.close()
+        print(f"Sensor reader: {self.sensor_reader.stats} decoder: {self.sensor_reader.decoder.stats}")
         self.serial.close()
 
 def load_memory():
-    """Loads chat history from a file if it exists and is valid."""
+    """Loads the last turns of chat history from the journal if it exists and is valid."""
+    global journaled_count
     initial_history = [{
         "role": "system",
         "content": """You are JARVIS, an advanced AI assistant with a personality inspired by Tony Stark's JARVIS. 
@@ -86,24 +188,29 @@ def load_memory():
     }]
 
     try:
-        if os.path.exists(MEMORY_FILE):
-            with open(MEMORY_FILE, "r") as file:
-                loaded_history = json.load(file)
-                if isinstance(loaded_history, list) and loaded_history:
-                    return loaded_history
+        # One-time migration of the old chat_memory.json
+        if os.path.exists(MEMORY_FILE) and not os.path.exists(JOURNAL_FILE):
+            count = migrate_json_memory(MEMORY_FILE, JOURNAL_FILE)
+            print(f"Migrated {count} messages from {MEMORY_FILE} to {JOURNAL_FILE}")
+        
+        loaded_history = journal.load(last_turns=MEMORY_TURNS)
+        if loaded_history:
+            journaled_count = len(loaded_history)
+            return loaded_history
     except (json.JSONDecodeError, FileNotFoundError, Exception) as e:
         print(f"Warning: Could not load chat history ({str(e)}). Starting fresh.")
         
-    # If anything goes wrong or file doesn't exist, create new file with initial history
-    with open(MEMORY_FILE, "w") as file:
-        json.dump(initial_history, file)
+    # If anything goes wrong or the journal doesn't exist, start it with the initial history
+    journal.extend(initial_history)
+    journaled_count = len(initial_history)
     
     return initial_history
 
 def save_memory(history):
-    """Saves chat history to a file."""
-    with open(MEMORY_FILE, "w") as file:
-        json.dump(history, file)
+    """Journals the messages added to history since the last save (written in the background)."""
+    global journaled_count
+    journal.extend(history[journaled_count:])
+    journaled_count = len(history)
 
 def extract_servo_command(text):
     """Extract servo angle from text, including directional commands."""
@@ -141,17 +248,19 @@ def extract_servo_command(text):
 
 def detect_environment_query(text):
     """Detect if the query is related to environmental data or servo control."""
-    env_keywords = ["temperature", "humidity", "air quality", "aqi", "gas", "environment", "room"]
+    # Sensor words ("humid", "hot", "cold", ...) come from the same table the history queries use
+    env_keywords = ["environment", "room"]
     servo_keywords = ["servo", "move", "turn", "left", "right", "rotate", "position", "angle", 
                      "center", "middle", "straight", "forward"]
     
     text_lower = text.lower()
-    is_env_query = any(keyword in text_lower for keyword in env_keywords)
+    is_env_query = bool(detect_fields(text)) or any(keyword in text_lower for keyword in env_keywords)
     is_servo_query = any(keyword in text_lower for keyword in servo_keywords)
     
     return is_env_query, is_servo_query
 
-def send_to_llm(text, sensor_data=None, servo_moved=False, servo_angle=None):
+def add_turn_context(text, sensor_data=None, servo_moved=False, servo_angle=None):
+    """Appends sensor/servo context and the user's message to history."""
     global history
     
     # Only add sensor data context if it's an environmental query
@@ -166,6 +275,12 @@ def send_to_llm(text, sensor_data=None, servo_moved=False, servo_angle=None):
                       f"Air Quality: {sensor_data['air_quality']}"
         })
     
+    # Questions about a period ("since this morning", "last hour") get a summary of the stored history
+    if is_env_query and sensor_history:
+        trend = sensor_history.describe(text)
+        if trend:
+            history.append({"role": "system", "content": f"Sensor history: {trend}"})
+    
     if servo_moved and servo_angle is not None:
         # Add servo movement confirmation as system message
         history.append({
@@ -175,102 +290,457 @@ def send_to_llm(text, sensor_data=None, servo_moved=False, servo_angle=None):
     
     # Add user input to history
     history.append({"role": "user", "content": text})
+
+def retrieve_related_turns(query, recent_messages):
+    """Finds past turns related to the query that aren't already part of the recent context."""
+    if turn_index is None:
+        return []
+    recent = {message.get("content") for message in recent_messages}
+    related = [
+        f"User: {user_text}\nJARVIS: {reply_text}"
+        for score, user_text, reply_text in turn_index.search(query, top_k=RETRIEVAL_TOP_K + len(recent))
+        if user_text not in recent
+    ][:RETRIEVAL_TOP_K]
+    if not related:
+        return []
+    return [{"role": "system", "content": "Related earlier conversation:\n" + "\n\n".join(related)}]
+
+def build_context():
+    """Returns the system prompt, the running summary, related past turns and as much recent history as fits the token budget."""
+    extra = summarizer.context_messages()
+    messages = context_builder.build(history, extra=extra)
     
-    # Generate response with conversation history
-    client = Groq(api_key=GROQ_API_KEY)
-    chat_completion = client.chat.completions.create(
-        messages=history,
-        model="llama-3.3-70b-versatile",
-    )
+    # Look up older turns about the same thing as the current question
+    if history and history[-1]["role"] == "user":
+        related = retrieve_related_turns(history[-1]["content"], history[context_builder.last_cut:])
+        if related:
+            messages = context_builder.build(history, extra=extra + related)
     
-    response_text = chat_completion.choices[0].message.content
-    print("JARVIS Response:", response_text)
+    if context_builder.last_dropped_messages:
+        print(f"Context: {context_builder.last_tokens} tokens, dropped "
+              f"{context_builder.last_dropped_messages} old messages ({context_builder.last_dropped_tokens} tokens)")
+    return messages
+
+def cached_reply(cache_key):
+    """Returns a cached reply for the turn (recording it in history) or None on a miss."""
+    response_text = response_cache.get(cache_key)
+    if response_text is None:
+        return None
     
-    # Add assistant response to history
+    print("JARVIS Response (cached):", response_text)
     history.append({"role": "assistant", "content": response_text})
     save_memory(history)
-    
     return response_text
 
-def text_to_speech_and_play(text):
-    print("Converting to speech...")
+def record_local_turn(text, response_text):
+    """Adds a turn answered by the fast path to history so the conversation stays consistent."""
+    print("JARVIS Response (local):", response_text)
+    history.append({"role": "user", "content": text})
+    history.append({"role": "assistant", "content": response_text})
+    save_memory(history)
+
+def synthesize_speech(text, cancel=None):
+    """
+    Returns an iterator over the audio for text: straight from the TTS cache
+    when the phrase has been spoken before, otherwise from an ElevenLabs request
+    whose chunks are yielded as they arrive (and cached once complete).
+    Setting `cancel` abandons the request.
+    """
+    cache_key = tts_cache.key(text, VOICE_ID, TTS_MODEL_ID, TTS_OUTPUT_FORMAT, VOICE_SETTINGS)
+    cached_audio = tts_cache.get(cache_key)
+    if cached_audio is not None:
+        return iter([cached_audio])
     
-    response = elevenlabs_client.text_to_speech.convert(
-        voice_id="pNInz6obpgDQGcFmaJgB",  # Adam's voice
-        output_format="mp3_22050_32", 
+    response = client_pool.elevenlabs().text_to_speech.convert(
+        voice_id=VOICE_ID,
+        output_format=TTS_OUTPUT_FORMAT, 
         text=text,
-        model_id="eleven_turbo_v2_5", 
-        voice_settings=VoiceSettings(
-            stability=0.0,
-            similarity_boost=1.0,
-            style=0.0,
-            use_speaker_boost=True,
-        ),
+        model_id=TTS_MODEL_ID, 
+        voice_settings=elevenlabs.VoiceSettings(**VOICE_SETTINGS),
     )
     
-    audio_data = io.BytesIO()
-    for chunk in response:
-        if chunk:
-            audio_data.write(chunk)
-    audio_data.seek(0)
+    return prefetch(tts_cache.cached_stream(cache_key, response), cancel)
+
+def warm_tts_cache():
+    """Pre-synthesizes the stock acknowledgements so they play without a network call."""
+    for phrase in STOCK_PHRASES:
+        cache_key = tts_cache.key(phrase, VOICE_ID, TTS_MODEL_ID, TTS_OUTPUT_FORMAT, VOICE_SETTINGS)
+        if cache_key in tts_cache:
+            continue
+        print(f"Synthesizing: {phrase}")
+        for _ in synthesize_speech(phrase):
+            pass
+    print(f"TTS cache: {tts_cache.report()}")
+
+def init_audio():
+    # Mixer runs at the TTS sample rate so PCM blocks play without resampling;
+    # a 512-sample buffer keeps output latency around 23 ms, so earcons start promptly
+    pygame.mixer.init(frequency=22050, size=-16, channels=1, buffer=512)
+
+def load_earcons():
+    # Decoded into mixer-format Sounds once; playing one later is a single channel.play()
+    return EarconBank().load()
+
+def load_turn_index():
+    # sentence-transformers pulls in torch and may download its model, so this is a startup phase
+    try:
+        return TurnIndex(TURN_INDEX_DIR)
+    except Exception as e:
+        print(f"Turn index unavailable, answering without related past turns: {e}")
+        return None
+
+def load_led_control():
+    # The LED is optional: it needs gpiod and a Pi GPIO line (see stt/gpio_control.py)
+    try:
+        from stt.gpio_control import control_led
+        return control_led
+    except Exception as e:
+        print(f"LED control unavailable ({e})")
+        return None
+
+def show_interim(event):
+    if not event.is_final:
+        print(f"\rYou (hearing): {event.text}", end="", flush=True)
+
+def open_microphone():
+    # Opened once for the session; the noise floor is tracked in the background from here on,
+    # and utterance ends come from the frame-level VAD
+    # Whisper takes 16 kHz, so capture at that rate rather than resampling every utterance
+    microphone = sr.Microphone(sample_rate=16000) if STT_BACKEND == "whisper" else None
+    return MicStream(sr.Recognizer(), microphone, use_vad=True).start()
+
+def load_stt(startup):
+    # A local Whisper model takes seconds to load and warm up, so this runs as its own phase
+    return make_recognizer(STT_BACKEND, startup.result("microphone").recognizer)
+
+@contextmanager
+def speaking(mic_stream, barge_in, cancel):
+    """While our own voice plays: freeze the noise floor and watch for the user cutting in."""
+    with mic_stream.hold_noise_floor():
+        if barge_in is None:
+            yield
+        else:
+            with barge_in.watch(cancel):
+                yield
+
+def load_barge_in(startup):
+    # Needs the PCM path: that is where the echo reference comes from
+    if TTS_OUTPUT_FORMAT not in PCM_SAMPLE_RATES:
+        print("Barge-in needs a PCM TTS format, replies can't be interrupted")
+        return None
+    return BargeInMonitor(startup.result("microphone"), echo_reference).start()
+
+def load_wake_gate(startup):
+    # Keyword spotting runs on the open microphone from here on; only speech after "Jarvis" reaches STT.
+    # Barge-in's echo check keeps a reply that says "Jarvis" from waking it
+    barge_in = startup.result("barge-in")
+    return start_gate(startup.result("microphone"), is_echo=barge_in.detector.is_echo if barge_in else None)
+
+class Turn:
+    """One exchange as it moves through the pipeline."""
+    
+    def __init__(self, text):
+        self.text = text
+        self.started = time.monotonic()
+        self.cancel = threading.Event()  # Set by barge-in: stops playback and this turn's requests
+        self.local_reply = None
+        self.sensor_data = None
+        self.servo_angle = None
+        self.servo_move = None
+        self.response = ""
+        self.speaking = None
+
+class TurnLoop:
+    """
+    The conversation as five stages joined by bounded queues:
+    
+        listen -> prepare -> respond -> synthesize -> play
     
-    pygame.mixer.music.load(audio_data, "mp3")
-    pygame.mixer.music.play()
+    listen captures and transcribes the next utterance; prepare runs the fast
+    path and starts hardware actions (a servo move runs while the LLM is
+    generating); respond streams the reply sentence by sentence; synthesize
+    starts the TTS request for each sentence; play plays them in order and
+    finishes the turn. With a wake word, listening for the next turn carries
+    on while a reply plays; without one it waits for playback to end so our
+    own voice isn't transcribed.
     
-    while pygame.mixer.music.get_busy():
-        pygame.time.Clock().tick(10)
+    Earcons mark the transitions: "listening" on the wake word, "thinking"
+    (looped) from the transcript until the first audio of the reply, "done"
+    when a reply has finished and "error" when a turn fails.
+    """
+    
+    def __init__(self, controller, mic_stream, stt, fast_path, wake_gate=None, barge_in=None, earcons=None):
+        self.controller = controller
+        self.mic_stream = mic_stream
+        self.stt = stt
+        self.fast_path = fast_path
+        self.wake_gate = wake_gate
+        self.barge_in = barge_in
+        self.earcons = earcons
+        self.resume_from = None  # Mic cursor where the user cut into the last reply
+        self.stopped = False
+        self.turns = set()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.pipeline = Pipeline([
+            Stage("listen", self.listen),
+            Stage("prepare", self.prepare, maxsize=1),
+            Stage("respond", self.respond, maxsize=1),
+            Stage("synthesize", self.synthesize, maxsize=4),  # Sentences waiting for TTS
+            Stage("play", self.play, maxsize=2),               # Clips downloading ahead of playback
+        ], on_error=lambda stage, error: self.earcon("error"))
+    
+    def run(self):
+        self.pipeline.run()
+    
+    def stop(self):
+        """Ends the turn in progress and lets a listen still running on a worker thread return."""
+        self.stopped = True
+        for turn in list(self.turns):
+            turn.cancel.set()
+    
+    def earcon(self, name, loop=False):
+        if self.earcons is not None:
+            self.earcons.play(name, loop)
+    
+    async def listen(self, _, emit):
+        if self.resume_from is None and not self.wake_gate:
+            await self.idle.wait()
+            if self.earcons is not None:
+                await asyncio.sleep(self.earcons.remaining)  # Don't hear the "done" or "error" chime as speech
+        try:
+            text = await asyncio.to_thread(self._capture)
+        except sr.WaitTimeoutError:
+            if self.stopped or self.mic_stream.closed or (self.wake_gate and self.wake_gate.closed):
+                self.pipeline.stop()  # Nothing more to listen to
+            return  # Otherwise nothing was said after the wake word; wait for the next one
+        except sr.UnknownValueError:
+            print("JARVIS: I didn't quite catch that. Could you please repeat?")
+            self.earcon("error")
+            return
+        except sr.RequestError as e:
+            print(f"JARVIS: I'm having trouble with speech recognition: {e}")
+            self.earcon("error")
+            return
+        print("\rYou:", text)
+        self.earcon("thinking", loop=True)
+        turn = Turn(text)
+        self.turns.add(turn)
+        self.idle.clear()
+        await emit(turn)
+    
+    def _capture(self):
+        # Audio goes to the recognizer as it is captured, so the transcript is ready at end of speech
+        start, resume_from = None, self.resume_from
+        if resume_from is not None:
+            # The user talked over the last reply; pick up from where they started
+            self.resume_from = None
+            start = resume_from
+        elif self.wake_gate:
+            while start is None and self.resume_from is None:
+                if self.stopped:
+                    raise sr.WaitTimeoutError("turn loop stopped")
+                start = self.wake_gate.wait(timeout=0.2)  # Raises once the gate is closed
+            if start is None:
+                return self._capture()
+            self.resume_from = None  # Whatever interrupted the reply is what follows the wake word
+            if self.earcons is not None:
+                # The microphone hears the chime too; the request is taken from after it has died away
+                self.earcon("listening")
+                chime_frames = int(self.earcons.remaining / self.mic_stream.seconds_per_frame) + 1
+                start = max(start, self.mic_stream.position + chime_frames)
+            print("Wake word heard, listening...")
+        timeout = LISTEN_AFTER_WAKE if start is not None else None
+        text, audio_data = listen_and_transcribe(
+            self.mic_stream, self.stt, timeout=timeout, on_event=show_interim, start=start)
+        if self.wake_gate and resume_from is None:
+            self.wake_gate.passed(audio_data)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+    
+    async def prepare(self, turn, emit):
+        try:
+            # Plain device commands are answered locally, no LLM round trip
+            turn.local_reply = await asyncio.to_thread(self.fast_path.handle, turn.text)
+            if turn.local_reply is None:
+                is_env_query, is_servo_query = detect_environment_query(turn.text)
+                if is_servo_query:
+                    turn.servo_angle = extract_servo_command(turn.text)
+                    if turn.servo_angle is not None:
+                        moving = self.controller.move_servo(turn.servo_angle)
+                        turn.servo_move = asyncio.wrap_future(moving) if moving is not None else None
+                if is_env_query:
+                    turn.sensor_data = await asyncio.to_thread(self.controller.read_sensor_data)
+        finally:
+            await emit(turn)
+    
+    async def respond(self, turn, emit):
+        try:
+            if turn.cancel.is_set():
+                return
+            if turn.local_reply is not None:
+                record_local_turn(turn.text, turn.local_reply)
+                turn.response = turn.local_reply
+                await emit((turn, turn.response))
+                return
+            
+            servo_moved = turn.servo_angle is not None
+            add_turn_context(turn.text, turn.sensor_data, servo_moved, turn.servo_angle)
+            
+            # Repeated questions under the same conditions skip the LLM (follow-ups like "why?" never do)
+            cache_key = response_cache.make_key(turn.text, turn.sensor_data, turn.servo_angle)
+            cached = cached_reply(cache_key)
+            if cached is not None:
+                turn.response = cached
+                await emit((turn, cached))
+                return
+            
+            # Sentences go on to TTS as soon as each is complete
+            reply_parts = []
+            def reply_fragments():
+                client = client_pool.groq()
+                for fragment in stream_llm_text(client, build_context(), "llama-3.3-70b-versatile", turn.cancel):
+                    reply_parts.append(fragment)
+                    yield fragment
+            sentences = split_sentences(reply_fragments())
+            while True:
+                sentence = await asyncio.to_thread(next, sentences, None)
+                if sentence is None:
+                    break
+                await emit((turn, sentence))
+            
+            turn.response = "".join(reply_parts)
+            interrupted = turn.cancel.is_set()
+            print("JARVIS Response:", turn.response + (" [interrupted]" if interrupted else ""))
+            if turn.response:
+                history.append({"role": "assistant", "content": turn.response})
+                save_memory(history)
+                # A cut-off reply is kept in history but never replayed from the cache
+                if not interrupted:
+                    response_cache.put(cache_key, turn.response)
+        finally:
+            await emit((turn, None))  # End of the turn
+    
+    async def synthesize(self, item, emit):
+        turn, sentence = item
+        if sentence is None:
+            await emit(item)
+        elif not turn.cancel.is_set():
+            await emit((turn, await asyncio.to_thread(synthesize_speech, sentence, turn.cancel)))
+    
+    async def play(self, item, emit):
+        turn, audio = item
+        if audio is None:
+            await self.finish(turn)
+            return
+        if turn.cancel.is_set():
+            return
+        if turn.speaking is None:
+            if self.earcons is not None:
+                self.earcons.stop("thinking")
+            turn.speaking = ExitStack()
+            turn.speaking.enter_context(speaking(self.mic_stream, self.barge_in, turn.cancel))
+        await asyncio.to_thread(audio_sink.play, audio, None, turn.cancel)
+    
+    async def finish(self, turn):
+        if turn.speaking is not None:
+            turn.speaking.close()
+            if not turn.cancel.is_set():
+                self.earcon("done")
+        elif self.earcons is not None:
+            self.earcons.stop("thinking")  # Nothing was said (the reply failed)
+        if turn.servo_move is not None:
+            try:
+                await asyncio.wait_for(turn.servo_move, timeout=5)
+            except Exception as e:
+                print(f"Servo move failed: {e!r}")
+        local = turn.local_reply is not None
+        self.fast_path.record_turn(time.monotonic() - turn.started, local=local)
+        if turn.cancel.is_set() and self.barge_in is not None and self.barge_in.speech_start is not None:
+            self.resume_from = self.barge_in.speech_start
+        if not local:
+            # Summarize turns that fell out of the context while we wait for the next one
+            summarizer.schedule(history, context_builder.last_cut)
+            # Index the new turn for retrieval without holding up the next listen
+            if turn.response and turn_index is not None:
+                threading.Thread(target=turn_index.add_turn, args=(turn.text, turn.response), daemon=True).start()
+        self.turns.discard(turn)
+        if not self.turns:
+            self.idle.set()
 
 def main():
-    global history
+    global history, sensor_history, turn_index
     
-    # Initialize history at startup
-    history = load_memory()
+    # Independent subsystems start side by side; the serial handshake alone takes 2 s
+    startup = Startup(started=IMPORT_STARTED)
+    startup.record("imports", IMPORT_STARTED)
+    startup.run("memory", load_memory)
+    startup.run("turn index", load_turn_index)
+    startup.run("api clients", client_pool.warm_up, ["groq", "elevenlabs"], wait=False)
+    startup.run("mixer", init_audio)
+    startup.run("earcons", load_earcons, after=["mixer"])
+    startup.run("serial", EnvironmentController)
+    startup.run("microphone", open_microphone)
+    startup.run("stt", load_stt, startup, after=["microphone"])
+    startup.run("barge-in", load_barge_in, startup, after=["microphone"])
+    startup.run("wake word", load_wake_gate, startup, after=["microphone", "barge-in"])
+    startup.run("led", load_led_control)
+    client_pool.start_keepalive()
     
-    # Initialize components
-    controller = EnvironmentController()
-    recognizer = sr.Recognizer()
-    mic = sr.Microphone()
+    history = startup.result("memory")
+    turn_index = startup.result("turn index")
+    controller = startup.result("serial")
+    mic_stream = startup.result("microphone")
+    recognizer = mic_stream.recognizer
+    stt = startup.result("stt")
+    wake_gate = startup.result("wake word")
+    barge_in = startup.result("barge-in")
+    earcons = startup.result("earcons")
+    control_led = startup.result("led")
+    startup.wait_all()
+    startup.shutdown()
+    
+    sensor_history = SensorHistory(controller.sensor_store)
+    fast_path = FastPath(
+        extract_angle=extract_servo_command,
+        move_servo=controller.move_servo,
+        set_led=control_led,
+        read_sensors=controller.read_sensor_data,
+    )
+    print(startup.report())
     
     print("JARVIS: At your service. How may I assist you today?")
     
+    turn_loop = TurnLoop(controller, mic_stream, stt, fast_path, wake_gate, barge_in, earcons)
     try:
-        while True:
-            with mic as source:
-                recognizer.adjust_for_ambient_noise(source)
-                try:
-                    # Listen for speech
-                    audio_data = recognizer.listen(source)
-                    text = recognizer.recognize_google(audio_data)
-                    print("You:", text)
-                    
-                    # Read sensor data only if needed
-                    is_env_query, is_servo_query = detect_environment_query(text)
-                    sensor_data = controller.read_sensor_data() if is_env_query else None
-                    
-                    # Handle servo control if requested
-                    servo_moved = False
-                    servo_angle = None
-                    if is_servo_query:
-                        servo_angle = extract_servo_command(text)
-                        if servo_angle is not None:
-                            controller.move_servo(servo_angle)
-                            servo_moved = True
-                    
-                    # Get JARVIS response
-                    response = send_to_llm(text, sensor_data, servo_moved, servo_angle)
-                    
-                    # Convert response to speech and play
-                    text_to_speech_and_play(response)
-                    
-                except sr.UnknownValueError:
-                    print("JARVIS: I didn't quite catch that. Could you please repeat?")
-                except sr.RequestError as e:
-                    print(f"JARVIS: I'm having trouble with speech recognition: {e}")
-                
+        turn_loop.run()
     except KeyboardInterrupt:
         print("\nJARVIS: Shutting down. Goodbye!")
     finally:
+        turn_loop.stop()
         controller.close()
+        mic_stream.close()
+        print(f"Microphone: {mic_stream.report()}")
+        if wake_gate:
+            wake_gate.close()
+            print(f"Wake word: {wake_gate.report()}")
+        if barge_in:
+            barge_in.close()
+            print(f"Barge-in: {barge_in.report()}")
+        print(f"STT: {stt.report()}")
+        if STT_BACKEND == "whisper":
+            print(f"Whisper: {stt.transcribe.report()}")
+        journal.close()
+        print(client_pool.report())
+        print(f"Response cache: {response_cache.report()}")
+        print(f"TTS cache: {tts_cache.report()}")
+        print(f"Fast path: {fast_path.report()}")
+        print(f"Earcons: {earcons.report()}")
+        print(turn_loop.pipeline.report())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--warm-tts-cache" in sys.argv:
+        warm_tts_cache()
+    else:
+        main()
\ No newline at end of file
@@ -4,16 +4,18 @@ import json
 import pygame
 import speech_recognition as sr
 from dotenv import load_dotenv
-from groq import Groq
-from elevenlabs import VoiceSettings, ElevenLabs
+from elevenlabs import VoiceSettings
+from clients import client_pool
+from mic_stream import MicStream
+from wake_word import start_gate, LISTEN_AFTER_WAKE
 
 # Load API keys from .env file
 load_dotenv()
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Initialize ElevenLabs client
-elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+# Shared ElevenLabs client (pooled keep-alive connections)
+elevenlabs_client = client_pool.elevenlabs()
 
 # Initialize Pygame Mixer
 pygame.mixer.init()
@@ -39,7 +41,7 @@ def send_to_llm(text):
     global history  # Maintain memory of past messages
 
     print("Sending to LLM:", text)
-    client = Groq(api_key=GROQ_API_KEY)
+    client = client_pool.groq()
     
     # Add user input to history
     history.append({"role": "user", "content": text})
@@ -91,32 +93,40 @@ def text_to_speech_and_play(text):
     
     print("Speech finished playing.")
 
-# Initialize Speech Recognition
+# Open API connections before the first turn
+client_pool.warm_up(["groq", "elevenlabs"])
+client_pool.start_keepalive()
+
+# Initialize Speech Recognition (the microphone stays open and tracks background noise itself)
 recognizer = sr.Recognizer()
-mic = sr.Microphone()
+mic_stream = MicStream(recognizer).start()
+wake_gate = start_gate(mic_stream)  # "Jarvis" spotted locally; None runs without a wake word
 
 print("Listening... Speak now!")
 
 while True:
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source)  # Adjust for background noise
-        try:
-            audio_data = recognizer.listen(source)  # Listen for speech
-            print("Audio detected, processing...")
-
-            # Recognize speech using Google Speech Recognition
-            text = recognizer.recognize_google(audio_data)
-            print("Recognized text:", text)
-
-            # Send text to LLM and get response
-            llm_response = send_to_llm(text)
-            
-            # Convert response to speech and play
+    try:
+        # Only speech after the wake word goes to the recognizer
+        start = wake_gate.wait() if wake_gate else None
+        audio_data = mic_stream.listen(timeout=LISTEN_AFTER_WAKE if wake_gate else None, start=start)
+        if wake_gate:
+            wake_gate.passed(audio_data)
+        print("Audio detected, processing...")
+
+        # Recognize speech using Google Speech Recognition
+        text = recognizer.recognize_google(audio_data)
+        print("Recognized text:", text)
+
+        # Send text to LLM and get response
+        llm_response = send_to_llm(text)
+        
+        # Convert response to speech and play
+        with mic_stream.hold_noise_floor():
             text_to_speech_and_play(llm_response)
 
-        except sr.WaitTimeoutError:
-            print("Listening timeout reached. No speech detected.")
-        except sr.UnknownValueError:
-            print("Sorry, I didn't catch that.")
-        except sr.RequestError as e:
-            print(f"Could not request results from Google Speech Recognition service: {e}")
\ No newline at end of file
+    except sr.WaitTimeoutError:
+        print("Listening timeout reached. No speech detected.")
+    except sr.UnknownValueError:
+        print("Sorry, I didn't catch that.")
+    except sr.RequestError as e:
+        print(f"Could not request results from Google Speech Recognition service: {e}")
\ No newline at end of file
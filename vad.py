@@ -0,0 +1,322 @@
+from collections import deque
+
+import numpy as np
+
+FRAME_MS = 20
+SPEECH_MARGIN_DB = 9.0    # A frame this far above the noise floor can be speech...
+STRONG_MARGIN_DB = 18.0   # ...and this far above it is speech whatever its zero-crossing rate
+MAX_VOICED_ZCR = 0.35     # Noise-like frames cross zero far more often than voiced speech
+START_FRAMES = 3          # Consecutive speech frames needed to start an utterance
+MIN_HANGOVER_MS = 200
+MAX_HANGOVER_MS = 600
+DEFAULT_HANGOVER_MS = 500    # Until the speaker's pauses are known; shorter cuts off first commands mid-sentence
+HANGOVER_PAUSE_FACTOR = 1.5  # Hangover = this many times the speaker's long pauses between words
+NOISE_WINDOW_SECONDS = 5.0   # The noise floor is the quietest frame in this window
+TAIL_MS = 150                # Audio kept past the last speech frame, for trailing fricatives
+
+
+def frame_features(samples, frame_length):
+    """
+    Per-frame energy (dB) and zero-crossing rate for 16-bit PCM samples,
+    computed for all frames at once. Trailing samples that don't fill a
+    frame are ignored.
+    """
+    count = len(samples) // frame_length
+    frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1.0)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+    return energy_db, zcr
+
+
+class FrameVAD:
+    """
+    Energy + zero-crossing voice activity detector over fixed 20 ms frames.
+
+    The noise floor (dB) is the quietest frame of the last few seconds, so it
+    drops at once when the room gets quieter, follows a louder room within
+    NOISE_WINDOW_SECONDS, and isn't pulled up by speech, which always has
+    quieter gaps. If the optional webrtcvad package is installed and use_model
+    is set, its decision is required as well.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=FRAME_MS, use_model=False):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.noise_db = None
+        self._recent_db = deque(maxlen=int(NOISE_WINDOW_SECONDS * 1000 / frame_ms))
+        self.model = None
+        if use_model:
+            try:
+                import webrtcvad
+                self.model = webrtcvad.Vad(2)
+            except ImportError:
+                print("webrtcvad not installed, using energy/ZCR only")
+
+    def classify(self, samples):
+        """
+        Two decisions for each whole frame in `samples` (int16 array): `speech`
+        (voiced or clearly loud, strict enough to start an utterance on) and
+        `active` (anything clearly above the noise, which keeps an utterance
+        going through unvoiced sounds like "s" and "f").
+        """
+        energy_db, zcr = frame_features(samples, self.frame_length)
+        if not len(energy_db):
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+        self._recent_db.extend(energy_db.tolist())
+        self.noise_db = min(self._recent_db)
+
+        above = energy_db - self.noise_db
+        active = above > SPEECH_MARGIN_DB
+        speech = (above > STRONG_MARGIN_DB) | (active & (zcr < MAX_VOICED_ZCR))
+        if self.model is not None:
+            for i in np.flatnonzero(speech):
+                frame = samples[i * self.frame_length:(i + 1) * self.frame_length]
+                speech[i] = self.model.is_speech(frame.astype(np.int16).tobytes(), self.sample_rate)
+        return speech, active
+
+    def reset_noise(self):
+        self._recent_db.clear()
+        self.noise_db = None
+
+
+class Endpointer:
+    """
+    Finds where an utterance starts and ends in a stream of PCM blocks.
+
+    An utterance starts after START_FRAMES consecutive speech frames and ends
+    after a run of non-speech frames as long as the hangover. The hangover
+    adapts to the speaker: it is 1.5x the longer pauses seen between their
+    words (kept across utterances), clamped to 200-600 ms. Fast talkers are
+    cut off sooner, slow ones aren't truncated mid-sentence. Until three
+    pauses have been heard it is DEFAULT_HANGOVER_MS; `python vad.py bench`
+    shows what shorter first-turn hangovers cost in truncated utterances.
+    """
+
+    def __init__(self, vad=None, min_hangover_ms=MIN_HANGOVER_MS, max_hangover_ms=MAX_HANGOVER_MS,
+                 default_hangover_ms=DEFAULT_HANGOVER_MS):
+        self.vad = vad or FrameVAD()
+        self.default_hangover_ms = default_hangover_ms
+        self.min_hangover_ms = min_hangover_ms
+        self.max_hangover_ms = max_hangover_ms
+        self.pauses_ms = deque(maxlen=50)
+        self._pending = np.zeros(0, dtype=np.int16)
+        self.reset()
+
+    def reset(self):
+        """Ready for the next utterance (the noise floor and pause history are kept)."""
+        self.in_speech = False
+        self.frames = 0        # Frames seen since reset
+        self.start_frame = None
+        self.end_frame = None  # Last speech frame of the finished utterance
+        self._speech_run = 0
+        self._silent_run = 0
+        self._pending = np.zeros(0, dtype=np.int16)
+
+    @property
+    def hangover_ms(self):
+        if len(self.pauses_ms) < 3:
+            return self.default_hangover_ms
+        wanted = HANGOVER_PAUSE_FACTOR * float(np.percentile(self.pauses_ms, 90))
+        return min(self.max_hangover_ms, max(self.min_hangover_ms, wanted))
+
+    def process(self, data):
+        """
+        Feeds a block of 16-bit PCM (bytes or int16 array). Returns "start"
+        when an utterance begins, "end" when it is over, otherwise None.
+        """
+        samples = np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray)) else data
+        samples = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        whole = len(samples) - len(samples) % self.vad.frame_length
+        self._pending = samples[whole:]
+
+        event = None
+        frame_ms = self.vad.frame_ms
+        speech, active = self.vad.classify(samples[:whole])
+        for is_speech, is_active in zip(speech, active):
+            self.frames += 1
+            if not self.in_speech:
+                self._speech_run = self._speech_run + 1 if is_speech else 0
+                if self._speech_run >= START_FRAMES:
+                    self.in_speech = True
+                    self.start_frame = self.frames - START_FRAMES
+                    self._silent_run = 0
+                    event = "start"
+                continue
+
+            if is_active:
+                # A pause that ended in more speech was between words
+                if self._silent_run:
+                    self.pauses_ms.append(self._silent_run * frame_ms)
+                self._silent_run = 0
+            else:
+                self._silent_run += 1
+                if self._silent_run * frame_ms >= self.hangover_ms:
+                    self.in_speech = False
+                    self.end_frame = self.frames - self._silent_run
+                    return "end"
+        return event
+
+    def seconds(self, frames):
+        return frames * self.vad.frame_ms / 1000
+
+    @property
+    def audio_end(self):
+        """Seconds since reset() up to which the finished utterance's audio should be kept."""
+        return self.seconds(self.end_frame) + TAIL_MS / 1000
+
+
+def _legacy_endpoint(samples, sample_rate, pause_threshold, chunk=1024, non_speaking_duration=0.5):
+    """
+    What recognizer.listen does: RMS per 1024-sample chunk against 1.5x the
+    first second's energy, keeping non_speaking_duration of trailing audio.
+    Returns (decision time, end of the audio handed to STT).
+    """
+    chunks = len(samples) // chunk
+    blocks = samples[:chunks * chunk].reshape(chunks, chunk).astype(np.float32)
+    rms = np.sqrt(np.mean(blocks * blocks, axis=1))
+    calibration = max(1, sample_rate // chunk)
+    threshold = max(300.0, float(np.mean(rms[:calibration])) * 1.5)
+    seconds_per_chunk = chunk / sample_rate
+    pause_chunks = int(np.ceil(pause_threshold / seconds_per_chunk))
+    started = False
+    silent = 0
+    for index in range(calibration, chunks):
+        if rms[index] > threshold:
+            started = True
+            silent = 0
+        elif started:
+            silent += 1
+            if silent > pause_chunks:
+                return (index + 1) * seconds_per_chunk, (index + 1 - silent) * seconds_per_chunk + non_speaking_duration
+    return None, None
+
+
+def _vad_endpoint(samples, sample_rate, endpointer, block=1024):
+    """Streams a clip through the endpointer; returns (decision time, end of the audio handed to STT)."""
+    endpointer.reset()
+    endpointer.vad.reset_noise()  # Each clip is a separate recording
+    for offset in range(0, len(samples), block):
+        if endpointer.process(samples[offset:offset + block]) == "end":
+            return min(offset + block, len(samples)) / sample_rate, endpointer.audio_end
+    return None, None
+
+
+def synthetic_clip(rng, sample_rate=16000):
+    """
+    A speech-like test clip: noise, a few voiced 'words' (harmonics of a
+    random pitch) separated by short pauses, some ending in a quiet
+    fricative, then trailing noise. Returns (samples, speech_end_seconds).
+    """
+    pieces = [rng.normal(0, 1, int(sample_rate * rng.uniform(1.0, 1.5)))]
+    noise_level = 10 ** rng.uniform(1.5, 2.5)
+    speech_level = noise_level * 10 ** (rng.uniform(15, 30) / 20)
+    words = rng.integers(2, 7)
+    for word in range(words):
+        length = int(sample_rate * rng.uniform(0.15, 0.5))
+        t = np.arange(length) / sample_rate
+        pitch = rng.uniform(90, 250)
+        voiced = sum(np.sin(2 * np.pi * pitch * h * t) / h for h in range(1, 8))
+        envelope = np.sin(np.pi * np.arange(length) / length) ** 0.5
+        pieces.append(voiced * envelope * speech_level / noise_level)
+        if rng.random() < 0.3:
+            pieces.append(rng.normal(0, 1, int(sample_rate * 0.08)) * 0.3 * speech_level / noise_level)
+        if word < words - 1:
+            pieces.append(np.zeros(int(sample_rate * rng.uniform(0.05, 0.3))))
+    speech_end = sum(len(piece) for piece in pieces) / sample_rate
+    pieces.append(np.zeros(int(sample_rate * 2.0)))
+    signal = np.concatenate(pieces)
+    signal = (signal + rng.normal(0, 1, len(signal))) * noise_level
+    return np.clip(signal, -32768, 32767).astype(np.int16), speech_end
+
+
+def load_clip(path, sample_rate=16000):
+    """Mono 16-bit samples of a WAV file at `sample_rate`, plus the annotated speech end if there is one."""
+    import os
+    import wave
+
+    with wave.open(path, "rb") as clip:
+        channels, width, rate = clip.getnchannels(), clip.getsampwidth(), clip.getframerate()
+        samples = np.frombuffer(clip.readframes(clip.getnframes()), dtype=np.int16 if width == 2 else np.uint8)
+    if width != 2:
+        samples = ((samples.astype(np.int16) - 128) << 8).astype(np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != sample_rate:
+        positions = np.arange(0, len(samples), rate / sample_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+    # Optional annotation next to the clip: a text file holding the speech end in seconds
+    speech_end = None
+    annotation = os.path.splitext(path)[0] + ".txt"
+    if os.path.exists(annotation):
+        with open(annotation, "r", encoding="utf-8") as file:
+            speech_end = float(file.read().split()[-1])
+    else:
+        # Without one, use the last clearly loud voiced frame, found with the whole clip in view.
+        # Frames that never cross zero are clicks or DC offset (e.g. the mic starting up), not speech.
+        energy_db, zcr = frame_features(samples, sample_rate * FRAME_MS // 1000)
+        loud = np.flatnonzero((energy_db > np.percentile(energy_db, 20) + STRONG_MARGIN_DB)
+                              & (zcr > 0) & (zcr < MAX_VOICED_ZCR))
+        if len(loud):
+            speech_end = (loud[-1] + 1) * FRAME_MS / 1000
+    return samples, speech_end
+
+
+if __name__ == "__main__":
+    # Endpoint benchmark: python vad.py bench [clip.wav ...]  (synthetic clips when none are given)
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != "bench":
+        print("Usage: python vad.py bench [clip.wav ...]")
+        sys.exit(1)
+
+    sample_rate = 16000
+    if len(sys.argv) > 2:
+        clips = []
+        for path in sys.argv[2:]:
+            samples, speech_end = load_clip(path, sample_rate)
+            if speech_end is None:
+                print(f"{path}: no speech found, skipped")
+                continue
+            # Recordings often stop right after the speaker does; a mic would keep hearing the room
+            tail = samples[int(speech_end * sample_rate):][-sample_rate // 10:]
+            noise = np.resize(tail, 2 * sample_rate) if len(tail) else np.zeros(2 * sample_rate, dtype=np.int16)
+            clips.append((np.concatenate((samples, noise)), speech_end))
+    else:
+        rng = np.random.default_rng(0)
+        clips = [synthetic_clip(rng, sample_rate) for _ in range(200)]
+    print(f"{len(clips)} clips")
+    if not clips:
+        sys.exit(1)
+
+    def first_turn(hangover_ms):
+        # A new speaker: a fresh endpointer per clip, so no pauses have been learned yet
+        return lambda samples: _vad_endpoint(
+            samples, sample_rate, Endpointer(FrameVAD(sample_rate), default_hangover_ms=hangover_ms))
+
+    truncation_slack = 0.05  # Ending this much before the true end counts as cutting the speaker off
+    methods = {
+        "recognizer.listen pause=0.8": lambda samples: _legacy_endpoint(samples, sample_rate, 0.8),
+        "recognizer.listen pause=1.0": lambda samples: _legacy_endpoint(samples, sample_rate, 1.0),
+        "frame VAD first turn 300ms": first_turn(300),
+        "frame VAD first turn 400ms": first_turn(400),
+        f"frame VAD first turn {DEFAULT_HANGOVER_MS}ms": first_turn(DEFAULT_HANGOVER_MS),
+        "frame VAD adapted": lambda samples, endpointer=Endpointer(FrameVAD(sample_rate)): _vad_endpoint(
+            samples, sample_rate, endpointer),
+    }
+    for name, method in methods.items():
+        latencies = []
+        truncated = missed = 0
+        for samples, speech_end in clips:
+            decided, audio_end = method(samples)
+            if decided is None:
+                missed += 1
+            elif audio_end < speech_end - truncation_slack:
+                truncated += 1  # Ended at a pause, so its "latency" says nothing about the real end
+            else:
+                latencies.append(decided - speech_end)
+        latency = "no complete utterances" if not latencies else (
+            f"mean {np.mean(latencies) * 1000:6.0f} ms  p90 {np.percentile(latencies, 90) * 1000:6.0f} ms")
+        print(f"{name:<28} endpoint latency {latency}  truncated {truncated / len(clips):6.1%}  missed {missed}")
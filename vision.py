@@ -1,9 +1,6 @@
 import cv2
 import time
-from groq import Groq
-
-# Initialize Groq client
-client = Groq()
+from clients import client_pool
 
 def capture_image(image_path="captured_image.jpg"):
     """Captures an image using the webcam and saves it."""
@@ -30,6 +27,7 @@ def chat_or_vision(user_input):
         
         if image_path:
             model = "llama-3.2-11b-vision-preview"
+            client = client_pool.groq_vision()
             messages = [
                 {
                     "role": "user",
@@ -45,6 +43,7 @@ def chat_or_vision(user_input):
     else:
         # Use chat model for text-only queries
         model = "llama-3.3-70b-versatile"
+        client = client_pool.groq()
         messages = [
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": user_input}
@@ -0,0 +1,344 @@
+import os
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+from startup import lazy_import
+
+sr = lazy_import("speech_recognition")
+
+WAKE_RATE = 16000  # Both engines take 16 kHz 16-bit mono
+KEYWORD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stt", "wake_word.ppn")
+REFRACTORY_SECONDS = 1.0  # One "Jarvis" fires once, however long the detector's score stays up
+WAKE_WORD_SECONDS = 1.0   # Audio before a detection that the wake word was spoken in
+LISTEN_AFTER_WAKE = 5.0   # How long to wait for the request to start once the wake word is heard
+
+
+class PorcupineDetector:
+    """
+    Picovoice Porcupine, a few percent of one Pi core. Uses the trained
+    stt/wake_word.ppn when it matches this platform, otherwise the built-in
+    "jarvis" keyword. Needs PICOVOICE_ACCESS_KEY.
+    """
+
+    name = "porcupine"
+
+    def __init__(self, access_key=None, keyword_path=KEYWORD_PATH, sensitivity=0.5):
+        import pvporcupine
+
+        access_key = access_key or os.getenv("PICOVOICE_ACCESS_KEY")
+        try:
+            self.engine = pvporcupine.create(access_key=access_key, keyword_paths=[keyword_path],
+                                             sensitivities=[sensitivity])
+        except (ValueError, pvporcupine.PorcupineError) as e:
+            print(f"Wake word model {os.path.basename(keyword_path)} not usable ({e}), using built-in 'jarvis'")
+            self.engine = pvporcupine.create(access_key=access_key, keywords=["jarvis"], sensitivities=[sensitivity])
+        self.frame_length = self.engine.frame_length
+
+    def process(self, samples):
+        return self.engine.process(samples) >= 0
+
+    def reset(self):
+        pass
+
+    def close(self):
+        self.engine.delete()
+
+
+class OpenWakeWordDetector:
+    """openWakeWord's pre-trained "hey jarvis" model on ONNX Runtime; no account needed."""
+
+    name = "openwakeword"
+    frame_length = 1280  # 80 ms, the model's step
+
+    def __init__(self, model="hey_jarvis", threshold=0.5):
+        from openwakeword.model import Model
+
+        self.model = Model(wakeword_models=[model], inference_framework="onnx")
+        self.key = next(iter(self.model.models))
+        self.threshold = threshold
+
+    def process(self, samples):
+        return self.model.predict(samples)[self.key] >= self.threshold
+
+    def reset(self):
+        self.model.reset()
+
+    def close(self):
+        pass
+
+
+def make_detector(engine="auto"):
+    """
+    Detector by name ("porcupine", "openwakeword", or "auto": Porcupine when
+    an access key is set, then openWakeWord). None if nothing could be loaded.
+    """
+    if engine == "auto":
+        engines = (["porcupine"] if os.getenv("PICOVOICE_ACCESS_KEY") else []) + ["openwakeword"]
+    else:
+        engines = [engine]
+    for name in engines:
+        try:
+            return PorcupineDetector() if name == "porcupine" else OpenWakeWordDetector()
+        except Exception as e:
+            print(f"Wake word engine {name} unavailable: {e}")
+    return None
+
+
+class FrameSplitter:
+    """Turns 16-bit PCM blocks at any rate into 16 kHz int16 frames of the detector's length."""
+
+    def __init__(self, sample_rate, frame_length):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._last = np.zeros(0, dtype=np.float32)  # Previous block's final sample, for continuous resampling
+        self._phase = 0.0
+
+    def feed(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        if self.sample_rate != WAKE_RATE:
+            samples = self._resample(samples)
+        pending = np.concatenate([self._pending, samples])
+        count = len(pending) // self.frame_length
+        self._pending = pending[count * self.frame_length:]
+        return [pending[i * self.frame_length:(i + 1) * self.frame_length] for i in range(count)]
+
+    def _resample(self, samples):
+        step = self.sample_rate / WAKE_RATE
+        samples = np.concatenate([self._last, samples.astype(np.float32)])
+        positions = np.arange(self._phase, len(samples) - 1, step)
+        resampled = np.interp(positions, np.arange(len(samples)), samples)
+        # Positions continue from the last sample, which is index 0 of the next block
+        self._phase = (positions[-1] + step if len(positions) else self._phase) - (len(samples) - 1)
+        self._last = samples[-1:]
+        return resampled.astype(np.int16)
+
+
+class WakeWordGate:
+    """
+    Keyword spotting in front of speech recognition.
+
+    A background thread runs the detector over every block the MicStream
+    captures, at a fixed cost per frame whatever is being said. wait() blocks
+    until the wake word is heard and returns the frame cursor just after it;
+    listen(start=cursor) then picks up the request, so only audio following
+    the wake word ever reaches STT. Everything heard while waiting is gated
+    out and counted (gated_speech is the part loud enough that listen() would
+    have sent it to the recognizer).
+
+    JARVIS saying its own name must not wake it: with is_echo(level, start,
+    end) given (BargeInDetector.is_echo), a detection whose loudest frame the
+    echo of the reply playing at the time could account for is dropped.
+    """
+
+    def __init__(self, mic_stream, detector, is_echo=None):
+        self.mic_stream = mic_stream
+        self.detector = detector
+        self.is_echo = is_echo
+        self._levels = deque(maxlen=64)  # (end time, rms) of recent frames
+        self.sample_rate = mic_stream.source.SAMPLE_RATE
+        self._splitter = FrameSplitter(self.sample_rate, detector.frame_length)
+        self._condition = threading.Condition()
+        self._armed = False
+        self._detected = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"wakes": 0, "echo_rejected": 0, "audio_seconds": 0.0, "gated_seconds": 0.0, "gated_speech_seconds": 0.0,
+                      "passed_seconds": 0.0, "processing_seconds": 0.0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.detector.close()
+
+    @property
+    def closed(self):
+        return self._stop.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Waits for the wake word; returns the cursor right after it, or None on
+        timeout. Raises sr.WaitTimeoutError once the gate or microphone is closed.
+        """
+        with self._condition:
+            if self._stop.is_set():
+                raise sr.WaitTimeoutError("wake word gate closed")
+            self._armed = True
+            self._detected = None
+            self._condition.wait_for(lambda: self._detected is not None or self._stop.is_set(), timeout=timeout)
+            self._armed = False
+            if self._detected is None and self._stop.is_set():
+                raise sr.WaitTimeoutError("wake word gate closed")
+            return self._detected
+
+    def passed(self, audio_data):
+        """Counts an utterance that went on to STT after the wake word."""
+        self.stats["passed_seconds"] += len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+
+    @property
+    def cpu_share(self):
+        """Detector time per second of audio, i.e. the share of one core it takes."""
+        if not self.stats["audio_seconds"]:
+            return None
+        return self.stats["processing_seconds"] / self.stats["audio_seconds"]
+
+    def report(self):
+        s = self.stats
+        share = self.cpu_share
+        return (f"engine={self.detector.name} wakes={s['wakes']} echo_rejected={s['echo_rejected']} gated={s['gated_seconds']:.0f}s "
+                f"(speech {s['gated_speech_seconds']:.0f}s) passed={s['passed_seconds']:.0f}s "
+                f"cpu={'n/a' if share is None else f'{share * 100:.1f}%'}")
+
+    def _echo(self, end_time):
+        start = end_time - WAKE_WORD_SECONDS
+        loudest = max((level for ended, level in self._levels if ended > start), default=0.0)
+        return self.is_echo(loudest, start, end_time)
+
+    def _run(self):
+        cursor = self.mic_stream.position
+        refractory = 0.0
+        while not self._stop.is_set():
+            try:
+                frame, cursor = self.mic_stream.next_frame(cursor, 0.5)
+            except sr.WaitTimeoutError:
+                # Microphone closed: wake anyone waiting rather than leave them polling
+                with self._condition:
+                    self._stop.set()
+                    self._condition.notify_all()
+                break
+            if frame is None:
+                continue
+            data, energy = frame
+            seconds = len(data) / (2 * self.sample_rate)
+
+            started = time.perf_counter()
+            fired = False
+            for samples in self._splitter.feed(data):
+                if self.detector.process(samples) and refractory <= 0:
+                    fired = True
+            if fired:
+                self.detector.reset()
+                refractory = REFRACTORY_SECONDS
+            refractory -= seconds
+            if self.is_echo:
+                # The frame finished arriving this many frames ago
+                end_time = time.monotonic() - (self.mic_stream.position - cursor) * self.mic_stream.seconds_per_frame
+                samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+                self._levels.append((end_time, float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0))
+                if fired and self._echo(end_time):
+                    fired = False
+                    self.stats["echo_rejected"] += 1
+            self.stats["processing_seconds"] += time.perf_counter() - started
+            self.stats["audio_seconds"] += seconds
+
+            with self._condition:
+                if not self._armed:
+                    continue
+                if fired:
+                    self.stats["wakes"] += 1
+                    self._detected = cursor
+                    self._armed = False
+                    self._condition.notify_all()
+                else:
+                    self.stats["gated_seconds"] += seconds
+                    if energy > self.mic_stream.recognizer.energy_threshold:
+                        self.stats["gated_speech_seconds"] += seconds
+
+
+def start_gate(mic_stream, engine=None, is_echo=None):
+    """
+    WakeWordGate over an open MicStream, engine from WAKE_WORD ("auto" by
+    default, "off" disables the gate). None when disabled or unavailable,
+    in which case every utterance goes to STT as before.
+    """
+    engine = engine or os.getenv("WAKE_WORD") or "auto"
+    if engine == "off":
+        return None
+    detector = make_detector(engine)
+    if detector is None:
+        print("No wake word engine available, listening without a wake word")
+        return None
+    return WakeWordGate(mic_stream, detector, is_echo).start()
+
+
+def count_detections(detector, samples):
+    """Times the wake word fires in 16 kHz int16 samples, with the same refractory period as the gate."""
+    detections = 0
+    last = -REFRACTORY_SECONDS
+    length = detector.frame_length
+    detector.reset()
+    for index in range(len(samples) // length):
+        if detector.process(samples[index * length:(index + 1) * length]):
+            at = index * length / WAKE_RATE
+            if at - last >= REFRACTORY_SECONDS:
+                detections += 1
+                last = at
+                detector.reset()
+    return detections
+
+
+if __name__ == "__main__":
+    # False-accept / false-reject benchmark on recorded clips:
+    #   python wake_word.py bench --positives clips/jarvis --negatives clips/tv [--engine openwakeword]
+    # Every positive clip should contain the wake word once; negatives (TV, chatter, room noise) never.
+    import argparse
+    from vad import load_clip
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--positives", required=True)
+    parser.add_argument("--negatives", required=True)
+    parser.add_argument("--engine", default="auto", choices=["auto", "porcupine", "openwakeword"])
+    args = parser.parse_args()
+
+    def clips(directory):
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".wav"))
+
+    detector = make_detector(args.engine)
+    if detector is None:
+        raise SystemExit("No wake word engine could be loaded")
+
+    audio_seconds = 0.0
+    processing_seconds = 0.0
+
+    def run(path):
+        global audio_seconds, processing_seconds
+        samples, _ = load_clip(path, WAKE_RATE)
+        started = time.perf_counter()
+        detections = count_detections(detector, samples)
+        processing_seconds += time.perf_counter() - started
+        audio_seconds += len(samples) / WAKE_RATE
+        return detections, len(samples) / WAKE_RATE
+
+    positives = clips(args.positives)
+    missed = [path for path in positives if run(path)[0] == 0]
+    for path in missed:
+        print(f"  missed: {os.path.basename(path)}")
+
+    negative_hours = 0.0
+    false_accepts = 0
+    for path in clips(args.negatives):
+        detections, seconds = run(path)
+        negative_hours += seconds / 3600
+        false_accepts += detections
+        if detections:
+            print(f"  false accept x{detections}: {os.path.basename(path)}")
+
+    print(f"engine={detector.name}")
+    if positives:
+        print(f"false reject: {len(missed)}/{len(positives)} ({len(missed) / len(positives) * 100:.1f}%)")
+    if negative_hours:
+        print(f"false accept: {false_accepts} in {negative_hours * 60:.1f} min "
+              f"({false_accepts / negative_hours:.2f}/hour)")
+    print(f"cpu: {processing_seconds / audio_seconds * 100:.1f}% of one core" if audio_seconds else "cpu: n/a")
@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+
+WHISPER_RATE = 16000
+DEFAULT_MODEL = "base.en"
+# Estimated on one x86 core with int8 (faster-whisper, greedy): tiny.en ~0.4 s per utterance,
+# base.en 0.7-1.3 s, for 1-8 s utterances. The fixed 30 s encoder window dominates, so
+# short commands have the worst real-time factor (tiny.en 0.40 at 1 s, 0.05 at 8 s).
+
+
+def to_whisper_audio(audio, sample_rate, sample_width=2):
+    """16-bit PCM bytes at any rate -> float32 samples in [-1, 1] at 16 kHz (what Whisper takes)."""
+    if sample_width != 2:
+        raise ValueError("Only 16-bit PCM is supported")
+    samples = np.frombuffer(audio, dtype=np.int16).astype(np.float32) / 32768.0
+    if sample_rate != WHISPER_RATE and len(samples):
+        duration = len(samples) / sample_rate
+        positions = np.arange(int(duration * WHISPER_RATE)) * (sample_rate / WHISPER_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+class WhisperTranscriber:
+    """
+    Local speech-to-text with a Whisper model kept loaded for the session.
+
+    Audio is passed as NumPy arrays straight from the capture buffers, never
+    through a WAV file. engine="faster-whisper" runs CTranslate2 with
+    compute_type="int8" by default (quantized, by far the fastest on a Pi's
+    CPU); engine="openai-whisper" uses the reference PyTorch package;
+    "auto" picks faster-whisper when it is installed. The model is warmed up
+    with a second of silence at load so the first real utterance isn't slow.
+
+    Instances are callable as transcribe(pcm_bytes, sample_rate) -> text, the
+    batch transcriber signature streaming_stt.StreamingRecognizer takes.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, engine="auto", compute_type="int8", device="cpu",
+                 language="en", threads=0, beam_size=1):
+        self.model_name = model
+        self.compute_type = compute_type
+        self.language = language
+        self.beam_size = beam_size
+        self.engine = engine if engine != "auto" else self._available_engine()
+        self.stats = {"utterances": 0, "audio_seconds": 0.0, "processing_seconds": 0.0}
+
+        started = time.perf_counter()
+        if self.engine == "faster-whisper":
+            from faster_whisper import WhisperModel
+            self.model = WhisperModel(model, device=device, compute_type=compute_type, cpu_threads=threads)
+        else:
+            import whisper
+            self.model = whisper.load_model(model, device=device)
+        self.load_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        self.transcribe_array(np.zeros(WHISPER_RATE, dtype=np.float32))
+        self.warmup_seconds = time.perf_counter() - started
+
+    @staticmethod
+    def _available_engine():
+        try:
+            import faster_whisper  # noqa: F401
+            return "faster-whisper"
+        except ImportError:
+            return "openai-whisper"
+
+    def __call__(self, audio, sample_rate):
+        samples = to_whisper_audio(audio, sample_rate)
+        if not len(samples):
+            return ""
+        started = time.perf_counter()
+        text = self.transcribe_array(samples)
+        self.stats["utterances"] += 1
+        self.stats["audio_seconds"] += len(samples) / WHISPER_RATE
+        self.stats["processing_seconds"] += time.perf_counter() - started
+        return text
+
+    def transcribe_array(self, samples):
+        """Transcribes float32 16 kHz samples of any length."""
+        if self.engine == "faster-whisper":
+            segments, _ = self.model.transcribe(
+                samples, language=self.language, beam_size=self.beam_size,
+                condition_on_previous_text=False, vad_filter=False)
+            return " ".join(segment.text.strip() for segment in segments).strip()
+        result = self.model.transcribe(
+            samples, language=self.language, beam_size=self.beam_size if self.beam_size > 1 else None,
+            fp16=False, condition_on_previous_text=False)
+        return result["text"].strip()
+
+    @property
+    def real_time_factor(self):
+        """Processing time per second of audio (below 1.0 is faster than real time)."""
+        if not self.stats["audio_seconds"]:
+            return None
+        return self.stats["processing_seconds"] / self.stats["audio_seconds"]
+
+    def report(self):
+        rtf = self.real_time_factor
+        return (f"engine={self.engine} model={self.model_name} compute_type={self.compute_type} "
+                f"load={self.load_seconds:.1f}s warmup={self.warmup_seconds:.2f}s "
+                f"utterances={self.stats['utterances']} rtf={'n/a' if rtf is None else f'{rtf:.2f}'}")
+
+
+if __name__ == "__main__":
+    # Real-time-factor benchmark: python whisper_stt.py bench [--model tiny.en] [--engine ...] [--compute-type ...] [clip.wav ...]
+    import os
+    import argparse
+    from vad import load_clip
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("clips", nargs="*")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--engine", default="auto", choices=["auto", "faster-whisper", "openai-whisper"])
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    clips = args.clips or [os.path.join(os.path.dirname(os.path.abspath(__file__)), "camera_test", "test.wav")]
+    transcriber = WhisperTranscriber(args.model, args.engine, args.compute_type)
+    print(f"Loaded {transcriber.engine} {args.model} ({args.compute_type}) in {transcriber.load_seconds:.1f}s, "
+          f"warm-up {transcriber.warmup_seconds:.2f}s, {os.cpu_count()} CPUs")
+
+    for path in clips:
+        samples, _ = load_clip(path, WHISPER_RATE)
+        # Utterances of different lengths cut from the clip
+        for seconds in (1, 2, 4, 8):
+            if len(samples) < seconds * WHISPER_RATE and seconds > 1:
+                break
+            piece = samples[:seconds * WHISPER_RATE].tobytes()
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                text = transcriber(piece, WHISPER_RATE)
+                timings.append(time.perf_counter() - started)
+            duration = len(piece) / 2 / WHISPER_RATE
+            best = min(timings)
+            print(f"{os.path.basename(path)} {duration:4.1f}s: {best * 1000:6.0f} ms  rtf {best / duration:5.2f}  {text!r}")
+    print(transcriber.report())